@@ -0,0 +1,3 @@
+import time
+
+IMPORTED_AT = time.perf_counter()   # start of the app's own imports, for the startup report
@@ -1,7 +1,15 @@
 from fastapi import APIRouter
 from .users import router as users
 from .anchors import router as anchors
+from .mailbox import router as mailbox
+from .parties import router as parties
+from .export import router as export
+from .metrics import router as metrics
 
 api = APIRouter()
 api.include_router(users)
 api.include_router(anchors)
+api.include_router(mailbox)
+api.include_router(parties)
+api.include_router(export)
+api.include_router(metrics)
@@ -1,6 +1,16 @@
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Request, Query
-from app.services.anchors import list_anchors, get_anchor, list_ghosts, get_ghost
+import base64
+import hashlib
+import json
+from pathlib import Path
+from typing import Literal, Optional
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from app.core.security import require_admin
+from app.services.instructions import get_instructions
+from app.services.anchors import (
+    catalogue_version, list_anchors, get_anchor, list_ghosts, get_ghost, reload_anchors, search_anchors,
+)
+from app.services.user_index import user_index
 
 router = APIRouter(tags=["anchors"])
 
@@ -24,10 +34,113 @@ def _anchor_summary(a, request: Request):
         "is_ghost": bool(a.meta.get("is_ghost")),
     }
 
+def _has_vector(a) -> bool:
+    # The loader stores zero-norm vectors as empty; the any() also covers anything built elsewhere
+    return bool(a.reduced_i8) and np.frombuffer(a.reduced_i8, dtype=np.int8).any()
+
+def _reduced_payload(a, vector_format: str):
+    if not _has_vector(a):
+        return None
+    if vector_format == "b64":
+        return base64.b64encode(a.reduced_i8).decode("ascii")
+    return [float(x) for x in a.reduced]   # a mapped snapshot row until here
+
+def _reduced_bytes(a) -> Response:
+    if not _has_vector(a):
+        raise HTTPException(status_code=404, detail="anchor has no reduced vector")
+    return Response(content=a.reduced_i8, media_type="application/octet-stream")
+
+def _inline_html(a) -> Optional[str]:
+    cached = get_instructions(a.meta["instructions_html"])
+    return cached.text if cached else None
+
+def _accepts(request: Request, coding: str) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() in (coding, "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+VectorFormat = Query("float", description="'float' list, or 'b64' of the packed int8 vector")
+
+# ---------- Pre-rendered index responses ----------
+# (kind, base_url) -> (catalogue version, JSON body, strong ETag). Rebuilt lazily after each publish.
+_INDEX_CACHE: dict[tuple[str, str], tuple[int, bytes, str]] = {}
+_INDEX_CACHE_MAX = 64   # distinct base URLs (Host headers) kept
+
+def _ghost_summary(a, request: Request):
+    row = _anchor_summary(a, request)
+    row["join_window_min"] = a.meta.get("join_window_min")
+    return row
+
+def _cached_index(kind: str, request: Request) -> Response:
+    key = (kind, str(request.base_url))
+    version = catalogue_version()
+    hit = _INDEX_CACHE.get(key)
+    if hit is None or hit[0] != version:
+        if kind == "ghosts":
+            rows = [_ghost_summary(a, request) for a in list_ghosts()]
+        else:
+            rows = [_anchor_summary(a, request) for a in list_anchors()]
+        body = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        hit = (version, body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+        if len(_INDEX_CACHE) >= _INDEX_CACHE_MAX:
+            _INDEX_CACHE.clear()
+        _INDEX_CACHE[key] = hit
+    _, body, etag = hit
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    inm = request.headers.get("if-none-match")
+    if inm and (inm.strip() == "*" or etag in (t.strip() for t in inm.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _search_index(kind: str, request: Request, tag: list[str], tag_mode: str, q: str | None,
+                  user_id: int | None, limit: int | None) -> Response:
+    """Filtered index, served from the snapshot's search structures; only unfiltered requests hit the ETag cache."""
+    if not tag and not q and user_id is None and limit is None:
+        return _cached_index(kind, request)
+    query = None
+    if user_id is not None:
+        vec = user_index.get(user_id)
+        if vec is None:
+            raise HTTPException(status_code=404, detail="user not found or has no vector")
+        query = vec.astype(np.float32) / 127.0
+    ghost = kind == "ghosts"
+    summary = _ghost_summary if ghost else _anchor_summary
+    rows = []
+    for a, score in search_anchors(tag, q, tag_mode == "all", ghost=ghost, query=query, limit=limit):
+        row = summary(a, request)
+        if query is not None:
+            row["score"] = score   # None for anchors without a vector (listed after the scored ones)
+        rows.append(row)
+    body = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-cache"})
+
+TagFilter = Query([], description="Tag filter (repeatable)")
+TagMode = Query("all", description="'all': anchors with every tag; 'any': with at least one")
+TextQuery = Query(None, max_length=200, description="Words to find in title/description (prefixes match)")
+RerankUser = Query(None, ge=1, description="Order results by similarity to this user's vector")
+LimitQuery = Query(None, ge=1, le=1000)
+
 # ---------- Normal anchors ----------
 @router.get("/anchors")
-def anchors_index(request: Request):
-    return [_anchor_summary(a, request) for a in list_anchors()]
+def anchors_index(
+    request: Request,
+    tag: list[str] = TagFilter,
+    tag_mode: Literal["all", "any"] = TagMode,
+    q: str | None = TextQuery,
+    user_id: int | None = RerankUser,
+    limit: int | None = LimitQuery,
+):
+    return _search_index("anchors", request, tag, tag_mode, q, user_id, limit)
+
+@router.post("/anchors/reload", dependencies=[Depends(require_admin)])
+def anchors_reload():
+    """Re-parse changed catalogue files and republish; returns the added/changed/removed files."""
+    try:
+        return reload_anchors()
+    except (RuntimeError, ValueError, OSError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @router.get("/anchor/{slug}")
 def anchor_detail(
@@ -35,6 +148,7 @@ def anchor_detail(
     request: Request,
     include_reduced: bool = Query(False, description="Include reduced vector floats"),
     include_html: bool = Query(False, description="Inline instructions HTML if available"),
+    vector_format: Literal["float", "b64"] = VectorFormat,
 ):
     a = get_anchor(slug)
     if not a:
@@ -54,24 +168,30 @@ def anchor_detail(
         },
     }
     if include_reduced:
-        resp["reduced"] = a.reduced
+        resp["reduced"] = _reduced_payload(a, vector_format)
     if include_html and a.meta.get("instructions_html"):
-        try:
-            from pathlib import Path
-            resp["instructions_html"] = Path(a.meta["instructions_html"]).read_text(encoding="utf-8")
-        except FileNotFoundError:
-            resp["instructions_html"] = None
+        resp["instructions_html"] = _inline_html(a)
     return resp
 
+@router.get("/anchor/{slug}/reduced", response_class=Response)
+def anchor_reduced(slug: str):
+    """Packed int8 reduced vector as application/octet-stream."""
+    a = get_anchor(slug)
+    if not a:
+        raise HTTPException(status_code=404, detail="anchor not found")
+    return _reduced_bytes(a)
+
 # ---------- Ghost anchors (templates) ----------
 @router.get("/ghost-anchors")
-def ghosts_index(request: Request):
-    out = []
-    for a in list_ghosts():
-        row = _anchor_summary(a, request)
-        row["join_window_min"] = a.meta.get("join_window_min")
-        out.append(row)
-    return out
+def ghosts_index(
+    request: Request,
+    tag: list[str] = TagFilter,
+    tag_mode: Literal["all", "any"] = TagMode,
+    q: str | None = TextQuery,
+    user_id: int | None = RerankUser,
+    limit: int | None = LimitQuery,
+):
+    return _search_index("ghosts", request, tag, tag_mode, q, user_id, limit)
 
 @router.get("/ghost-anchors/{slug}")
 def ghost_detail(
@@ -79,6 +199,7 @@ def ghost_detail(
     request: Request,
     include_reduced: bool = Query(False),
     include_html: bool = Query(False),
+    vector_format: Literal["float", "b64"] = VectorFormat,
 ):
     a = get_ghost(slug)
     if not a:
@@ -100,11 +221,38 @@ def ghost_detail(
         },
     }
     if include_reduced:
-        resp["reduced"] = a.reduced
+        resp["reduced"] = _reduced_payload(a, vector_format)
     if include_html and a.meta.get("instructions_html"):
-        try:
-            from pathlib import Path
-            resp["instructions_html"] = Path(a.meta["instructions_html"]).read_text(encoding="utf-8")
-        except FileNotFoundError:
-            resp["instructions_html"] = None
+        resp["instructions_html"] = _inline_html(a)
     return resp
+
+@router.get("/ghost-anchors/{slug}/reduced", response_class=Response)
+def ghost_reduced(slug: str):
+    """Packed int8 reduced vector as application/octet-stream."""
+    a = get_ghost(slug)
+    if not a:
+        raise HTTPException(status_code=404, detail="ghost anchor not found")
+    return _reduced_bytes(a)
+
+# ---------- Instructions HTML (shadows the /static/anchors files) ----------
+@router.get("/static/anchors/{name}", include_in_schema=False)
+def instructions_file(name: str, request: Request):
+    """Serve cached, precompressed instructions pages with Accept-Encoding negotiation."""
+    if name != Path(name).name or not name.endswith(".html"):
+        raise HTTPException(status_code=404, detail="not found")
+    cached = get_instructions(f"static/anchors/{name}")
+    if cached is None:
+        raise HTTPException(status_code=404, detail="not found")
+    body, coding = cached.raw, None
+    if cached.br is not None and _accepts(request, "br"):
+        body, coding = cached.br, "br"
+    elif cached.gzip is not None and _accepts(request, "gzip"):
+        body, coding = cached.gzip, "gzip"
+    etag = cached.etag_for(coding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    inm = request.headers.get("if-none-match")
+    if inm and (inm.strip() == "*" or etag in (t.strip() for t in inm.split(","))):
+        return Response(status_code=304, headers=headers)
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type="text/html; charset=utf-8", headers=headers)
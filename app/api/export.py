@@ -0,0 +1,26 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.security import require_admin
+from app.services.export import iter_export
+
+router = APIRouter(prefix="/export", tags=["export"], dependencies=[Depends(require_admin)])
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "binary": "application/octet-stream"}
+
+@router.get("/vectors")
+def export_vectors(
+    format: Literal["ndjson", "binary"] = Query("ndjson"),
+    after_id: int | None = Query(None, ge=0, description="Resume: only users with id > after_id"),
+):
+    """
+    Stream every user and their vector, in id order and constant memory: NDJSON objects
+    (users without a vector included, b64 null) or the binary (int64 id, int8[VECTOR_DIM])
+    record format. Load a dump back with `python -m app.commands.import_vectors`.
+    """
+    return StreamingResponse(
+        iter_export(format, after_id),
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="vectors.{"ndjson" if format == "ndjson" else "bin"}"'},
+    )
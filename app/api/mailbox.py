@@ -0,0 +1,98 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import require_admin
+from app.services import mailbox as svc
+from app.services.users import get_user_read
+
+# ----- Schemas -----
+
+class MessageRead(BaseModel):
+    id: int
+    kind: str
+    body: str
+    data: dict | None = None
+    created_at: datetime
+
+class MailboxPage(BaseModel):
+    items: list[MessageRead]
+    next_since: int       # pass back as `since` to continue
+
+class MessageCreate(BaseModel):
+    kind: str = "notice"
+    body: str
+    data: dict | None = None
+
+def _read(m: svc.Message) -> MessageRead:
+    return MessageRead(id=m.id, kind=m.kind, body=m.body, data=m.data, created_at=m.created_at)
+
+def _page(items: list[svc.Message], since: int) -> MailboxPage:
+    return MailboxPage(items=[_read(m) for m in items], next_since=items[-1].id if items else since)
+
+# ----- Router -----
+
+router = APIRouter(prefix="/users", tags=["mailbox"])
+
+Since = Query(0, ge=0, description="Return messages with id > since")
+Limit = Query(None, ge=1, le=settings.MAILBOX_MAX_LIMIT)
+
+@router.get("/mailbox/retention", dependencies=[Depends(require_admin)])
+def mailbox_retention_stats():
+    """Retention sweeper counters: rows purged, batch latency and the expired backlog."""
+    return svc.retention_stats()
+
+@router.post("/mailbox/retention/sweep", dependencies=[Depends(require_admin)])
+async def mailbox_retention_sweep():
+    """Run one retention pass now (the background sweeper keeps running on its own schedule)."""
+    return await svc.sweep_mailbox_once()
+
+@router.get("/{user_id}/mailbox", response_model=MailboxPage)
+def get_mailbox(user_id: int, since: int = Since, limit: int | None = Limit, db: Session = Depends(get_db)):
+    get_user_read(db, user_id)
+    return _page(svc.read_mailbox(db, user_id, since, limit), since)
+
+@router.post("/{user_id}/mailbox", response_model=MessageRead, status_code=201, dependencies=[Depends(require_admin)])
+def post_mailbox(user_id: int, payload: MessageCreate, db: Session = Depends(get_db)):
+    get_user_read(db, user_id)
+    return _read(svc.post_message(db, user_id, payload.kind, payload.body, payload.data))
+
+@router.get("/{user_id}/mailbox/wait", response_model=MailboxPage)
+async def wait_mailbox(
+    user_id: int,
+    since: int = Since,
+    limit: int | None = Limit,
+    timeout: float = Query(25.0, gt=0, le=settings.MAILBOX_WAIT_MAX_S),
+    db: Session = Depends(get_db),
+):
+    """Long-poll: returns as soon as a message after `since` exists, or empty after `timeout` seconds."""
+    await run_in_threadpool(get_user_read, db, user_id)
+    db.close()  # don't hold a pooled connection while parked
+    return _page(await svc.long_poll(user_id, since, limit, timeout), since)
+
+@router.get("/{user_id}/mailbox/stream")
+async def stream_mailbox(user_id: int, request: Request, since: int = Since, db: Session = Depends(get_db)):
+    """Server-Sent Events: one `message` event per mailbox message, keepalive comments while idle."""
+    await run_in_threadpool(get_user_read, db, user_id)
+    db.close()
+    last = request.headers.get("last-event-id")
+    if last and last.isdigit():
+        since = max(since, int(last))
+
+    async def events():
+        cursor = since
+        while not await request.is_disconnected():
+            items = await svc.long_poll(user_id, cursor, settings.MAILBOX_MAX_LIMIT, settings.MAILBOX_SSE_KEEPALIVE_S)
+            if not items:
+                yield ": keepalive\n\n"
+                continue
+            for m in items:
+                yield f"id: {m.id}\nevent: message\ndata: {_read(m).model_dump_json()}\n\n"
+            cursor = items[-1].id
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
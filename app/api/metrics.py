@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Response
+
+from app.core.config import settings
+from app.core.metrics import registry, threadpool_samples
+from app.services.anchors import catalogue_version, list_anchors, list_ghosts
+from app.services.mailbox import retention_stats
+from app.services.user_cache import user_cache
+from app.services.user_index import user_index
+
+router = APIRouter(tags=["metrics"])
+
+@registry.collector
+def _service_samples():
+    cache = user_cache.stats()
+    sweep = retention_stats()
+    return [
+        ("senecampus_anchors", "gauge", "Normal anchors in the published catalogue.", len(list_anchors())),
+        ("senecampus_ghost_anchors", "gauge", "Ghost templates in the published catalogue.", len(list_ghosts())),
+        ("senecampus_catalogue_publishes_total", "counter", "Catalogue publishes since start.", catalogue_version()),
+        ("senecampus_user_index_rows", "gauge", "Users in the in-memory vector index.", len(user_index)),
+        ("senecampus_user_cache_entries", "gauge", "Entries in the user read-through cache.", cache["size"]),
+        ("senecampus_user_cache_hits_total", "counter", "User cache hits.", cache["hits"]),
+        ("senecampus_user_cache_misses_total", "counter", "User cache misses.", cache["misses"]),
+        ("senecampus_user_cache_evictions_total", "counter", "User cache LRU evictions.", cache["evictions"]),
+        ("senecampus_mailbox_purged_total", "counter", "Mailbox messages purged by retention.", sweep["rows_purged"]),
+    ]
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition; async so the threadpool gauges are read on the event loop."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(registry.render(threadpool_samples()), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,85 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import require_admin
+from app.models.party import Party
+from app.services import parties as svc
+from app.services.users import get_user_read
+
+# ----- Schemas -----
+
+class PartyStart(BaseModel):
+    anchor: str                       # ghost anchor slug, e.g. "study-session"
+    invite: int | None = Field(None, ge=0, le=settings.PARTY_INVITE_MAX)   # defaults to PARTY_INVITE_FANOUT
+
+class PartyRead(BaseModel):
+    id: int
+    anchor_slug: str
+    initiator_id: int
+    status: str
+    min_size: int
+    max_size: int
+    member_count: int
+    invited_count: int
+    expires_at: datetime
+    members: list[int]
+
+class GroupingResult(BaseModel):
+    groups: list[list[int]]       # user ids per group
+    unassigned: list[int]
+    party_ids: list[int]          # parties created, when applied
+    stats: dict
+
+def _read(db: Session, p: Party) -> PartyRead:
+    return PartyRead(
+        id=p.id, anchor_slug=p.anchor_slug, initiator_id=p.initiator_id, status=p.status,
+        min_size=p.min_size, max_size=p.max_size, member_count=p.member_count,
+        invited_count=p.invited_count, expires_at=svc.as_utc(p.expires_at),
+        members=svc.party_members(db, p.id),
+    )
+
+# ----- Router -----
+
+router = APIRouter(tags=["parties"])
+
+@router.post("/users/{user_id}/parties", response_model=PartyRead, status_code=201)
+def start_party(user_id: int, payload: PartyStart, db: Session = Depends(get_db)):
+    """Start a ghost party and invite the most similar users through their mailboxes."""
+    user = get_user_read(db, user_id)
+    party, _ = svc.start_party(db, user.id, user.username, payload.anchor, payload.invite)
+    return _read(db, party)
+
+@router.post("/users/{user_id}/parties/{party_id}/join", response_model=PartyRead)
+def join_party(user_id: int, party_id: int, db: Session = Depends(get_db)):
+    get_user_read(db, user_id)
+    return _read(db, svc.join_party(db, party_id, user_id))
+
+@router.get("/parties/{party_id}", response_model=PartyRead)
+def get_party(party_id: int, db: Session = Depends(get_db)):
+    return _read(db, svc.get_party(db, party_id))
+
+@router.put("/users/{user_id}/optins/{slug}", status_code=204)
+def opt_in(user_id: int, slug: str, db: Session = Depends(get_db)):
+    """Join the pool the group solver draws from for normal anchor `slug`."""
+    get_user_read(db, user_id)
+    svc.opt_in(db, user_id, slug)
+    return None
+
+@router.delete("/users/{user_id}/optins/{slug}", status_code=204)
+def opt_out(user_id: int, slug: str, db: Session = Depends(get_db)):
+    svc.opt_out(db, user_id, slug)
+    return None
+
+@router.post("/anchors/{slug}/groups", response_model=GroupingResult, dependencies=[Depends(require_admin)])
+def form_groups(
+    slug: str,
+    target_size: float | None = Query(None, gt=0, description="Preferred group size (defaults to the midpoint of the bounds)"),
+    apply: bool = Query(False, description="Create the groups as formed parties and notify members"),
+    db: Session = Depends(get_db),
+):
+    """Partition the anchor's opt-in pool into similar groups within its size bounds."""
+    return svc.form_anchor_groups(db, slug, target_size, apply)
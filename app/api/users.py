@@ -1,15 +1,51 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, Query, HTTPException
-from pydantic import BaseModel, Field
+import json
+from datetime import datetime
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import Base64Bytes, BaseModel, Field, ValidationError, model_validator
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.security import require_admin
+from app.services.user_cache import user_cache
+
 from app.core.database import get_db
 from app.services import users as svc  # uses the service layer you have
 
 # ----- Schemas (Pydantic v2) -----
 
 class VectorCreate(BaseModel):
-    data: Annotated[list[float], Field(min_length=1)]
+    # Either float components (normalized + quantized server-side), the packed int8 blob (base64),
+    # or a raw embedding (e.g. 384-dim) that the server reduces with settings.REDUCER_ID.
+    data: Annotated[list[float], Field(min_length=1)] | None = None
+    b64: Base64Bytes | None = None
+    raw: Annotated[list[float], Field(min_length=1)] | None = None
+    reducer_id: str | None = None   # reducer the vector was (or is to be) reduced with; must match the server's
+
+    @model_validator(mode="after")
+    def _one_encoding(self):
+        if sum(v is not None for v in (self.data, self.b64, self.raw)) != 1:
+            raise ValueError("Provide exactly one of data, b64 or raw")
+        return self
+
+    @property
+    def value(self) -> list[float] | bytes:
+        """data/b64 as the service takes them; raw vectors go through `_vector_values` instead."""
+        return self.b64 if self.b64 is not None else self.data
+
+def _vector_values(vectors: list["VectorCreate | None"]) -> list[list[float] | bytes | None]:
+    """Service-ready value of each vector; raw ones are reduced together in one matmul."""
+    for v in vectors:
+        if v is not None:
+            svc.check_reducer_id(v.reducer_id)
+    out = [v.value if v is not None and v.raw is None else None for v in vectors]
+    raw_at = [i for i, v in enumerate(vectors) if v is not None and v.raw is not None]
+    if raw_at:
+        reduced = svc.reduce_raw_vectors([vectors[i].raw for i in raw_at])
+        for i, vec in zip(raw_at, reduced):
+            out[i] = vec.tolist()
+    return out
 
 class UserCreate(BaseModel):
     email: str  # EmailStr -> str
@@ -24,9 +60,20 @@ class UserRead(BaseModel):
     first_name: str | None = None
     vector_id: int | None = None
 
+class BulkUserRow(BaseModel):
+    index: int
+    user: UserRead | None = None
+    error: str | None = None
+
+class BulkUserResult(BaseModel):
+    created: int
+    failed: int
+    items: list[BulkUserRow]
+
 class UserList(BaseModel):
     items: list[UserRead]
-    total: int
+    total: int | None = None          # cached; None when include_total=false
+    next_after_id: int | None = None  # pass as after_id to fetch the next page
 
 class UserPatch(BaseModel):
     first_name: str | None = None
@@ -42,13 +89,31 @@ class AttachVectorRequest(BaseModel):
     vector_id: int | None = None
     vector: VectorCreate | None = None
 
+class UserNeighbor(BaseModel):
+    id: int
+    username: str
+    score: float
+
+class AnchorRecommendation(BaseModel):
+    slug: str
+    title: str
+    score: float
+    is_ghost: bool
+
+class RecommendationSet(BaseModel):
+    catalogue: str            # content key of the anchor catalogue the lists were computed against
+    computed_at: datetime
+    materialized: bool        # False: no current stored lists, computed for this request
+    anchors: list[AnchorRecommendation]
+    ghosts: list[AnchorRecommendation]
+
 # ----- Router -----
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("", response_model=UserRead, status_code=201)
 def create_user(payload: UserCreate, db: Session = Depends(get_db)):
-    vec_data = payload.vector.data if payload.vector else None
+    vec_data = _vector_values([payload.vector])[0]
     if not payload.email.lower().endswith("@uniandes.edu.co"):
         raise HTTPException(status_code=422, detail="email must be @uniandes.edu.co")
     u = svc.create_user(
@@ -60,26 +125,104 @@ def create_user(payload: UserCreate, db: Session = Depends(get_db)):
     )
     return UserRead(id=u.id, username=u.username, first_name=u.first_name, vector_id=u.vector_id)
 
+@router.post("/bulk", response_model=BulkUserResult)
+async def create_users_bulk(request: Request, db: Session = Depends(get_db)):
+    """
+    Body is a JSON array of UserCreate objects, or NDJSON (one object per line) when sent
+    as application/x-ndjson. Each row succeeds or fails on its own; all successes share one commit.
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        raw_rows = [line for line in body.splitlines() if line.strip()]
+    else:
+        try:
+            raw_rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="body must be a JSON array or NDJSON")
+        if not isinstance(raw_rows, list):
+            raise HTTPException(status_code=422, detail="body must be a JSON array or NDJSON")
+    if len(raw_rows) > settings.BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"at most {settings.BULK_MAX_ROWS} rows per request")
+
+    errors: dict[int, str] = {}
+    entries = []
+    for i, raw in enumerate(raw_rows):
+        try:
+            payload = UserCreate.model_validate_json(raw) if isinstance(raw, bytes) else UserCreate.model_validate(raw)
+        except ValidationError as e:
+            errors[i] = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            continue
+        if not payload.email.lower().endswith("@uniandes.edu.co"):
+            errors[i] = "email must be @uniandes.edu.co"
+            continue
+        if payload.vector is not None:
+            try:
+                svc.check_reducer_id(payload.vector.reducer_id)
+            except HTTPException as e:
+                errors[i] = e.detail
+                continue
+        entries.append((i, payload.email, payload.first_name, payload.vector_id, payload.vector))
+
+    # Reduce every raw vector in the request with one matmul; if that fails, retry row by row
+    # so one bad raw vector only fails its own row.
+    raw_vecs = [(n, e[4].raw) for n, e in enumerate(entries) if e[4] is not None and e[4].raw is not None]
+    reduced = {}
+    if raw_vecs:
+        try:
+            batch = await run_in_threadpool(svc.reduce_raw_vectors, [r for _, r in raw_vecs])
+            reduced = dict(zip((n for n, _ in raw_vecs), batch))
+        except HTTPException:
+            for n, r in raw_vecs:
+                try:
+                    reduced[n] = svc.reduce_raw_vectors([r])[0]
+                except HTTPException as e:
+                    errors[entries[n][0]] = e.detail
+    entries = [
+        (i, email, first_name, vector_id,
+         None if vec is None else (reduced[n].tolist() if vec.raw is not None else vec.value))
+        for n, (i, email, first_name, vector_id, vec) in enumerate(entries)
+        if i not in errors
+    ]
+
+    results = {**errors, **await run_in_threadpool(svc.create_users_bulk, db, entries)}
+    items = []
+    for i in range(len(raw_rows)):
+        r = results[i]
+        if isinstance(r, str):
+            items.append(BulkUserRow(index=i, error=r))
+        else:
+            items.append(BulkUserRow(index=i, user=UserRead(id=r.id, username=r.username, first_name=r.first_name, vector_id=r.vector_id)))
+    failed = sum(1 for it in items if it.error is not None)
+    return BulkUserResult(created=len(items) - failed, failed=failed, items=items)
+
 @router.get("", response_model=UserList)
 def list_users(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    after_id: int | None = Query(None, ge=0, description="Keyset cursor: return users with id > after_id"),
+    include_total: bool = Query(True),
     db: Session = Depends(get_db),
 ):
-    items, total = svc.list_users(db, offset=offset, limit=limit)
+    items, total = svc.list_users(db, offset=offset, limit=limit, after_id=after_id, with_total=include_total)
     return UserList(
         items=[UserRead(id=u.id, username=u.username, first_name=u.first_name, vector_id=u.vector_id) for u in items],
         total=total,
+        next_after_id=items[-1].id if len(items) == limit else None,
     )
 
+@router.get("/cache/stats", dependencies=[Depends(require_admin)])
+def user_cache_stats():
+    """Read-through user cache counters, for sizing APP_USER_CACHE_SIZE / TTL."""
+    return user_cache.stats()
+
 @router.get("/{user_id}", response_model=UserRead)
 def get_user(user_id: int, db: Session = Depends(get_db)):
-    u = svc.get_user(db, user_id)
+    u = svc.get_user_read(db, user_id)
     return UserRead(id=u.id, username=u.username, first_name=u.first_name, vector_id=u.vector_id)
 
 @router.get("/by-username/{username}", response_model=UserRead)
 def get_user_by_username(username: str, db: Session = Depends(get_db)):
-    u = svc.get_user_by_username(db, username)
+    u = svc.get_user_read_by_username(db, username)
     return UserRead(id=u.id, username=u.username, first_name=u.first_name, vector_id=u.vector_id)
 
 @router.patch("/{user_id}", response_model=UserRead)
@@ -95,6 +238,49 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
 @router.put("/{user_id}/vector", response_model=UserRead)
 def attach_vector(user_id: int, payload: AttachVectorRequest, db: Session = Depends(get_db)):
     vec_id = payload.vector_id
-    vec_data = payload.vector.data if payload.vector else None
+    vec_data = _vector_values([payload.vector])[0]
     u = svc.attach_vector(db, user_id, vector_id=vec_id, vector_data=vec_data)
     return UserRead(id=u.id, username=u.username, first_name=u.first_name, vector_id=u.vector_id)
+
+@router.get("/{user_id}/recommended-anchors", response_model=list[AnchorRecommendation])
+def recommended_anchors(
+    user_id: int,
+    k: int = Query(5, ge=1, le=50),
+    ghost: bool = Query(False, description="Recommend ghost templates instead of normal anchors"),
+    db: Session = Depends(get_db),
+):
+    recs = svc.recommend_anchors(db, user_id, k, ghost=ghost)
+    return [AnchorRecommendation(slug=a.slug, title=a.title, score=score, is_ghost=ghost) for a, score in recs]
+
+@router.get("/{user_id}/recommendations", response_model=RecommendationSet)
+def recommendations(
+    user_id: int,
+    k: int = Query(settings.RECOMMEND_K, ge=1, le=settings.RECOMMEND_K),
+    db: Session = Depends(get_db),
+):
+    """Materialized anchors and ghost templates for the user, with the catalogue key and time they were computed."""
+    recs = svc.get_recommendations(db, user_id)
+    return RecommendationSet(
+        catalogue=recs.catalogue,
+        computed_at=recs.computed_at,
+        materialized=recs.materialized,
+        anchors=[AnchorRecommendation(slug=a.slug, title=a.title, score=s, is_ghost=False) for a, s in recs.anchors[:k]],
+        ghosts=[AnchorRecommendation(slug=a.slug, title=a.title, score=s, is_ghost=True) for a, s in recs.ghosts[:k]],
+    )
+
+@router.get("/{user_id}/neighbors", response_model=list[UserNeighbor])
+def neighbors(
+    user_id: int,
+    k: int = Query(10, ge=1, le=100),
+    mode: Literal["exact", "binary"] | None = Query(None, description="Search mode; defaults to settings"),
+    db: Session = Depends(get_db),
+):
+    hits = svc.nearest_users(db, user_id, k, mode=mode)
+    return [UserNeighbor(id=uid, username=name, score=score) for uid, name, score in hits]
+
+@router.put("/{user_id}/vector/raw", response_model=UserRead)
+async def attach_vector_raw(user_id: int, request: Request, db: Session = Depends(get_db)):
+    """Attach a packed int8 vector sent as the raw application/octet-stream body."""
+    blob = await request.body()
+    u = await run_in_threadpool(svc.attach_vector, db, user_id, None, blob)
+    return UserRead(id=u.id, username=u.username, first_name=u.first_name, vector_id=u.vector_id)
@@ -0,0 +1,19 @@
+"""
+Merge byte-identical vectors in APP_DATABASE_URL into one row each and repoint users.
+Migrates the schema first (databases created before content addressing get vectors.content_hash).
+
+    uv run python -m app.commands.dedupe_vectors
+"""
+from app.core.database import SessionLocal, engine
+from app.core.schema import ensure_schema
+from app.services.vectors import compact_duplicate_vectors
+
+
+def main() -> None:
+    ensure_schema(engine)
+    with SessionLocal() as db:
+        print(compact_duplicate_vectors(db))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Embed every anchor (title, description and tags) with the spaCy model and write the raw
+vectors in bulk: one batched nlp.pipe stream, embeddings cached on disk by text hash, so
+re-running only embeds anchors whose text changed.
+
+    uv run python -m app.commands.embed_anchors --n-process 2 --reduce --set-keys
+
+--reduce also writes each reduced_vec_file with the reducer (one matmul for the catalogue);
+--set-keys appends raw_vec_file / raw_dim (and reducer_id) to YAMLs that don't declare them,
+so the loader reduces the raw vectors itself.
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from app.core.config import settings
+from app.services.anchors import AnchorDoc
+from app.services.embeddings import embed_texts
+from app.services.reducers import reduce_batch
+
+
+def anchor_text(doc: AnchorDoc) -> str:
+    return f"{doc.title}. {doc.description} {' '.join(doc.tags)}".strip()
+
+
+def _write_json(path: Path, vec: np.ndarray) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps([round(float(x), 7) for x in vec]), encoding="utf-8")
+
+
+def _append_keys(yml: Path, raw: dict, keys: dict) -> list[str]:
+    """Append the `keys` missing from the YAML document `raw`; returns the ones added."""
+    missing = {k: v for k, v in keys.items() if v is not None and k not in raw}
+    if missing:
+        text = yml.read_text(encoding="utf-8")
+        block = yaml.safe_dump(missing, sort_keys=False)
+        yml.write_text(text + ("" if text.endswith("\n") else "\n") + block, encoding="utf-8")
+    return list(missing)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dir", default="data/anchors")
+    ap.add_argument("--batch-size", type=int, default=None, help="docs per nlp.pipe batch (APP_EMBEDDING_BATCH_SIZE)")
+    ap.add_argument("--n-process", type=int, default=None, help="spaCy worker processes (APP_EMBEDDING_N_PROCESS)")
+    ap.add_argument("--no-cache", action="store_true", help="ignore and don't update the embedding cache")
+    ap.add_argument("--reduce", action="store_true", help="also write reduced_vec_file outputs")
+    ap.add_argument("--reducer-id", default=None, help="reducer for --reduce / --set-keys (APP_REDUCER_ID)")
+    ap.add_argument("--set-keys", action="store_true", help="append raw_vec_file/raw_dim/reducer_id to YAMLs")
+    args = ap.parse_args()
+
+    base = Path(args.dir)
+    docs = []
+    for yml in sorted(base.glob("*.yaml")):
+        raw = yaml.safe_load(yml.read_text(encoding="utf-8")) or {}
+        docs.append((yml, raw, AnchorDoc.model_validate(raw)))
+    if not docs:
+        print(f"no anchors in {base}")
+        return
+
+    vectors = embed_texts(
+        [anchor_text(doc) for _, _, doc in docs],
+        batch_size=args.batch_size, n_process=args.n_process, use_cache=not args.no_cache,
+    )
+    dim = vectors.shape[1]
+    reducer_id = args.reducer_id or settings.REDUCER_ID
+    reduced = None
+    if args.reduce:
+        if reducer_id is None:
+            ap.error("--reduce needs --reducer-id or APP_REDUCER_ID")
+        reduced = reduce_batch(reducer_id, vectors)
+
+    for i, (yml, raw, doc) in enumerate(docs):
+        raw_path = Path(doc.raw_vec_file or base / f"{doc.slug}.raw.json")
+        _write_json(raw_path, vectors[i])
+        if reduced is not None:
+            _write_json(Path(doc.reduced_vec_file or base / f"{doc.slug}.reduced.json"), reduced[i])
+        note = ""
+        if args.set_keys:
+            added = _append_keys(yml, raw, {
+                "raw_vec_file": str(raw_path), "raw_dim": dim, "reducer_id": reducer_id,
+            })
+            note = f" (+{', '.join(added)})" if added else ""
+        if "raw_dim" in raw and doc.raw_dim != dim:
+            note += f" WARNING: raw_dim {doc.raw_dim} != model dim {dim}"
+        print(f"{doc.slug}: {raw_path}{note}")
+    print(f"embedded {len(docs)} anchors ({dim} dims, model {settings.EMBEDDING_MODEL})")
+
+
+if __name__ == "__main__":
+    main()
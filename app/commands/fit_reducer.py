@@ -0,0 +1,67 @@
+"""
+Fit a raw -> VECTOR_DIM reducer and save it as REDUCER_DIR/<id>/{meta.json,mean.npy,components.npy}.
+Point APP_REDUCER_ID at it to have the server reduce raw vectors with it.
+
+    uv run python -m app.commands.fit_reducer --id campus-pca-v1 --method pca --texts corpus.txt
+    uv run python -m app.commands.fit_reducer --id campus-rp-v1 --method random --in-dim 300
+
+Training vectors come from --npy (an (n, in_dim) array), --texts (one text per line, embedded
+through the cache) or, by default, the anchors' raw_vec_files. PCA needs at least VECTOR_DIM
+samples; a random projection needs none (--in-dim) and only uses samples for the mean.
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from app.core.config import settings
+from app.services.anchors import AnchorDoc
+from app.services.reducers import fit_pca, fit_random, save_reducer
+
+
+def _anchor_raw_vectors(base: Path) -> np.ndarray:
+    rows = []
+    for yml in sorted(base.glob("*.yaml")):
+        doc = AnchorDoc.model_validate(yaml.safe_load(yml.read_text(encoding="utf-8")) or {})
+        if doc.raw_vec_file and Path(doc.raw_vec_file).exists():
+            rows.append(json.loads(Path(doc.raw_vec_file).read_text(encoding="utf-8")))
+    return np.asarray(rows, dtype=np.float32)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--id", required=True, help="reducer_id (immutable; refitting means a new id)")
+    ap.add_argument("--method", choices=("pca", "random"), default="pca")
+    ap.add_argument("--npy", help="training vectors, (n, in_dim) .npy")
+    ap.add_argument("--texts", help="training texts, one per line")
+    ap.add_argument("--anchors", default="data/anchors", help="fallback: the anchors' raw_vec_files")
+    ap.add_argument("--in-dim", type=int, default=None, help="raw dim for --method random without samples")
+    ap.add_argument("--out-dim", type=int, default=settings.VECTOR_DIM)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.npy:
+        raw = np.load(args.npy).astype(np.float32)
+    elif args.texts:
+        from app.services.embeddings import embed_texts
+        lines = [line.strip() for line in Path(args.texts).read_text(encoding="utf-8").splitlines()]
+        raw = embed_texts([line for line in lines if line])
+    else:
+        raw = _anchor_raw_vectors(Path(args.anchors))
+
+    if args.method == "pca":
+        mean, components = fit_pca(raw, args.out_dim)
+    else:
+        in_dim = raw.shape[1] if raw.size else args.in_dim
+        if in_dim is None:
+            ap.error("--method random needs samples or --in-dim")
+        mean, components = fit_random(in_dim, args.out_dim, args.seed, raw if raw.size else None)
+    path = save_reducer(args.id, args.method, mean, components)
+    print(f"saved {args.method} reducer {args.id!r}: {components.shape[0]} -> {components.shape[1]} dims, "
+          f"{len(raw)} samples, at {path}")
+
+
+if __name__ == "__main__":
+    main()
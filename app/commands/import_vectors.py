@@ -0,0 +1,37 @@
+"""
+Load a dump written by GET /export/vectors (NDJSON or binary, detected from the file) into
+APP_DATABASE_URL, one transaction per --batch-size records, in constant memory.
+
+    curl -H "X-Admin-Token: $TOKEN" "$HOST/export/vectors?format=binary" -o vectors.bin
+    uv run python -m app.commands.import_vectors vectors.bin
+
+Users are matched by id: existing ones get the dumped vector, and NDJSON records create
+missing users under their original id. Running servers pick the new vectors up on their next
+start (or the next shared user-matrix refresh).
+"""
+import argparse
+import sys
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.schema import ensure_schema
+from app.services.export import import_records, read_records
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", help="dump file, or - for stdin")
+    ap.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    args = ap.parse_args()
+
+    ensure_schema(engine)   # restores may target a fresh database
+    stats = None
+    f = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    with f, SessionLocal() as db:
+        for batch in read_records(f, args.batch_size):
+            stats = import_records(db, batch, stats)
+    print(stats or "empty dump")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Spawn-to-ready time of a worker, with where it goes: imports (per top-level package) and each
+lifespan step (schema check, anchors, instructions, user index, parties). Every run boots the
+app in a fresh interpreter against the configured APP_DATABASE_URL and anchor data, exactly
+as uvicorn would up to the first request, then shuts it down again.
+
+    uv run python -m app.commands.startup_report --runs 5
+    uv run python -m app.commands.startup_report --json > startup.json
+
+Running workers export the same steps as senecampus_startup_seconds{step} on /metrics.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _boot() -> None:
+    """Child: import the app, run its lifespan up to ready, print the timings."""
+    from app.main import app
+    from app.core.metrics import startup_steps
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            return time.time()
+
+    ready_at = asyncio.run(run())
+    json.dump({"ready_at": ready_at, "steps": startup_steps}, sys.stdout)
+
+
+def _import_times(stderr: str) -> dict:
+    """Self time per top-level package from -X importtime output, in seconds."""
+    totals: dict = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not self_us.isdigit():
+            continue   # header
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0.0) + int(self_us) / 1e6
+    return totals
+
+
+def measure() -> dict:
+    started = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "app.commands.startup_report", "--child"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"worker failed to start (exit {proc.returncode})")
+    out = json.loads(proc.stdout)
+    return {
+        "spawn_to_ready_s": out["ready_at"] - started,
+        "steps": out["steps"],
+        "imports": _import_times(proc.stderr),
+    }
+
+
+def _median(runs: list, key: str) -> dict:
+    names = dict.fromkeys(k for r in runs for k in r[key])   # first-seen order
+    return {k: statistics.median(r[key].get(k, 0.0) for r in runs) for k in names}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3, help="fresh workers to boot; medians are reported")
+    ap.add_argument("--top", type=int, default=12, help="packages listed by import time")
+    ap.add_argument("--json", action="store_true", help="Print the medians and every run as JSON")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _boot()
+        return
+
+    runs = [measure() for _ in range(args.runs)]
+    report = {
+        "spawn_to_ready_s": statistics.median(r["spawn_to_ready_s"] for r in runs),
+        "steps": _median(runs, "steps"),
+        "imports": _median(runs, "imports"),
+        "runs": runs,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"spawn to ready: {report['spawn_to_ready_s'] * 1000:.0f} ms (median of {args.runs})")
+    print(f"\n{'step':>18} {'ms':>8}")
+    for name in runs[0]["steps"]:   # in the order they ran
+        print(f"{name:>18} {report['steps'][name] * 1000:8.1f}")
+    print(f"\n{'package':>18} {'import ms':>10}")
+    for name, s in sorted(report["imports"].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:>18} {s * 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,17 +20,105 @@ class Settings(BaseSettings):
     ENV: Env = Env.dev
     DEBUG: bool = Field(default=True)  # overridden by APP_DEBUG
 
+    # Admin endpoints (X-Admin-Token); when unset they are only open in DEBUG
+    ADMIN_TOKEN: str | None = None
+
+    # GET /metrics (Prometheus text format); request latency/SQL accounting runs when this or DEBUG
+    # is on, and DEBUG also adds X-DB-Queries / X-DB-Time-Ms response headers
+    METRICS_ENABLED: bool = False
+
     # Database
     DATABASE_URL: str = "sqlite:///./.data/senecampus.db"
+    # SQLite engine profile, applied on every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -65536           # negative = KiB, i.e. 64 MiB page cache
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    # Route user/vector writes through one writer thread that group-commits them
+    DB_GROUP_COMMIT: bool = False
+    DB_GROUP_COMMIT_MAX_BATCH: int = 64
+    DB_GROUP_COMMIT_WAIT_MS: float = 2.0
 
     # Vectors & infra
     VECTOR_DIM: int = 128
-    
+    # User similarity search: "exact" int8 scan, or "binary" sign-code prefilter + int8 rerank
+    VECTOR_SEARCH_MODE: str = "exact"
+    VECTOR_SEARCH_CANDIDATES: int = 512   # rows kept by the binary prefilter (see benchmarks/vector_search.py)
+    # With several workers, share one mmapped user matrix published under this directory
+    # (empty string: every worker loads its own copy). Other workers' writes become visible
+    # when the matrix is republished, every USER_MATRIX_REFRESH_S; workers check every USER_MATRIX_CHECK_S.
+    USER_MATRIX_DIR: str = ""
+    USER_MATRIX_REFRESH_S: float = 60.0
+    USER_MATRIX_CHECK_S: float = 1.0
+
+    # Raw -> VECTOR_DIM reducers live in REDUCER_DIR/<reducer_id>/. REDUCER_ID is the one this
+    # deployment uses: raw vectors from clients and anchors are reduced with it, and any vector
+    # tagged with a different reducer_id is rejected.
+    REDUCER_DIR: str = "data/reducers"
+    REDUCER_ID: str | None = None
+
+    # Text embeddings (spaCy, loaded on first use) and their on-disk cache (empty string disables)
+    EMBEDDING_MODEL: str = "en_core_web_md"
+    EMBEDDING_BATCH_SIZE: int = 256
+    EMBEDDING_N_PROCESS: int = 1
+    EMBEDDING_CACHE_DIR: str = ".data/embeddings"
+
+    # Anchors: compiled catalogue snapshot reused across starts (empty string disables)
+    ANCHOR_SNAPSHOT_DIR: str = ".data/anchor-snapshot"
+    # Poll data/anchors for edits and hot-reload them (seconds; 0 disables the watcher)
+    ANCHOR_RELOAD_INTERVAL_S: float = 5.0
+
+    # GET /users total: cached count refreshed at most this often (seconds)
+    USER_COUNT_TTL_S: float = 30.0
+
+    # Read-through cache for GET /users/{id} and /users/by-username/{username}
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL_S: float = 60.0
+
+    # Max rows accepted by POST /users/bulk
+    BULK_MAX_ROWS: int = 10_000
+
+    # Users per streamed chunk of GET /export/vectors (and per transaction of the import command)
+    EXPORT_BATCH_SIZE: int = 5_000
+
     # Limit for mailbox request length
     MAILBOX_DEFAULT_LIMIT: int = 5
     MAILBOX_MAX_LIMIT: int = 20
-    
+
+    # Messages older than this are hidden from reads and purged by the retention sweeper (0 keeps all)
     MAILBOX_RETENTION_HOURS: int = 18
+    # Sweeper: rows deleted per batch (one short write transaction each), pause between batches so
+    # live writers get the lock, and max batches per pass; the rest waits for the next pass
+    MAILBOX_SWEEP_INTERVAL_S: float = 60.0
+    MAILBOX_SWEEP_BATCH: int = 500
+    MAILBOX_SWEEP_PAUSE_MS: float = 20.0
+    MAILBOX_SWEEP_MAX_BATCHES: int = 200
+    # Pages handed back by PRAGMA incremental_vacuum after each pass (0 = off; needs auto_vacuum=INCREMENTAL)
+    MAILBOX_SWEEP_VACUUM_PAGES: int = 0
+
+    # In-process ring of recent messages per user (0 disables), kept for the most recently read
+    # MAILBOX_RING_USERS users; a read the ring covers is answered without a query
+    MAILBOX_RING_SIZE: int = 32
+    MAILBOX_RING_USERS: int = 10_000
+    # Long-poll / SSE: max time a request stays parked waiting for a message, and how often the
+    # worker checks the DB for posts made by other workers (one grouped query for all its
+    # parked requests). A ring the DB confirmed within that interval answers reads by itself.
+    MAILBOX_WAIT_MAX_S: float = 30.0
+    MAILBOX_WAIT_POLL_S: float = 2.0
+    MAILBOX_SSE_KEEPALIVE_S: float = 15.0
+
+    # Materialized recommendations: anchors/ghosts kept per user, and users per refresh batch
+    RECOMMEND_K: int = 50
+    RECOMMEND_BATCH: int = 2_000
+    # Delay before a worker retries a refresh pass that failed or that another worker was running
+    RECOMMEND_RETRY_S: float = 30.0
+
+    # Ghost parties: users invited when a party starts (the most similar to the ghost anchor)
+    PARTY_INVITE_FANOUT: int = 50
+    PARTY_INVITE_MAX: int = 500
 
     # Derived/convenience
     @property
@@ -1,13 +1,91 @@
-from sqlalchemy import create_engine
+import fcntl
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.core.config import settings
 
-# SQLite needs this flag for multi-threaded servers
-connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(settings.DATABASE_URL, echo=False, future=True, connect_args=connect_args)
+def _sqlite_pragmas() -> list[str]:
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+    ]
+
+
+def make_engine(url: str, *, tuned: bool = True) -> Engine:
+    """
+    Engine for `url`. For SQLite files, `tuned` applies the Settings profile on every new
+    connection (WAL, synchronous, busy_timeout, cache/mmap sizes) and sizes the pool;
+    `tuned=False` is the bare engine, kept for benchmarks.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=False, future=True)
+
+    # SQLite needs this flag for multi-threaded servers
+    connect_args = {"check_same_thread": False}
+    if not tuned:
+        return create_engine(url, echo=False, future=True, connect_args=connect_args)
+
+    pool_args = {}
+    if ":memory:" not in url and "mode=memory" not in url:
+        pool_args = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+    eng = create_engine(url, echo=False, future=True, connect_args=connect_args, **pool_args)
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(eng, "connect")
+    def _apply_profile(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cur.execute(pragma)
+        cur.close()
+
+    return eng
+
+
+engine = make_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+
+@contextmanager
+def database_lock(name: str, blocking: bool = True, bind: Optional[Engine] = None) -> Iterator[bool]:
+    """
+    Cross-process lock `name` on the database (`bind`, default the app engine): a file lock next
+    to a SQLite database, an advisory lock on PostgreSQL, always granted otherwise. Yields False
+    if `blocking` is off and another process holds it.
+    """
+    url = (bind or engine).url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        with open(f"{url.database}.{name}.lock", "a+") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    elif url.get_backend_name() == "postgresql":
+        key = {"key": f"senecampus-{name}"}
+        with (bind or engine).connect() as conn:
+            if blocking:
+                conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), key)
+            elif not conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), key).scalar():
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), key)
+    else:
+        yield True
+
 class Base(DeclarativeBase):
     pass
 
@@ -0,0 +1,251 @@
+from __future__ import annotations
+import contextvars
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Dependency-free metrics in the Prometheus text format (0.0.4). Everything on the request path
+# is a perf_counter pair, a bisect and a few adds under a lock; collectors that need to look
+# at other modules (catalogue size, caches, threadpool) only run when /metrics is scraped.
+
+Labels = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Labels, values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Labels = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, list] = {}   # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._series.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, float]]]):
+        """
+        Register `fn`, called on every scrape, yielding (name, type, help, value) samples
+        (gauges or counters without labels) read from other modules.
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self, extra: Iterable[Tuple[str, str, str, float]] = ()) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines += m.render()
+        samples = list(extra)
+        for fn in self._collectors:
+            samples += list(fn())
+        for name, kind, help, value in samples:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_num(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "senecampus_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"),
+))
+REQUEST_QUERIES = registry.register(Counter(
+    "senecampus_db_queries_total", "SQL statements executed, by route template.", ("route",),
+))
+REQUEST_DB_TIME = registry.register(Counter(
+    "senecampus_db_seconds_total", "Time spent executing SQL statements, by route template.", ("route",),
+))
+ANCHOR_LOADS = registry.register(Counter(
+    "senecampus_anchor_loads_total", "Anchor catalogue loads and hot-reloads that published.", ("kind",),
+))
+ANCHOR_LOAD_SECONDS = registry.register(Gauge(
+    "senecampus_anchor_load_seconds", "Duration of the last anchor catalogue load, by kind.", ("kind",),
+))
+STARTUP_SECONDS = registry.register(Gauge(
+    "senecampus_startup_seconds", "This worker's startup, by step; 'ready' is from importing app to serving.", ("step",),
+))
+
+
+# ---- startup ----
+# Step -> seconds, in the order they ran, for the startup report (app/commands/startup_report.py).
+startup_steps: Dict[str, float] = {}
+
+
+def record_startup(step: str, seconds: float) -> None:
+    startup_steps[step] = seconds
+    STARTUP_SECONDS.set(seconds, (step,))
+
+
+@contextmanager
+def startup_step(step: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup(step, time.perf_counter() - start)
+
+
+# ---- per-request SQL accounting ----
+# One [queries, seconds] cell per request, in a context variable: sync endpoints run in the
+# threadpool with a copy of the request context, which still points at the same cell.
+
+_DB_STATS: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("db_stats", default=None)
+_hooked = False
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    cell = _DB_STATS.get()
+    if cell is not None:
+        cell[0] += 1
+        start = getattr(context, "_metrics_start", None)
+        if start is not None:
+            cell[1] += time.perf_counter() - start
+
+
+def instrument_sql() -> None:
+    """Count statements and their time for the current request, on every engine."""
+    global _hooked
+    if not _hooked:
+        event.listen(Engine, "before_cursor_execute", _before_execute)
+        event.listen(Engine, "after_cursor_execute", _after_execute)
+        _hooked = True
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task hop): records each request's latency
+    under its route template and the SQL work done for it. With `debug_headers`, responses
+    also carry X-DB-Queries / X-DB-Time-Ms (SQL run before the headers went out).
+    """
+
+    def __init__(self, app, debug_headers: bool = False):
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        cell = [0, 0.0]
+        token = _DB_STATS.set(cell)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if self.debug_headers:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(cell[0]).encode()))
+                    headers.append((b"x-db-time-ms", f"{cell[1] * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _DB_STATS.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.observe(elapsed, (scope["method"], path, str(status[0])))
+            if cell[0]:
+                REQUEST_QUERIES.inc((path,), cell[0])
+                REQUEST_DB_TIME.inc((path,), cell[1])
+
+
+def threadpool_samples() -> List[Tuple[str, str, str, float]]:
+    """AnyIO default threadpool (sync endpoints, run_in_threadpool) occupancy; call on the event loop."""
+    from anyio.to_thread import current_default_thread_limiter
+
+    stats = current_default_thread_limiter().statistics()
+    return [
+        ("senecampus_threadpool_busy", "gauge", "Worker threads in use.", stats.borrowed_tokens),
+        ("senecampus_threadpool_size", "gauge", "Worker thread limit.", stats.total_tokens),
+        ("senecampus_threadpool_queued", "gauge", "Tasks waiting for a worker thread.", stats.tasks_waiting),
+    ]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import logging
+import re
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# The schema belongs to the Alembic migrations in migrations/ (alembic.ini at the repo root).
+# Revision ids are zero-padded sequence numbers and version files are named <rev>_<slug>.py,
+# so a worker finds the newest revision from a directory listing and, when the database is
+# already there, starts without importing Alembic or reflecting a single table.
+
+ROOT = Path(__file__).resolve().parents[2]
+MIGRATIONS_DIR = ROOT / "migrations"
+BASELINE = "0001"   # the schema create_all used to build, for adopting pre-migration databases
+_VERSION_FILE = re.compile(r"^(\d{4})_\w+\.py$")
+
+
+def import_models() -> None:
+    """Register every mapped table on Base.metadata."""
+    from app.models import anchor_optin, mailbox, party, recommendation, user, vector  # noqa: F401
+
+
+def head_revision() -> str:
+    revs = [m.group(1) for m in map(_VERSION_FILE.match, (p.name for p in (MIGRATIONS_DIR / "versions").iterdir())) if m]
+    if not revs:
+        raise RuntimeError(f"no migrations under {MIGRATIONS_DIR / 'versions'}")
+    return max(revs)
+
+
+def current_revision(conn: Connection) -> Optional[str]:
+    """The database's Alembic revision; None if it has never been migrated."""
+    try:
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        conn.rollback()
+        return None
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    cfg = Config()   # no ini file: migrations/env.py leaves the app's logging alone
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return cfg
+
+
+def _adopt_legacy(engine: Engine) -> None:
+    """
+    Bring a database built by create_all (before migrations) up to the baseline schema:
+    the content_hash column, then any table or index create_all never added to it.
+    """
+    from app.core.database import Base
+    from app.services.vectors import ensure_hash_column
+
+    import_models()
+    ensure_hash_column(engine)
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def ensure_schema(engine: Engine) -> str:
+    """
+    Migrate the database to the newest revision. Returns "current" (nothing to do: one
+    SELECT), "adopted" (pre-migration database stamped at the baseline, then upgraded) or
+    "upgraded".
+    """
+    head = head_revision()
+    with engine.connect() as conn:
+        if current_revision(conn) == head:
+            return "current"
+
+    from alembic import command
+    from alembic.script import ScriptDirectory
+
+    cfg = _alembic_config()
+    script_head = ScriptDirectory.from_config(cfg).get_current_head()
+    if script_head != head:
+        raise RuntimeError(f"migration head {script_head!r} != newest version file {head!r}; see alembic.ini")
+
+    from app.core.database import database_lock
+
+    with database_lock("migrations", bind=engine):   # one migrating worker at a time
+        with engine.connect() as conn:
+            rev = current_revision(conn)
+        if rev == head:   # another worker got there first
+            return "current"
+        action = "upgraded"
+        if rev is None and inspect(engine).has_table("users"):
+            logger.info("adopting pre-migration database at revision %s", BASELINE)
+            _adopt_legacy(engine)
+            with engine.begin() as conn:
+                cfg.attributes["connection"] = conn
+                command.stamp(cfg, BASELINE)
+            action = "adopted"
+        with engine.begin() as conn:
+            cfg.attributes["connection"] = conn
+            command.upgrade(cfg, "head")
+    logger.info("database schema %s -> %s", rev or "empty", head)
+    return action
@@ -0,0 +1,14 @@
+import secrets
+from fastapi import Header, HTTPException
+from app.core.config import settings
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """
+    Dependency for admin endpoints. With APP_ADMIN_TOKEN set, the X-Admin-Token header must match;
+    without it, admin endpoints are only open in DEBUG.
+    """
+    if settings.ADMIN_TOKEN:
+        if not secrets.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+            raise HTTPException(status_code=403, detail="admin token required")
+    elif not settings.DEBUG:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled")
@@ -0,0 +1,134 @@
+from __future__ import annotations
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+# Generations of named arrays that several processes map read-only, zero-copy.
+#
+#   <dir>/header.json          {"format", "generation", "created_ns", "arrays": {name: {file, dtype, shape}}, "meta"}
+#   <dir>/<name>-<gen>.npy     one file per array and generation
+#
+# A publisher writes the .npy files first and then replaces header.json, so header.json is
+# the commit point: readers see either the old generation or the new one, never a mix.
+# Files of older generations are unlinked two generations later; processes that still map
+# them keep their pages until they move on.
+
+_FORMAT = 1
+_HEADER = "header.json"
+
+
+class SharedArrays(NamedTuple):
+    generation: int
+    created_ns: int
+    arrays: Dict[str, np.ndarray]   # read-only memory-mapped views
+    meta: dict
+
+
+@contextmanager
+def publish_lock(directory: Path, blocking: bool = True) -> Iterator[bool]:
+    """Cross-process lock on `directory`; yields False if `blocking` is off and it is taken."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "a+") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_header(directory: Path) -> Optional[dict]:
+    try:
+        header = json.loads((directory / _HEADER).read_bytes())
+    except (OSError, ValueError):
+        return None
+    return header if header.get("format") == _FORMAT else None
+
+
+def publish(directory: Path, arrays: Dict[str, np.ndarray], meta: Optional[dict] = None) -> int:
+    """Write `arrays` as the next generation under `directory`; returns its number. Hold `publish_lock`."""
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = read_header(directory)
+    generation = (previous["generation"] if previous else 0) + 1
+    tmp = f".tmp-{os.getpid()}"
+    entries = {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        fname = f"{name}-{generation}.npy"
+        with open(directory / (fname + tmp), "wb") as f:
+            np.save(f, arr)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(directory / (fname + tmp), directory / fname)
+        entries[name] = {"file": fname, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+    header = {
+        "format": _FORMAT,
+        "generation": generation,
+        "created_ns": time.time_ns(),
+        "arrays": entries,
+        "meta": meta or {},
+    }
+    (directory / (_HEADER + tmp)).write_text(json.dumps(header), encoding="utf-8")
+    os.replace(directory / (_HEADER + tmp), directory / _HEADER)   # commit point
+
+    for stale in directory.glob("*-*.npy"):
+        gen = stale.stem.rsplit("-", 1)[-1]
+        if gen.isdigit() and int(gen) < generation - 1:
+            stale.unlink(missing_ok=True)
+    return generation
+
+
+def attach(directory: Path) -> Optional[SharedArrays]:
+    """Map the current generation read-only, or None if there is none (or it vanished mid-attach)."""
+    header = read_header(directory)
+    if header is None:
+        return None
+    arrays = {}
+    try:
+        for name, entry in header["arrays"].items():
+            arr = np.load(directory / entry["file"], mmap_mode="r")
+            if arr.dtype.str != entry["dtype"] or list(arr.shape) != entry["shape"]:
+                return None
+            arrays[name] = arr
+    except (OSError, ValueError, KeyError):
+        return None
+    return SharedArrays(header["generation"], header["created_ns"], arrays, header.get("meta", {}))
+
+
+class SharedArraysReader:
+    """
+    Follows the generations published under `directory`. `poll()` is one stat of
+    header.json; it re-attaches only when that file was replaced.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.current: Optional[SharedArrays] = None
+        self._stamp: Optional[tuple] = None
+
+    def poll(self) -> Optional[SharedArrays]:
+        """Return the newer generation if one was published since the last call, else None."""
+        try:
+            st = os.stat(self.directory / _HEADER)
+        except OSError:
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return None
+        shared = attach(self.directory)
+        if shared is None:
+            return None
+        self._stamp = stamp
+        if self.current is not None and shared.generation <= self.current.generation:
+            return None
+        self.current = shared
+        return shared
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+T = TypeVar("T")
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread for SQLite. Concurrent callers `submit` a job (a function of a Session
+    that must not commit); the thread drains up to `max_batch` queued jobs, waiting at most
+    `max_wait_s` for stragglers, runs each inside its own SAVEPOINT so one failing job does not
+    abort the rest, and commits the whole batch once. Callers block until their batch commits.
+    """
+
+    def __init__(self, session_factory: sessionmaker, max_batch: int = 64, max_wait_s: float = 0.002):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self._queue: queue.Queue[Optional[tuple[Callable[[Session], object], Future]]] = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.jobs = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name="db-group-commit", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self.running:
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, fn: Callable[[Session], T]) -> T:
+        fut: Future = Future()
+        self._queue.put((fn, fut))
+        return fut.result()
+
+    def _drain(self, first) -> tuple[list, bool]:
+        batch, stop = [first], False
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._drain(first)
+            done: list[tuple[Future, object]] = []
+            with self.session_factory(expire_on_commit=False) as db:
+                for fn, fut in batch:
+                    try:
+                        with db.begin_nested():
+                            done.append((fut, fn(db)))
+                    except BaseException as e:
+                        fut.set_exception(e)
+                try:
+                    db.commit()
+                except BaseException as e:
+                    for fut, _ in done:
+                        fut.set_exception(e)
+                    done = []
+            for fut, result in done:
+                fut.set_result(result)
+            self.batches += 1
+            self.jobs += len(batch)
+            if stop:
+                return
+
+
+def make_writer(session_factory: sessionmaker) -> GroupCommitWriter:
+    return GroupCommitWriter(
+        session_factory,
+        max_batch=settings.DB_GROUP_COMMIT_MAX_BATCH,
+        max_wait_s=settings.DB_GROUP_COMMIT_WAIT_MS / 1000.0,
+    )
+
+
+# Started by the app lifespan when settings.DB_GROUP_COMMIT is on.
+writer = make_writer(SessionLocal)
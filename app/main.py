@@ -1,20 +1,61 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app import IMPORTED_AT
 from app.core.config import settings
 from app.api import api
-from app.services.anchors import load_anchors
+from app.services.anchors import load_anchors, watch_anchors
+from app.services.instructions import load_instructions
+from app.services.user_index import load_user_index, watch_user_matrix
+from app.services.mailbox import watch_mailbox_retention, watch_mailbox_waiters
+from app.services.parties import load_open_parties, run_party_expiry
+from app.services.recommendations import run_recommendation_refresh
 
-from app.core.database import Base, engine
+from app.core.database import engine, SessionLocal
+from app.core.metrics import MetricsMiddleware, instrument_sql, record_startup, startup_step
+from app.core.schema import ensure_schema
+from app.core.writer import writer
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)  # mappings already imported
-    load_anchors()
+    record_startup("import", time.perf_counter() - IMPORTED_AT)
+    with startup_step("schema"):
+        ensure_schema(engine)   # one SELECT when the database is already at the newest migration
+    with startup_step("anchors"):
+        load_anchors()
+    with startup_step("instructions"):
+        load_instructions()
+    with SessionLocal() as db:
+        with startup_step("user_index"):
+            load_user_index(db)
+        with startup_step("parties"):
+            load_open_parties(db)
+    if settings.DB_GROUP_COMMIT:
+        writer.start()
+    tasks = [
+        asyncio.create_task(run_party_expiry()),
+        asyncio.create_task(run_recommendation_refresh()),
+        asyncio.create_task(watch_mailbox_waiters(settings.MAILBOX_WAIT_POLL_S)),
+    ]
+    if settings.ANCHOR_RELOAD_INTERVAL_S > 0:
+        tasks.append(asyncio.create_task(watch_anchors(settings.ANCHOR_RELOAD_INTERVAL_S)))
+    if settings.MAILBOX_RETENTION_HOURS > 0 and settings.MAILBOX_SWEEP_INTERVAL_S > 0:
+        tasks.append(asyncio.create_task(watch_mailbox_retention(settings.MAILBOX_SWEEP_INTERVAL_S)))
+    if settings.USER_MATRIX_DIR:
+        tasks.append(asyncio.create_task(watch_user_matrix(settings.USER_MATRIX_CHECK_S)))
+    record_startup("ready", time.perf_counter() - IMPORTED_AT)
     yield
+    for t in tasks:
+        t.cancel()
+    writer.stop()
     engine.dispose()
 
 app = FastAPI(title=settings.PROJECT_NAME, debug=settings.DEBUG, lifespan=lifespan)
 app.include_router(api)
+if settings.METRICS_ENABLED or settings.DEBUG:
+    instrument_sql()
+    app.add_middleware(MetricsMiddleware, debug_headers=settings.DEBUG)
 
 from fastapi.staticfiles import StaticFiles
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -0,0 +1,16 @@
+from datetime import datetime, timezone
+from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+class AnchorOptIn(Base):
+    """A user waiting to be grouped for a normal anchor by the batch solver."""
+    __tablename__ = "anchor_optins"
+
+    anchor_slug: Mapped[str] = mapped_column(String(120), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, Text, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+class MailboxMessage(Base):
+    __tablename__ = "mailbox_messages"
+    __table_args__ = (
+        # Mailbox reads are "user X, id > since, ascending": served straight from this index
+        Index("ix_mailbox_messages_user_id_id", "user_id", "id"),
+        # The retention sweeper walks expired rows oldest-first through this one
+        Index("ix_mailbox_messages_created_at", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False, default="notice")
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    data: Mapped[dict | None] = mapped_column(JSON, nullable=True)   # structured extras (e.g. party id)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
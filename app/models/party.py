@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+class Party(Base):
+    """A ghost-anchor session started by one user; others join until the window closes."""
+    __tablename__ = "parties"
+    __table_args__ = (
+        # Startup reschedules the open parties' expiry from this
+        Index("ix_parties_status_expires_at", "status", "expires_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    anchor_slug: Mapped[str] = mapped_column(String(120), nullable=False)
+    initiator_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="open")  # open | formed | expired
+
+    min_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    max_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    member_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)   # initiator included
+    invited_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+class PartyMember(Base):
+    __tablename__ = "party_members"
+
+    party_id: Mapped[int] = mapped_column(ForeignKey("parties.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    joined_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+class PartyInvite(Base):
+    """Users invited to a ghost party when it started; only they (and the initiator) may join."""
+    __tablename__ = "party_invites"
+
+    party_id: Mapped[int] = mapped_column(ForeignKey("parties.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+class UserRecommendation(Base):
+    """
+    Materialized top-k anchors and ghost templates for one user, valid while the user still
+    has `vector_id` and the published catalogue still has content key `catalogue`.
+    """
+    __tablename__ = "user_recommendations"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    vector_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    catalogue: Mapped[str] = mapped_column(String(16), nullable=False, index=True)
+    anchors: Mapped[list] = mapped_column(JSON, nullable=False)   # [[slug, score], ...] best first
+    ghosts: Mapped[list] = mapped_column(JSON, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
@@ -10,8 +10,8 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(120), nullable=False, index=True)  # local-part only, lowercase
     first_name: Mapped[str | None] = mapped_column(String(120), nullable=True)
 
-    vector_id: Mapped[int | None] = mapped_column(ForeignKey("vectors.id", ondelete="SET NULL"))
-    vector = relationship("Vector", lazy="joined")
+    vector_id: Mapped[int | None] = mapped_column(ForeignKey("vectors.id", ondelete="SET NULL"), index=True)
+    vector = relationship("Vector", lazy="select")  # blob loaded only when a path actually needs it
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
 
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import Integer, DateTime, LargeBinary
+from sqlalchemy import Integer, String, DateTime, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from app.core.database import Base
 
@@ -10,6 +10,8 @@ class Vector(Base):
     dim: Mapped[int] = mapped_column(Integer, nullable=False)
     # 1 byte per dimension (int8), packed contiguously
     data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # blake2b-128 of the packed blob; identical vectors share one row (NULL on rows not yet backfilled)
+    content_hash: Mapped[str | None] = mapped_column(String(32), nullable=True, index=True, unique=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
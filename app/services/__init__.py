@@ -1,3 +1,7 @@
 from . import users  # noqa: F401
 from . import vectors # noqa: F401
-from . import anchors # noqa: F401
\ No newline at end of file
+from . import anchors # noqa: F401
+from . import user_index # noqa: F401
+from . import instructions # noqa: F401
+from . import mailbox # noqa: F401
+from . import parties # noqa: F401
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+# Inverted indexes over one published anchor tuple. Postings are Python ints used as bitsets
+# (bit i = row i of the tuple), so AND/OR over tags and query words are single big-int ops,
+# and a catalogue of thousands of anchors costs a few hundred bytes per posting.
+
+PREFIX_MIN = 2   # query words at least this long also match the words they are a prefix of
+_WORD = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Case- and accent-insensitive form: "Fútbol" -> "futbol"."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(fold(text))
+
+
+class SearchIndex:
+    """Tag index and title/description word postings for `anchors`, keyed by row."""
+
+    __slots__ = ("size", "tags", "words", "vocab")
+
+    def __init__(self, anchors: Sequence):
+        self.size = len(anchors)
+        tags: Dict[str, List[int]] = {}
+        words: Dict[str, List[int]] = {}
+        for row, a in enumerate(anchors):
+            for tag in {fold(t.strip()) for t in a.tags}:
+                tags.setdefault(tag, []).append(row)
+            for word in set(tokenize(a.title) + tokenize(a.description)):
+                words.setdefault(word, []).append(row)
+        self.tags = {k: self._mask(v) for k, v in tags.items()}
+        self.words = {k: self._mask(v) for k, v in words.items()}
+        self.vocab = sorted(self.words)   # for prefix ranges
+
+    def _mask(self, rows: List[int]) -> int:
+        bits = np.zeros(self.size, dtype=bool)
+        bits[rows] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    @property
+    def everything(self) -> int:
+        return (1 << self.size) - 1
+
+    def tag_mask(self, tags: Iterable[str], match_all: bool = True) -> int:
+        masks = [self.tags.get(fold(t.strip()), 0) for t in tags]
+        if not masks:
+            return self.everything
+        out = masks[0]
+        for m in masks[1:]:
+            out = out & m if match_all else out | m
+        return out
+
+    def word_mask(self, word: str) -> int:
+        mask = self.words.get(word, 0)
+        if len(word) >= PREFIX_MIN:
+            lo = bisect_left(self.vocab, word)
+            hi = bisect_left(self.vocab, word + "\U0010ffff", lo)
+            for w in self.vocab[lo:hi]:
+                mask |= self.words[w]
+        return mask
+
+    def text_mask(self, q: str) -> int:
+        """Rows whose title/description contain every word of `q` (as a word or word prefix)."""
+        out = self.everything
+        for word in tokenize(q):
+            out &= self.word_mask(word)
+            if not out:
+                break
+        return out
+
+    def rows(self, mask: int) -> np.ndarray:
+        """Ascending row numbers set in `mask`."""
+        if not mask:
+            return np.zeros(0, dtype=np.int64)
+        bits = np.unpackbits(np.frombuffer(mask.to_bytes((self.size + 7) // 8, "little"), dtype=np.uint8), bitorder="little")
+        return np.flatnonzero(bits[: self.size])
@@ -1,15 +1,42 @@
 from __future__ import annotations
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import TYPE_CHECKING, Callable, Optional, Dict, List, NamedTuple, Sequence, Tuple
+import asyncio
+import hashlib
 import json
-import yaml
+import logging
+import os
+import threading
+import time
+
+if TYPE_CHECKING:
+    import numpy as np   # imported where used, so importing this module stays cheap
 from pydantic import BaseModel, Field, ValidationError
 
 from app.core.config import settings
+from app.core.metrics import ANCHOR_LOAD_SECONDS, ANCHOR_LOADS
+from app.core.shared_arrays import publish_lock
+from app.services.anchor_search import SearchIndex
+from app.services.reducers import reduce_batch, reducer_path
+from app.services.vectors import quantize_int8_normalized
+
+logger = logging.getLogger(__name__)
 
 # ---- In-memory caches ----
 _ANCHORS: Dict[str, "Anchor"] = {}   # normal anchors
 _GHOSTS: Dict[str, "Anchor"] = {}    # ghost templates
+_ANCHOR_MATRIX: "AnchorMatrix"       # scoring snapshot for _ANCHORS (set by _publish)
+_GHOST_MATRIX: "AnchorMatrix"        # scoring snapshot for _GHOSTS (set by _publish)
+_VERSION = 0                         # bumped by every _publish; keys derived caches
+_CATALOGUE: "Catalogue"              # both matrices as one consistent pair, plus their content key
+_LISTENERS: List[Callable[[], None]] = []   # called after every _publish
+
+# ---- Loader state, for incremental reloads ----
+_BASE: Optional[Path] = None         # directory the catalogue was loaded from
+_FILES: Dict[str, "Anchor"] = {}     # yaml path -> anchor parsed from it
+_SOURCES: Dict[str, list] = {}       # every file read -> [mtime_ns, size, sha256]
+_RELOAD_LOCK = threading.Lock()
 
 
 # ---- File schema ----
@@ -45,107 +72,485 @@ class Anchor(BaseModel):
     title: str
     description: str
     tags: List[str]
-    reduced: List[float]          # len == settings.VECTOR_DIM (may be empty if not provided)
+    reduced: Sequence[float]      # len == settings.VECTOR_DIM, empty if not provided; a read-only
+                                  # row of the mapped matrix when loaded from the snapshot
+    reduced_i8: bytes = b""       # `reduced` packed like user vectors (unit-norm int8), served as-is
     meta: dict                    # includes sizes, ghost flags, instructions, etc.
 
 
+class AnchorMatrix(NamedTuple):
+    """
+    Read-only scoring snapshot: row i of `matrix` is the unit reduced vector of `anchors[i]`,
+    and `search` indexes the same rows by tag and title/description words.
+    """
+    anchors: Tuple[Anchor, ...]
+    matrix: np.ndarray            # (n, VECTOR_DIM) float32; zero rows for anchors without a vector
+    has_vector: np.ndarray        # (n,) bool; rows without a vector score -inf and are never ranked
+    search: Optional[SearchIndex] = None
+
+
+class Catalogue(NamedTuple):
+    key: str                      # content digest of both matrices: equal across workers and restarts
+    anchors: AnchorMatrix
+    ghosts: AnchorMatrix
+
+
+def _catalogue_key(*matrices: AnchorMatrix) -> str:
+    import numpy as np
+    h = hashlib.sha256()
+    for m in matrices:
+        h.update("\0".join(a.slug for a in m.anchors).encode("utf-8") + b"\1")
+        h.update(np.ascontiguousarray(m.matrix).tobytes())
+        h.update(m.has_vector.tobytes())
+    return h.hexdigest()[:16]
+
+
 # ---- Loader helpers ----
-def _read_json_floats(path: Path) -> List[float]:
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+def _read_json_floats(path: Path, content: Optional[bytes] = None) -> List[float]:
+    data = json.loads(content if content is not None else path.read_bytes())
     if not isinstance(data, list):
         raise ValueError(f"{path} must be a JSON array")
     return [float(x) for x in data]
 
 
-def load_anchors(dir_path: str = "data/anchors") -> dict[str, Anchor]:
-    base = Path(dir_path)
-    if not base.exists():
-        # No anchors dir yet; clear caches and return empty
-        _publish({}, {})
-        return {}
+def _fingerprint(path: Path, content: bytes) -> list:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size, hashlib.sha256(content).hexdigest()]
 
-    normals: Dict[str, Anchor] = {}
-    ghosts: Dict[str, Anchor] = {}
 
-    for yml in sorted(base.glob("*.yaml")):
-        raw = yaml.safe_load(yml.read_text(encoding="utf-8")) or {}
-        try:
-            doc = AnchorDoc.model_validate(raw)
-        except ValidationError as e:
-            raise RuntimeError(f"Invalid anchor doc {yml}: {e}") from e
-
-        # Reduced vector (optional but validated if present)
-        reduced: List[float] = []
-        if doc.reduced_vec_file:
-            vec_path = Path(doc.reduced_vec_file)
-            if not vec_path.exists():
-                raise RuntimeError(f"{doc.slug}: missing reduced_vec_file: {vec_path}")
-            reduced = _read_json_floats(vec_path)
-            if len(reduced) != doc.reduced_dim:
-                raise RuntimeError(f"{doc.slug}: reduced_vec length {len(reduced)} != {doc.reduced_dim}")
-            if doc.reduced_dim != settings.VECTOR_DIM:
-                raise RuntimeError(
-                    f"{doc.slug}: reduced_dim {doc.reduced_dim} != settings.VECTOR_DIM {settings.VECTOR_DIM}"
-                )
-
-        # Sizes
-        if doc.is_ghost:
-            mn = doc.min_size or 2
-            mx = doc.max_size or 4
-            join_window = doc.join_window_min or 15
+def _unchanged(path: Path, fp: list) -> bool:
+    """Cheap stat check first; only hash when mtime moved but the size did not."""
+    st = path.stat()
+    if [st.st_mtime_ns, st.st_size] == fp[:2]:
+        return True
+    return st.st_size == fp[1] and hashlib.sha256(path.read_bytes()).hexdigest() == fp[2]
+
+
+def _parse_anchor(yml: Path, sources: Dict[str, list]) -> Tuple[Anchor, Optional[List[float]]]:
+    """
+    Parse and validate one anchor YAML, recording source fingerprints. Returns the anchor and,
+    when it ships a raw vector instead, that vector: `_parse_files` reduces those in batch.
+    """
+    import numpy as np
+    import yaml   # only needed when the snapshot is missing or stale
+
+    content = yml.read_bytes()
+    sources[str(yml)] = _fingerprint(yml, content)
+    try:
+        # libyaml's loader when PyYAML was built with it: same documents, several times faster
+        raw = yaml.load(content.decode("utf-8"), Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+        doc = AnchorDoc.model_validate(raw)
+    except (yaml.YAMLError, ValidationError) as e:
+        raise RuntimeError(f"Invalid anchor doc {yml}: {e}") from e
+
+    if doc.reducer_id and settings.REDUCER_ID and doc.reducer_id != settings.REDUCER_ID:
+        raise RuntimeError(
+            f"{doc.slug}: reducer_id {doc.reducer_id!r} != settings.REDUCER_ID {settings.REDUCER_ID!r}"
+        )
+    reducer_id = doc.reducer_id or (settings.REDUCER_ID if doc.raw_vec_file else None)
+
+    # Raw vector (reduced server-side; takes precedence over reduced_vec_file)
+    raw_vec: Optional[List[float]] = None
+    if doc.raw_vec_file:
+        if reducer_id is None:
+            raise RuntimeError(f"{doc.slug}: raw_vec_file needs a reducer_id (or settings.REDUCER_ID)")
+        raw_path = Path(doc.raw_vec_file)
+        if not raw_path.exists():
+            raise RuntimeError(f"{doc.slug}: missing raw_vec_file: {raw_path}")
+        raw_content = raw_path.read_bytes()
+        sources[str(raw_path)] = _fingerprint(raw_path, raw_content)
+        raw_vec = _read_json_floats(raw_path, raw_content)
+        if len(raw_vec) != doc.raw_dim:
+            raise RuntimeError(f"{doc.slug}: raw_vec length {len(raw_vec)} != {doc.raw_dim}")
+
+    # Reduced vector (optional but validated if present)
+    reduced: List[float] = []
+    if doc.reduced_vec_file and raw_vec is None:
+        vec_path = Path(doc.reduced_vec_file)
+        if not vec_path.exists():
+            raise RuntimeError(f"{doc.slug}: missing reduced_vec_file: {vec_path}")
+        vec_content = vec_path.read_bytes()
+        sources[str(vec_path)] = _fingerprint(vec_path, vec_content)
+        reduced = _read_json_floats(vec_path, vec_content)
+        if len(reduced) != doc.reduced_dim:
+            raise RuntimeError(f"{doc.slug}: reduced_vec length {len(reduced)} != {doc.reduced_dim}")
+        if doc.reduced_dim != settings.VECTOR_DIM:
+            raise RuntimeError(
+                f"{doc.slug}: reduced_dim {doc.reduced_dim} != settings.VECTOR_DIM {settings.VECTOR_DIM}"
+            )
+
+    # A zero-norm vector (e.g. a placeholder reduced.json) is stored as "no vector", like
+    # validate_int8_blob rejects it for users, so no consumer ever scores against it.
+    reduced_i8 = b""
+    if reduced:
+        q, zero = quantize_int8_normalized(np.asarray([reduced], dtype=np.float32))
+        if zero[0]:
+            reduced = []
         else:
-            if doc.min_size is None or doc.max_size is None:
-                raise RuntimeError(f"{doc.slug}: normal anchors require min_size and max_size")
-            mn, mx = doc.min_size, doc.max_size
-            join_window = None
-
-        if mn < 1 or mx < mn:
-            raise RuntimeError(f"{doc.slug}: invalid size range (min={mn}, max={mx})")
-
-        meta = {
-            "is_ghost": doc.is_ghost,
-            "min_size": mn,
-            "max_size": mx,
-            "join_window_min": join_window,
-            "notify_template": doc.notify_template or (
-                "{initiator_username} wants '{anchor_title}' ({min_size}-{max_size}). Join?"
-                if doc.is_ghost else None
-            ),
-            "reducer_id": doc.reducer_id,
-            "raw_vec_file": doc.raw_vec_file,
-            "raw_dim": doc.raw_dim,
-            "reduced_vec_file": doc.reduced_vec_file,
-            "reduced_dim": doc.reduced_dim,
-            "instructions_url": doc.instructions_url,
-            "instructions_html": doc.instructions_html,
-            "source": str(yml),
-        }
-
-        anchor = Anchor(
-            slug=doc.slug,
-            title=doc.title,
-            description=doc.description,
-            tags=doc.tags,
-            reduced=reduced,
-            meta=meta,
+            reduced_i8 = q[0].tobytes()
+
+    # Sizes
+    if doc.is_ghost:
+        mn = doc.min_size or 2
+        mx = doc.max_size or 4
+        join_window = doc.join_window_min or 15
+    else:
+        if doc.min_size is None or doc.max_size is None:
+            raise RuntimeError(f"{doc.slug}: normal anchors require min_size and max_size")
+        mn, mx = doc.min_size, doc.max_size
+        join_window = None
+
+    if mn < 1 or mx < mn:
+        raise RuntimeError(f"{doc.slug}: invalid size range (min={mn}, max={mx})")
+
+    meta = {
+        "is_ghost": doc.is_ghost,
+        "min_size": mn,
+        "max_size": mx,
+        "join_window_min": join_window,
+        "notify_template": doc.notify_template or (
+            "{initiator_username} wants '{anchor_title}' ({min_size}-{max_size}). Join?"
+            if doc.is_ghost else None
+        ),
+        "reducer_id": reducer_id,
+        "raw_vec_file": doc.raw_vec_file,
+        "raw_dim": doc.raw_dim,
+        "reduced_vec_file": doc.reduced_vec_file,
+        "reduced_dim": doc.reduced_dim,
+        "instructions_url": doc.instructions_url,
+        "instructions_html": doc.instructions_html,
+        "source": str(yml),
+    }
+
+    anchor = Anchor(
+        slug=doc.slug,
+        title=doc.title,
+        description=doc.description,
+        tags=doc.tags,
+        reduced=reduced,
+        reduced_i8=reduced_i8,
+        meta=meta,
+    )
+    return anchor, raw_vec
+
+
+def _parse_files(paths: List[str], sources: Dict[str, list]) -> Dict[str, Anchor]:
+    """Parse `paths`; anchors that ship raw vectors are reduced together, one matmul per reducer."""
+    import numpy as np
+    files: Dict[str, Anchor] = {}
+    pending: Dict[str, List[Tuple[str, List[float]]]] = {}
+    for path in paths:
+        anchor, raw_vec = _parse_anchor(Path(path), sources)
+        files[path] = anchor
+        if raw_vec is not None:
+            pending.setdefault(anchor.meta["reducer_id"], []).append((path, raw_vec))
+
+    for reducer_id, items in pending.items():
+        try:
+            reduced = reduce_batch(reducer_id, np.asarray([v for _, v in items], dtype=np.float32))
+            reducer_meta = reducer_path(reducer_id) / "meta.json"
+            sources[str(reducer_meta)] = _fingerprint(reducer_meta, reducer_meta.read_bytes())
+        except (LookupError, ValueError, OSError) as e:
+            slugs = ", ".join(files[p].slug for p, _ in items)
+            raise RuntimeError(f"{slugs}: cannot reduce raw vectors: {e}") from e
+        packed, zero = quantize_int8_normalized(reduced)
+        for (path, _), vec, q, is_zero in zip(items, reduced, packed, zero):
+            if not is_zero:
+                files[path] = files[path].model_copy(update={"reduced": vec.tolist(), "reduced_i8": q.tobytes()})
+    return files
+
+
+def _deps(anchor: Anchor) -> List[str]:
+    """Files besides the YAML whose changes invalidate `anchor`."""
+    meta = anchor.meta
+    if meta.get("raw_vec_file"):
+        return [meta["raw_vec_file"], str(reducer_path(meta["reducer_id"]) / "meta.json")]
+    return [meta["reduced_vec_file"]] if meta.get("reduced_vec_file") else []
+
+
+# ---- Compiled snapshot ----
+# meta.json (validated metadata + source fingerprints) next to three .npy matrices (float32
+# reduced vectors, int8 packed vectors, unit-row scoring matrix) that later starts memory-map.
+# Anchors are stored normals first, then ghosts, so the scoring matrices are two slices of one
+# file and every worker serves them from the same page cache. Workers build the snapshot under
+# a file lock: the first one parses, the rest adopt what it wrote.
+_SNAPSHOT_FORMAT = 3
+
+
+def _write_snapshot(snap_dir: Path, base: Path, anchors: List[Anchor], sources: Dict[str, list]) -> None:
+    import numpy as np
+    dim = settings.VECTOR_DIM
+    reduced = np.zeros((len(anchors), dim), dtype=np.float32)
+    packed = np.zeros((len(anchors), dim), dtype=np.int8)
+    for i, a in enumerate(anchors):
+        if len(a.reduced):
+            reduced[i] = a.reduced
+            packed[i] = np.frombuffer(a.reduced_i8, dtype=np.int8)
+    scoring = reduced.copy()
+    norms = np.linalg.norm(scoring, axis=1, keepdims=True)
+    np.divide(scoring, norms, out=scoring, where=norms > 0)
+    digest = hashlib.sha256(json.dumps(sources, sort_keys=True).encode()).hexdigest()[:16]
+    meta = {
+        "format": _SNAPSHOT_FORMAT,
+        "dir": str(base),
+        "vector_dim": dim,
+        "yaml": sorted(str(p) for p in base.glob("*.yaml")),
+        "sources": sources,
+        "reduced": f"reduced-{digest}.npy",
+        "packed": f"packed-{digest}.npy",
+        "scoring": f"scoring-{digest}.npy",
+        "anchors": [
+            {
+                "slug": a.slug,
+                "title": a.title,
+                "description": a.description,
+                "tags": a.tags,
+                "meta": a.meta,
+                "has_reduced": bool(len(a.reduced)),
+            }
+            for a in anchors
+        ],
+    }
+    snap_dir.mkdir(parents=True, exist_ok=True)
+    tmp = f".tmp-{os.getpid()}"
+    for name, arr in ((meta["reduced"], reduced), (meta["packed"], packed), (meta["scoring"], scoring)):
+        with open(snap_dir / (name + tmp), "wb") as f:
+            np.save(f, arr)
+        os.replace(snap_dir / (name + tmp), snap_dir / name)
+    (snap_dir / ("meta.json" + tmp)).write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(snap_dir / ("meta.json" + tmp), snap_dir / "meta.json")  # commit point
+    for stale in snap_dir.glob("*.npy"):
+        if stale.name not in (meta["reduced"], meta["packed"], meta["scoring"]):
+            stale.unlink(missing_ok=True)
+
+
+def _read_snapshot(snap_dir: Path, base: Path) -> Optional[Tuple[Dict[str, Anchor], Dict[str, list], np.ndarray]]:
+    """
+    Return ({yaml path: anchor}, sources, mmapped scoring matrix) from the snapshot,
+    or None if it is missing or any source changed.
+    """
+    import numpy as np
+    try:
+        meta = json.loads((snap_dir / "meta.json").read_bytes())
+        if (
+            meta.get("format") != _SNAPSHOT_FORMAT
+            or meta.get("dir") != str(base)
+            or meta.get("vector_dim") != settings.VECTOR_DIM
+            or meta["yaml"] != sorted(str(p) for p in base.glob("*.yaml"))
+        ):
+            return None
+        if not all(_unchanged(Path(path), fp) for path, fp in meta["sources"].items()):
+            return None
+        reduced = np.load(snap_dir / meta["reduced"], mmap_mode="r")
+        packed = np.load(snap_dir / meta["packed"], mmap_mode="r")
+        scoring = np.load(snap_dir / meta["scoring"], mmap_mode="r")
+        if scoring.shape != (len(meta["anchors"]), settings.VECTOR_DIM):
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    files: Dict[str, Anchor] = {}
+    for i, rec in enumerate(meta["anchors"]):
+        has = rec["has_reduced"]
+        anchor = Anchor.model_construct(
+            slug=rec["slug"],
+            title=rec["title"],
+            description=rec["description"],
+            tags=rec["tags"],
+            reduced=reduced[i] if has else [],   # a view: floats are only built by the detail endpoint
+            reduced_i8=packed[i].tobytes() if has else b"",
+            meta=rec["meta"],
         )
+        files[rec["meta"]["source"]] = anchor
+    return files, meta["sources"], scoring
+
 
-        if doc.is_ghost:
-            ghosts[doc.slug] = anchor
+def _split(files: Dict[str, Anchor]) -> Tuple[Dict[str, Anchor], Dict[str, Anchor]]:
+    normals: Dict[str, Anchor] = {}
+    ghosts: Dict[str, Anchor] = {}
+    for path in sorted(files):
+        anchor = files[path]
+        if anchor.meta["is_ghost"]:
+            ghosts[anchor.slug] = anchor
         else:
-            normals[doc.slug] = anchor
+            normals[anchor.slug] = anchor
+    return normals, ghosts
 
-    _publish(normals, ghosts)
+
+def _snapshot_dir() -> Optional[Path]:
+    return Path(settings.ANCHOR_SNAPSHOT_DIR) if settings.ANCHOR_SNAPSHOT_DIR else None
+
+
+def _snapshot_lock(snap_dir: Optional[Path]):
+    return publish_lock(snap_dir) if snap_dir is not None else nullcontext()
+
+
+def _commit(
+    base: Path,
+    files: Dict[str, Anchor],
+    sources: Dict[str, list],
+    write_snapshot: bool,
+    scoring: Optional[np.ndarray] = None,
+) -> Dict[str, Anchor]:
+    global _BASE, _FILES, _SOURCES
+    normals, ghosts = _split(files)
+    _publish(normals, ghosts, scoring)
+    _BASE, _FILES, _SOURCES = base, files, sources
+    snap_dir = _snapshot_dir()
+    if write_snapshot and snap_dir is not None:
+        try:
+            _write_snapshot(snap_dir, base, [*normals.values(), *ghosts.values()], sources)
+        except OSError as e:
+            logger.warning("could not write anchor snapshot to %s: %s", snap_dir, e)
     return normals
 
 
-def _publish(normals: Dict[str, Anchor], ghosts: Dict[str, Anchor]) -> None:
-    global _ANCHORS, _GHOSTS
-    _ANCHORS, _GHOSTS = normals, ghosts
+def _timed(kind: str, start: float) -> None:
+    ANCHOR_LOADS.inc((kind,))
+    ANCHOR_LOAD_SECONDS.set(time.perf_counter() - start, (kind,))
+
+
+def load_anchors(dir_path: str = "data/anchors", use_snapshot: bool = True) -> dict[str, Anchor]:
+    base = Path(dir_path)
+    start = time.perf_counter()
+    with _RELOAD_LOCK:
+        if not base.exists():
+            # No anchors dir yet; clear caches and return empty
+            return _commit(base, {}, {}, write_snapshot=False)
+
+        snap_dir = _snapshot_dir() if use_snapshot else None
+        with _snapshot_lock(snap_dir):
+            if snap_dir is not None:
+                cached = _read_snapshot(snap_dir, base)
+                if cached is not None:
+                    files, sources, scoring = cached
+                    normals = _commit(base, files, sources, write_snapshot=False, scoring=scoring)
+                    _timed("snapshot", start)
+                    return normals
+
+            sources: Dict[str, list] = {}
+            files = _parse_files([str(yml) for yml in sorted(base.glob("*.yaml"))], sources)
+            normals = _commit(base, files, sources, write_snapshot=use_snapshot)
+            _timed("parse", start)
+            return normals
+
+
+def reload_anchors() -> Dict[str, List[str]]:
+    """
+    Re-parse only the anchor files that were added or changed since the last load
+    (YAML or its vector files), drop removed ones, and republish atomically.
+    On a parse error nothing is published and the current catalogue stays live.
+    """
+    start = time.perf_counter()
+    with _RELOAD_LOCK:
+        base = _BASE
+        if base is None:
+            raise RuntimeError("anchors were never loaded")
+        current = sorted(str(p) for p in base.glob("*.yaml")) if base.exists() else []
+
+        def _dirty(path: str) -> bool:
+            a = _FILES[path]
+            deps = [path] + _deps(a)
+            try:
+                return not all(_unchanged(Path(d), _SOURCES[d]) for d in deps)
+            except (OSError, KeyError):
+                return True
+
+        added = [p for p in current if p not in _FILES]
+        changed = [p for p in current if p in _FILES and _dirty(p)]
+        removed = [p for p in _FILES if p not in set(current)]
+        report = {"added": added, "changed": changed, "removed": removed}
+        if not (added or changed or removed):
+            return report
+
+        snap_dir = _snapshot_dir()
+        with _snapshot_lock(snap_dir):
+            # Another worker may have compiled these very changes already.
+            cached = _read_snapshot(snap_dir, base) if snap_dir is not None else None
+            if cached is not None:
+                files, sources, scoring = cached
+                _commit(base, files, sources, write_snapshot=False, scoring=scoring)
+                _timed("reload", start)
+                return report
+
+            files = {p: a for p, a in _FILES.items() if p not in removed}
+            sources = dict(_SOURCES)
+            files.update(_parse_files(added + changed, sources))
+            live = set(files).union(*(_deps(a) for a in files.values()))
+            sources = {p: fp for p, fp in sources.items() if p in live}
+            _commit(base, files, sources, write_snapshot=snap_dir is not None)
+        _timed("reload", start)
+        return report
+
+
+async def watch_anchors(interval: float) -> None:
+    """Background task: poll the catalogue every `interval` seconds and hot-reload changes."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await asyncio.to_thread(reload_anchors)
+        except Exception:
+            logger.exception("anchor hot-reload failed; keeping the current catalogue")
+            continue
+        if any(report.values()):
+            logger.info("anchors reloaded: %s", report)
+
+
+def _build_matrix(anchors: Dict[str, Anchor]) -> AnchorMatrix:
+    import numpy as np
+    items = tuple(anchors.values())
+    matrix = np.zeros((len(items), settings.VECTOR_DIM), dtype=np.float32)
+    for i, a in enumerate(items):
+        if len(a.reduced):
+            matrix[i] = a.reduced
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    matrix.setflags(write=False)
+    return _matrix(items, matrix)
+
+
+def _matrix(items: Tuple[Anchor, ...], matrix: np.ndarray) -> AnchorMatrix:
+    return AnchorMatrix(anchors=items, matrix=matrix, has_vector=matrix.any(axis=1), search=SearchIndex(items))
+
+
+def _publish(normals: Dict[str, Anchor], ghosts: Dict[str, Anchor], scoring: Optional[np.ndarray] = None) -> None:
+    global _ANCHORS, _GHOSTS, _ANCHOR_MATRIX, _GHOST_MATRIX, _VERSION, _CATALOGUE
+    # Build everything first, then swap in one assignment so readers never mix generations.
+    n = len(normals)
+    if scoring is not None and len(scoring) == n + len(ghosts):
+        # Snapshot rows are normals then ghosts: serve both straight from the mapping.
+        normal_items, ghost_items = tuple(normals.values()), tuple(ghosts.values())
+        anchor_matrix, ghost_matrix = _matrix(normal_items, scoring[:n]), _matrix(ghost_items, scoring[n:])
+    else:
+        anchor_matrix, ghost_matrix = _build_matrix(normals), _build_matrix(ghosts)
+    catalogue = Catalogue(_catalogue_key(anchor_matrix, ghost_matrix), anchor_matrix, ghost_matrix)
+    _ANCHORS, _GHOSTS, _ANCHOR_MATRIX, _GHOST_MATRIX, _VERSION, _CATALOGUE = (
+        normals, ghosts, anchor_matrix, ghost_matrix, _VERSION + 1, catalogue
+    )
+    for fn in _LISTENERS:
+        try:
+            fn()
+        except Exception:
+            logger.exception("anchor publish listener %r failed", fn)
+
+
+def on_publish(fn: Callable[[], None]) -> None:
+    """Register `fn` to run after each catalogue publish (e.g. to drop derived caches)."""
+    _LISTENERS.append(fn)
+
+
+_publish({}, {})
 
 
 # ---- Read API for the rest of the app ----
+def catalogue_version() -> int:
+    return _VERSION
+
+
+def published_catalogue() -> Catalogue:
+    return _CATALOGUE
+
+
 def list_anchors() -> List[Anchor]:
     return list(_ANCHORS.values())
 
@@ -160,3 +565,53 @@ def list_ghosts() -> List[Anchor]:
 
 def get_ghost(slug: str) -> Optional[Anchor]:
     return _GHOSTS.get(slug)
+
+
+def score_anchors(query: np.ndarray, k: int, ghost: bool = False) -> List[Tuple[Anchor, float]]:
+    """
+    Top-k anchors by cosine similarity to a unit `query` vector; anchors without a vector are
+    left out. One matrix-vector product over the published snapshot plus argpartition; no
+    per-anchor loop.
+    """
+    import numpy as np
+    snap = _GHOST_MATRIX if ghost else _ANCHOR_MATRIX
+    n = len(snap.anchors)
+    k = min(k, int(snap.has_vector.sum()))
+    if k <= 0:
+        return []
+    scores = snap.matrix @ np.asarray(query, dtype=np.float32)
+    scores[~snap.has_vector] = -np.inf
+    top = np.argpartition(scores, n - k)[n - k:] if k < n else np.arange(n)
+    top = top[np.argsort(scores[top])[::-1]]
+    return [(snap.anchors[i], float(scores[i])) for i in top]
+
+
+def search_anchors(
+    tags: Sequence[str] = (),
+    q: Optional[str] = None,
+    match_all_tags: bool = True,
+    ghost: bool = False,
+    query: Optional[np.ndarray] = None,
+    limit: Optional[int] = None,
+) -> List[Tuple[Anchor, Optional[float]]]:
+    """
+    Anchors carrying all (or, with `match_all_tags` off, any) of `tags` and whose title or
+    description contain every word of `q`, words matching as prefixes. Catalogue order, or
+    by cosine similarity to a unit `query` vector (then with scores; anchors without a vector
+    come last, scored None), capped at `limit`.
+    """
+    import numpy as np
+    snap = _GHOST_MATRIX if ghost else _ANCHOR_MATRIX
+    index = snap.search
+    mask = index.tag_mask(tags, match_all_tags)
+    if q and mask:
+        mask &= index.text_mask(q)
+    rows = index.rows(mask)
+    if query is None:
+        rows = rows[:limit] if limit is not None else rows
+        return [(snap.anchors[i], None) for i in rows]
+    scores = snap.matrix[rows] @ np.asarray(query, dtype=np.float32)
+    has = snap.has_vector[rows]
+    scores[~has] = -np.inf
+    order = np.argsort(-scores, kind="stable")[:limit]
+    return [(snap.anchors[rows[i]], float(scores[i]) if has[i] else None) for i in order]
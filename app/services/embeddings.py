@@ -0,0 +1,120 @@
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+# spaCy is imported and the model loaded on first use, never at import time. Only the
+# tokenizer and static vectors are needed for doc.vector, so the parser and NER are not
+# even loaded and every other pipe is disabled.
+_EXCLUDE = ["parser", "ner"]
+
+_NLP = None
+_NLP_LOCK = threading.Lock()
+
+
+def get_nlp():
+    global _NLP
+    if _NLP is None:
+        with _NLP_LOCK:
+            if _NLP is None:
+                import spacy
+
+                nlp = spacy.load(settings.EMBEDDING_MODEL, exclude=_EXCLUDE)
+                nlp.select_pipes(disable=list(nlp.pipe_names))
+                _NLP = nlp
+    return _NLP
+
+
+def text_key(text: str, model: Optional[str] = None) -> str:
+    return hashlib.blake2b(f"{model or settings.EMBEDDING_MODEL}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Append-only on-disk cache of one model's embeddings: `keys.txt` (one text hash per line),
+    `vectors.f32` (the matching float32 rows) and `dim`. Vectors are appended before their
+    keys, so an interrupted write leaves at worst orphan rows, which the next open truncates.
+    """
+
+    def __init__(self, root: Path, model: str):
+        self.dir = root / model
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self.dim: Optional[int] = None
+        keys_file, vectors_file, dim_file = self.dir / "keys.txt", self.dir / "vectors.f32", self.dir / "dim"
+        if keys_file.exists() and vectors_file.exists() and dim_file.exists():
+            self.dim = int(dim_file.read_text())
+            keys = keys_file.read_text(encoding="ascii").split()
+            vectors = np.fromfile(vectors_file, dtype=np.float32)
+            n = min(len(keys), vectors.size // self.dim)
+            if vectors.size > n * self.dim:
+                os.truncate(vectors_file, n * self.dim * 4)   # drop rows whose keys never made it
+            self._vectors = vectors[: n * self.dim].reshape(n, self.dim)
+            self._rows = {k: i for i, k in enumerate(keys[:n])}
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        if self._vectors is None:
+            return {}
+        return {k: self._vectors[self._rows[k]] for k in keys if k in self._rows}
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        if not len(keys):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(f"cache holds {self.dim}-dim vectors, got {vectors.shape[1]}")
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if self.dim is None:
+            (self.dir / "dim").write_text(str(vectors.shape[1]))
+        with open(self.dir / "vectors.f32", "ab") as f:
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.dir / "keys.txt", "a", encoding="ascii") as f:
+            f.write("".join(k + "\n" for k in keys))
+        base = len(self._rows)
+        self._rows.update({k: base + i for i, k in enumerate(keys)})
+        self._vectors = vectors if self._vectors is None else np.concatenate([self._vectors, vectors])
+        self.dim = vectors.shape[1]
+
+
+def embed_texts(
+    texts: Sequence[str],
+    *,
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None,
+    use_cache: bool = True,
+) -> np.ndarray:
+    """
+    (len(texts), model dim) float32 embeddings. Duplicates are embedded once, cached rows
+    are reused, and the misses go through one `nlp.pipe` stream with `batch_size` docs per
+    batch and `n_process` worker processes (Settings defaults).
+    """
+    model = settings.EMBEDDING_MODEL
+    keys = [text_key(t, model) for t in texts]
+    unique: Dict[str, str] = dict(zip(keys, texts))
+    cache = EmbeddingCache(Path(settings.EMBEDDING_CACHE_DIR), model) if use_cache and settings.EMBEDDING_CACHE_DIR else None
+    found = cache.get_many(list(unique)) if cache is not None else {}
+
+    missing: List[str] = [k for k in unique if k not in found]
+    if missing:
+        nlp = get_nlp()
+        docs = nlp.pipe(
+            (unique[k] for k in missing),
+            batch_size=batch_size or settings.EMBEDDING_BATCH_SIZE,
+            n_process=n_process or settings.EMBEDDING_N_PROCESS,
+        )
+        fresh = np.stack([np.asarray(doc.vector, dtype=np.float32) for doc in docs])
+        if cache is not None:
+            cache.put_many(missing, fresh)
+        found.update(zip(missing, fresh))
+
+    if not keys:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack([found[k] for k in keys]).astype(np.float32, copy=False)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import base64
+import json
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, bindparam, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.models.vector import Vector
+from app.services.vectors import ensure_vectors, validate_int8_blob
+
+# Full dumps of users and their vectors, streamed in constant memory.
+#
+#   ndjson  one {"id", "username", "first_name", "b64"} object per line; b64 is the packed
+#           int8 vector (as accepted by VectorCreate.b64) or null for users without one
+#   binary  b"SCVX" + uint16 version + uint16 dim, then fixed-size (int64 id, int8[dim])
+#           little-endian records, for users with a vector only
+#
+# Rows are read with yield_per (a server-side cursor where the driver has one) and every
+# partition becomes one chunk of the response, so memory is O(EXPORT_BATCH_SIZE) however
+# many users there are.
+
+MAGIC = b"SCVX"
+_HEADER = struct.Struct("<4sHH")
+_VERSION = 1
+
+Record = Tuple[int, Optional[str], Optional[str], Optional[bytes]]   # (id, username, first_name, blob)
+
+
+def record_dtype(dim: int) -> np.dtype:
+    return np.dtype([("id", "<i8"), ("vector", "i1", (dim,))])
+
+
+def binary_header(dim: Optional[int] = None) -> bytes:
+    return _HEADER.pack(MAGIC, _VERSION, dim or settings.VECTOR_DIM)
+
+
+def _rows(db: Session, with_vector_only: bool, after_id: Optional[int], batch_size: int):
+    dim = settings.VECTOR_DIM
+    stmt = select(User.id, User.username, User.first_name, Vector.data)
+    if with_vector_only:
+        stmt = stmt.join(Vector, User.vector_id == Vector.id).where(Vector.dim == dim)
+    else:
+        stmt = stmt.outerjoin(Vector, and_(User.vector_id == Vector.id, Vector.dim == dim))
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    return db.execute(stmt.order_by(User.id).execution_options(yield_per=batch_size)).partitions()
+
+
+def iter_export(fmt: str = "ndjson", after_id: Optional[int] = None, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Chunks of the dump in `fmt` ("ndjson" or "binary"), one per `batch_size` users, for users
+    with id > `after_id`. Opens its own session, which lives as long as the iteration.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    dim = settings.VECTOR_DIM
+    with SessionLocal() as db:
+        if fmt == "binary":
+            yield binary_header(dim)
+            rec = record_dtype(dim)
+            for part in _rows(db, True, after_id, batch_size):
+                out = np.empty(len(part), dtype=rec)
+                out["id"] = [r[0] for r in part]
+                out["vector"] = np.frombuffer(b"".join(r[3] for r in part), dtype=np.int8).reshape(len(part), dim)
+                yield out.tobytes()
+        else:
+            for part in _rows(db, False, after_id, batch_size):
+                yield "".join(
+                    json.dumps({
+                        "id": uid,
+                        "username": username,
+                        "first_name": first_name,
+                        "b64": base64.b64encode(data).decode("ascii") if data is not None else None,
+                    }) + "\n"
+                    for uid, username, first_name, data in part
+                ).encode("utf-8")
+
+
+# ---- import ----
+
+def read_records(f: BinaryIO, batch_size: Optional[int] = None) -> Iterator[List[Record]]:
+    """Batches of records from a dump in either format (told apart by the binary magic)."""
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    head = f.read(_HEADER.size)
+    if head[:4] == MAGIC and len(head) == _HEADER.size:
+        _, version, dim = _HEADER.unpack(head)
+        if version != _VERSION:
+            raise ValueError(f"unsupported binary dump version {version}")
+        rec = record_dtype(dim)
+        while True:
+            chunk = f.read(rec.itemsize * batch_size)
+            if not chunk:
+                return
+            if len(chunk) % rec.itemsize:
+                raise ValueError("binary dump ends in a partial record")
+            arr = np.frombuffer(chunk, dtype=rec)
+            yield [(int(i), None, None, v.tobytes()) for i, v in zip(arr["id"], arr["vector"])]
+
+    def lines() -> Iterator[bytes]:
+        rest = head
+        for line in f:
+            yield rest + line
+            rest = b""
+        if rest:
+            yield rest
+
+    batch: List[Record] = []
+    for n, line in enumerate(lines(), 1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+            blob = base64.b64decode(obj["b64"], validate=True) if obj.get("b64") else None
+            batch.append((int(obj["id"]), obj.get("username"), obj.get("first_name"), blob))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"line {n}: {e}") from e
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_records(db: Session, records: Iterable[Record], stats: Optional[dict] = None) -> dict:
+    """
+    Apply one batch of dump records in one transaction and return running `stats`.
+
+    A user is matched by id. If it exists (with the same username, when the record has one)
+    its vector is replaced; records with a username create missing users under their
+    original id; anything else is counted as skipped. Vectors are content-addressed like
+    everywhere else, so re-importing a dump is idempotent.
+    """
+    stats = stats if stats is not None else {"updated": 0, "created": 0, "unchanged": 0, "skipped": 0, "invalid": 0}
+    recs = []
+    for r in records:
+        if r[3] is not None and validate_int8_blob(r[3]):
+            stats["invalid"] += 1
+        else:
+            recs.append(r)
+    if not recs:
+        return stats
+
+    existing = {
+        uid: (username, vector_id)
+        for uid, username, vector_id in db.execute(
+            select(User.id, User.username, User.vector_id).where(User.id.in_({r[0] for r in recs}))
+        )
+    }
+    new_names = {r[1] for r in recs if r[0] not in existing and r[1]}
+    taken = set(db.scalars(select(User.username).where(User.username.in_(new_names)))) if new_names else set()
+    vector_ids = ensure_vectors(db, [r[3] for r in recs if r[3] is not None])
+
+    updates, inserts = [], []
+    for uid, username, first_name, blob in recs:
+        vid = vector_ids[blob] if blob is not None else None
+        if uid in existing:
+            current_name, current_vid = existing[uid]
+            if username and username != current_name:
+                stats["skipped"] += 1
+            elif blob is None or vid == current_vid:
+                stats["unchanged"] += 1
+            else:
+                updates.append({"uid": uid, "vid": vid})
+        elif username and username not in taken:
+            taken.add(username)
+            inserts.append({"id": uid, "username": username, "first_name": first_name, "vector_id": vid})
+        else:
+            stats["skipped"] += 1
+
+    if updates:
+        users = User.__table__
+        db.execute(update(users).where(users.c.id == bindparam("uid")).values(vector_id=bindparam("vid")), updates)
+    if inserts:
+        db.execute(insert(User), inserts)
+        if db.get_bind().dialect.name == "postgresql":
+            # Explicit ids bypass the sequence; move it past them so later inserts don't collide.
+            db.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))"))
+    db.commit()
+    stats["updated"] += len(updates)
+    stats["created"] += len(inserts)
+    return stats
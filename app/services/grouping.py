@@ -0,0 +1,201 @@
+from __future__ import annotations
+import math
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+LEAF_GROUPS = 256      # above this many groups, bucket the pool first and solve each bucket alone
+BLOCK_ROWS = 4096      # rows per similarity block, so memory stays O(BLOCK_ROWS * centroids)
+
+
+class Grouping(NamedTuple):
+    groups: List[np.ndarray]   # row indices into the solver input, one array per group
+    unassigned: np.ndarray     # rows that could not be placed within the size bounds
+
+
+def unit_rows(data: np.ndarray) -> np.ndarray:
+    """int8 (or float) vectors -> float32 unit rows; zero vectors stay zero."""
+    x = np.asarray(data, dtype=np.float32).copy()
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    np.divide(x, norms, out=x, where=norms > 0)
+    return x
+
+
+def _group_count(n: int, min_size: int, max_size: int, target: float) -> int:
+    if n < min_size:
+        return 0
+    lo, hi = -(-n // max_size), n // min_size
+    return min(max(round(n / target), lo), hi)
+
+
+def _top_candidates(x: np.ndarray, centroids: np.ndarray, m: int) -> tuple[np.ndarray, np.ndarray]:
+    """Per row, the `m` most similar centroids (best first) and their cosines, block by block."""
+    n, g = len(x), len(centroids)
+    idx = np.empty((n, m), dtype=np.int64)
+    sims = np.empty((n, m), dtype=np.float32)
+    for s in range(0, n, BLOCK_ROWS):
+        block = x[s:s + BLOCK_ROWS] @ centroids.T
+        part = np.argpartition(block, g - m, axis=1)[:, g - m:] if m < g else np.argsort(block, axis=1)
+        top = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-top, axis=1)
+        idx[s:s + BLOCK_ROWS] = np.take_along_axis(part, order, axis=1)[:, :m]
+        sims[s:s + BLOCK_ROWS] = np.take_along_axis(top, order, axis=1)[:, :m]
+    return idx, sims
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, caps: np.ndarray, m: int = 8) -> np.ndarray:
+    """
+    Capacity-constrained greedy assignment; returns a label per row (-1 if no room was left).
+
+    Every unplaced row proposes to its next-best centroid; each centroid keeps the most similar
+    proposals up to its remaining room and the rest move down their candidate list. A column of
+    proposals is a handful of array ops, so there are at most `m` rounds per pass; rows that run
+    out of candidates get fresh ones among the centroids that still have room.
+    """
+    labels = np.full(len(x), -1, dtype=np.int64)
+    room = caps.astype(np.int64)
+    todo = np.arange(len(x))
+    while todo.size and (room > 0).any():
+        open_ = np.flatnonzero(room > 0)
+        cand, sims = _top_candidates(x[todo], centroids[open_], min(m, len(open_)))
+        cand = open_[cand]
+        for j in range(cand.shape[1]):
+            live = labels[todo] < 0
+            if not live.any():
+                break
+            rows, c, s = todo[live], cand[live, j], sims[live, j]
+            order = np.lexsort((-s, c))
+            rows, c = rows[order], c[order]
+            rank = np.arange(len(c)) - np.searchsorted(c, c, side="left")
+            take = rank < room[c]
+            labels[rows[take]] = c[take]
+            room -= np.bincount(c[take], minlength=len(room))
+        todo = todo[labels[todo] < 0]
+    return labels
+
+
+def _centroids(x: np.ndarray, labels: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Unit mean of each label's rows; labels without rows keep their previous centroid."""
+    out = previous.copy()
+    placed = np.flatnonzero(labels >= 0)
+    if placed.size == 0:
+        return out
+    order = placed[np.argsort(labels[placed], kind="stable")]
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    out[sorted_labels[starts]] = np.add.reduceat(x[order], starts, axis=0)
+    return unit_rows(out)
+
+
+def _balanced_kmeans(x: np.ndarray, g: int, cap: int, iters: int, rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means where every centroid holds at most `cap` rows."""
+    centroids = x[rng.choice(len(x), g, replace=False)]
+    caps = np.full(g, cap)
+    labels = _assign(x, centroids, caps)
+    for _ in range(iters - 1):
+        centroids = _centroids(x, labels, centroids)
+        labels = _assign(x, centroids, caps)
+    return labels
+
+
+def _split(rows: np.ndarray, labels: np.ndarray) -> List[np.ndarray]:
+    placed = labels >= 0
+    rows, labels = rows[placed], labels[placed]
+    order = np.argsort(labels, kind="stable")
+    rows, labels = rows[order], labels[order]
+    return np.split(rows, np.flatnonzero(labels[1:] != labels[:-1]) + 1) if len(rows) else []
+
+
+def _solve_flat(x: np.ndarray, rows: np.ndarray, min_size: int, max_size: int, target: float,
+                iters: int, rng: np.random.Generator) -> tuple[List[np.ndarray], np.ndarray]:
+    """Groups for `rows` of `x` solved as one problem; returns (groups, leftover rows)."""
+    n = len(rows)
+    g = _group_count(n, min_size, max_size, target)
+    if g == 0:
+        return [], rows
+    sub = x[rows]
+    labels = _balanced_kmeans(sub, g, min(max_size, -(-n // g)), iters, rng)
+
+    # Dissolve groups below min_size and re-place their rows where there is still room.
+    counts = np.bincount(labels[labels >= 0], minlength=g)
+    small = counts < min_size
+    if small.any():
+        labels[(labels >= 0) & small[np.maximum(labels, 0)]] = -1
+        loose = np.flatnonzero(labels < 0)
+        kept = ~small
+        if loose.size and kept.any():
+            centroids = _centroids(sub, labels, np.zeros((g, sub.shape[1]), dtype=np.float32))
+            caps = np.where(kept, max_size - counts, 0)
+            labels[loose] = _assign(sub[loose], centroids, caps)
+    return _split(rows, labels), rows[labels < 0]
+
+
+def form_groups(
+    data: np.ndarray,
+    min_size: int,
+    max_size: int,
+    target_size: Optional[float] = None,
+    iters: int = 4,
+    seed: int = 0,
+) -> Grouping:
+    """
+    Partition the rows of `data` (n, dim) into groups of `min_size`..`max_size` rows that
+    maximize intra-group cosine similarity: capacity-constrained spherical k-means with about
+    n / `target_size` groups (midpoint of the bounds by default).
+
+    Large pools are bucketed first (balanced k-means into ~sqrt(groups) buckets) and each
+    bucket is solved on its own, so the similarity work is O(n * sqrt(groups)) rather than
+    O(n * groups). Rows left over by the buckets get one more joint pass.
+    """
+    if not 1 <= min_size <= max_size:
+        raise ValueError("need 1 <= min_size <= max_size")
+    target = float(target_size) if target_size else (min_size + max_size) / 2
+    target = min(max(target, min_size), max_size)
+    rng = np.random.default_rng(seed)
+    x = unit_rows(data)
+    rows = np.arange(len(x))
+    g = _group_count(len(x), min_size, max_size, target)
+
+    if g <= LEAF_GROUPS:
+        groups, left = _solve_flat(x, rows, min_size, max_size, target, iters, rng)
+        return Grouping(groups, left)
+
+    buckets = math.isqrt(g)
+    labels = _balanced_kmeans(x, buckets, -(-len(x) // buckets), iters, rng)
+    groups: List[np.ndarray] = []
+    leftovers = [rows[labels < 0]]
+    for bucket in _split(rows, labels):
+        found, left = _solve_flat(x, bucket, min_size, max_size, target, iters, rng)
+        groups.extend(found)
+        leftovers.append(left)
+    found, left = _solve_flat(x, np.concatenate(leftovers), min_size, max_size, target, iters, rng)
+    groups.extend(found)
+    return Grouping(groups, left)
+
+
+def grouping_stats(data: np.ndarray, grouping: Grouping) -> dict:
+    """Size and quality figures: mean pairwise cosine inside groups, overall and per member."""
+    x = unit_rows(data)
+    sizes = np.array([len(g) for g in grouping.groups], dtype=np.int64)
+    stats = {
+        "pool": len(x),
+        "groups": len(sizes),
+        "assigned": int(sizes.sum()),
+        "unassigned": len(grouping.unassigned),
+        "min_group": int(sizes.min()) if len(sizes) else 0,
+        "max_group": int(sizes.max()) if len(sizes) else 0,
+        "mean_group": float(sizes.mean()) if len(sizes) else 0.0,
+        "mean_intra_similarity": 0.0,
+        "member_intra_similarity": 0.0,
+    }
+    multi = sizes > 1
+    if not multi.any():
+        return stats
+    rows = np.concatenate(grouping.groups)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    sums = np.add.reduceat(x[rows], starts, axis=0)
+    self_dots = np.add.reduceat((x[rows] ** 2).sum(axis=1), starts)
+    pairs = ((sums ** 2).sum(axis=1) - self_dots)[multi] / (sizes[multi] * (sizes[multi] - 1))
+    stats["mean_intra_similarity"] = float(pairs.mean())
+    stats["member_intra_similarity"] = float(np.average(pairs, weights=sizes[multi]))
+    return stats
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from app.services.anchors import on_publish
+
+try:  # optional: brotli variants are only built when the package is installed
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Instructions(NamedTuple):
+    text: str
+    raw: bytes
+    gzip: Optional[bytes]      # only kept when smaller than raw
+    br: Optional[bytes]        # only kept when brotli is installed and it is smaller than raw
+    etag: str                  # of `raw`; see etag_for
+    mtime_ns: int
+
+    def etag_for(self, coding: Optional[str]) -> str:
+        """Strong ETag of the body sent with Content-Encoding `coding` (None: identity); each encoding has its own bytes."""
+        return self.etag if coding is None else f'{self.etag[:-1]}-{coding}"'
+
+
+# normalized relative path ("static/anchors/foo.html") -> cached content
+_CACHE: Dict[str, Instructions] = {}
+_LOCK = threading.Lock()
+
+
+def _key(path: str) -> str:
+    return os.path.normpath(path)
+
+
+def _build(path: Path, mtime_ns: int) -> Instructions:
+    raw = path.read_bytes()
+    gz = gzip.compress(raw, compresslevel=9, mtime=0)
+    br = brotli.compress(raw, quality=11) if brotli is not None else None
+    return Instructions(
+        text=raw.decode("utf-8"),
+        raw=raw,
+        gzip=gz if len(gz) < len(raw) else None,
+        br=br if br is not None and len(br) < len(raw) else None,
+        etag='"' + hashlib.sha256(raw).hexdigest()[:32] + '"',
+        mtime_ns=mtime_ns,
+    )
+
+
+def load_instructions(dir_path: str = "static/anchors") -> int:
+    """Warm the cache with every *.html under `dir_path`; returns how many files were loaded."""
+    fresh: Dict[str, Instructions] = {}
+    for html in sorted(Path(dir_path).glob("*.html")):
+        fresh[_key(str(html))] = _build(html, html.stat().st_mtime_ns)
+    with _LOCK:
+        _CACHE.update(fresh)
+    return len(fresh)
+
+
+def get_instructions(path: str) -> Optional[Instructions]:
+    """Cached content for `path`, re-read if its mtime moved; None if the file does not exist."""
+    key = _key(path)
+    try:
+        mtime_ns = os.stat(key).st_mtime_ns
+    except OSError:
+        with _LOCK:
+            _CACHE.pop(key, None)
+        return None
+    hit = _CACHE.get(key)
+    if hit is not None and hit.mtime_ns == mtime_ns:
+        return hit
+    entry = _build(Path(key), mtime_ns)
+    with _LOCK:
+        _CACHE[key] = entry
+    return entry
+
+
+def invalidate() -> None:
+    with _LOCK:
+        _CACHE.clear()
+
+
+on_publish(invalidate)   # catalogue reloads may point at new or edited files
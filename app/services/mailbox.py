@@ -0,0 +1,409 @@
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.mailbox import MailboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+class Message(NamedTuple):
+    id: int
+    user_id: int
+    kind: str
+    body: str
+    data: Optional[dict]
+    created_at: datetime
+
+
+class _Ring:
+    """
+    Recent messages of one user by id, at most MAILBOX_RING_SIZE (the lowest ids go first).
+    The database confirmed at `checked` (monotonic; 0 = needs confirming again) that the user
+    had no message after `head` and that every one in (floor, head] is held here, so a read
+    after a cursor in that range is answered without a query while the confirmation is fresh.
+    Rows outside the range are only a cache of row contents for reads that do query. The range
+    never reaches below `trimmed`, the newest id dropped to make room.
+    """
+    __slots__ = ("items", "floor", "head", "trimmed", "checked")
+
+    def __init__(self):
+        self.items: dict[int, Message] = {}
+        self.floor = self.head = self.trimmed = -1
+        self.checked = 0.0
+
+    def add(self, messages: list[Message]) -> None:
+        for m in messages:
+            self.items[m.id] = m
+        while len(self.items) > settings.MAILBOX_RING_SIZE:
+            oldest = min(self.items)
+            del self.items[oldest]
+            self.trimmed = max(self.trimmed, oldest)
+        self.floor = max(self.floor, self.trimmed)
+
+    def confirm(self, since: int, head: int, checked: float) -> None:
+        """Every message after `since` as of `checked` is held, the newest being `head` (or none: `since`)."""
+        if since <= self.head:   # overlaps the range already known: extend it
+            floor, self.head = min(self.floor, since), max(self.head, head)
+        else:
+            floor, self.head = since, head
+        self.floor = max(floor, self.trimmed)   # rows dropped to make room are no longer held
+        self.checked = max(self.checked, checked)
+
+    def covers(self, since: int, now: float) -> bool:
+        return self.floor <= since and now - self.checked < settings.MAILBOX_WAIT_POLL_S
+
+
+# Per-process state: rings of the MAILBOX_RING_USERS users read most recently through this
+# worker (least recently used first), and parked long-poll/SSE waiters with their cursors.
+_RINGS: OrderedDict[int, _Ring] = OrderedDict()
+_WAITERS: dict[int, set[tuple[asyncio.AbstractEventLoop, asyncio.Future, int]]] = {}
+_LOCK = threading.Lock()
+
+_COLUMNS = (
+    MailboxMessage.id, MailboxMessage.user_id, MailboxMessage.kind,
+    MailboxMessage.body, MailboxMessage.data, MailboxMessage.created_at,
+)
+
+
+def _message(row) -> Message:
+    m = Message(*row)
+    if m.created_at.tzinfo is None:  # SQLite hands back naive datetimes; they are stored as UTC
+        m = m._replace(created_at=m.created_at.replace(tzinfo=timezone.utc))
+    return m
+
+
+def _cutoff() -> Optional[datetime]:
+    """Oldest `created_at` still inside the retention window, or None when retention is off."""
+    hours = settings.MAILBOX_RETENTION_HOURS
+    return datetime.now(timezone.utc) - timedelta(hours=hours) if hours > 0 else None
+
+
+def _clamp(limit: Optional[int]) -> int:
+    if limit is None:
+        return settings.MAILBOX_DEFAULT_LIMIT
+    return max(1, min(limit, settings.MAILBOX_MAX_LIMIT))
+
+
+def _ring(user_id: int) -> _Ring:
+    """The user's ring, created if needed and marked most recently used. Hold _LOCK."""
+    ring = _RINGS.get(user_id)
+    if ring is None:
+        ring = _RINGS[user_id] = _Ring()
+        while len(_RINGS) > settings.MAILBOX_RING_USERS:
+            _RINGS.popitem(last=False)
+    else:
+        _RINGS.move_to_end(user_id)
+    return ring
+
+
+def _from_ring(user_id: int, since: int, limit: int) -> Optional[list[Message]]:
+    """The page after `since` straight from the ring, or None if the ring does not cover it."""
+    now = time.monotonic()
+    with _LOCK:
+        ring = _RINGS.get(user_id)
+        if ring is None or not ring.covers(since, now):
+            return None
+        _RINGS.move_to_end(user_id)
+        items = [ring.items[i] for i in sorted(ring.items) if since < i <= ring.head]
+    cutoff = _cutoff()
+    if cutoff is not None:
+        items = [m for m in items if m.created_at >= cutoff]
+    return items[:limit]
+
+
+def read_mailbox(db: Session, user_id: int, since: int = 0, limit: Optional[int] = None) -> list[Message]:
+    """
+    Messages for `user_id` with id > `since`, oldest first, at most `limit` (clamped to the
+    mailbox limits). Served from the in-process ring when it covers `since` and the database
+    confirmed it within MAILBOX_WAIT_POLL_S; otherwise the ids come from one (user_id, id) index
+    range query and only rows missing from the ring are fetched whole. Expired messages are
+    skipped even if the sweeper has not reached them yet.
+    """
+    limit = _clamp(limit)
+    cached = _from_ring(user_id, since, limit)
+    if cached is not None:
+        return cached
+
+    checked = time.monotonic()
+    cutoff = _cutoff()
+    stmt = select(MailboxMessage.id).where(MailboxMessage.user_id == user_id, MailboxMessage.id > since)
+    if cutoff is not None:
+        stmt = stmt.where(MailboxMessage.created_at >= cutoff)
+    ids = db.scalars(stmt.order_by(MailboxMessage.id).limit(limit)).all()
+
+    found: dict[int, Message] = {}
+    with _LOCK:
+        ring = _RINGS.get(user_id)
+        if ring is not None:
+            found = {i: ring.items[i] for i in ids if i in ring.items}
+    missing = [i for i in ids if i not in found]
+    fetched = []
+    if missing:
+        fetched = [_message(r) for r in db.execute(select(*_COLUMNS).where(MailboxMessage.id.in_(missing)))]
+        found.update((m.id, m) for m in fetched)
+    if settings.MAILBOX_RING_SIZE > 0 and settings.MAILBOX_RING_USERS > 0:
+        with _LOCK:
+            ring = _ring(user_id)
+            ring.add(fetched)
+            if len(ids) < limit:   # the whole tail after `since`, not just a page of it
+                ring.confirm(since, ids[-1] if ids else since, checked)
+    return [found[i] for i in ids if i in found]   # a row deleted in between is just left out
+
+
+def post_messages(db: Session, messages: list[tuple[int, str, str, Optional[dict]]]) -> list[Message]:
+    """
+    Insert (user_id, kind, body, data) messages with one executemany and a single commit,
+    then add them to any live rings and wake this worker's parked long-poll/SSE waiters.
+    """
+    if not messages:
+        return []
+    now = datetime.now(timezone.utc)
+    ids = db.scalars(
+        insert(MailboxMessage).returning(MailboxMessage.id, sort_by_parameter_order=True),
+        [{"user_id": u, "kind": k, "body": b, "data": d, "created_at": now} for u, k, b, d in messages],
+    ).all()
+    db.commit()
+    out = [Message(mid, u, k, b, d, now) for mid, (u, k, b, d) in zip(ids, messages)]
+
+    woken: list[tuple[asyncio.AbstractEventLoop, asyncio.Future, int]] = []
+    with _LOCK:
+        for m in out:
+            ring = _RINGS.get(m.user_id)
+            if ring is not None:
+                ring.add([m])
+                ring.checked = 0.0   # another worker may have posted between head and this one
+            woken.extend(_WAITERS.pop(m.user_id, ()))
+    _wake(woken)
+    return out
+
+
+def post_message(db: Session, user_id: int, kind: str, body: str, data: Optional[dict] = None) -> Message:
+    return post_messages(db, [(user_id, kind, body, data)])[0]
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+def _wake(waiters) -> None:
+    for loop, fut, _ in waiters:
+        loop.call_soon_threadsafe(_resolve, fut)
+
+
+def _read_fresh(user_id: int, since: int, limit: Optional[int]) -> list[Message]:
+    with SessionLocal() as db:
+        return read_mailbox(db, user_id, since, limit)
+
+
+async def long_poll(user_id: int, since: int, limit: Optional[int], timeout: float) -> list[Message]:
+    """
+    Messages after `since`, parking the request until one arrives or `timeout` passes.
+    The waiter is a bare future, registered before reading so no post can slip in between,
+    and resolved by `post_messages` for posts made here or by `poll_waiters` for posts made
+    by other workers. A parked request does no work of its own until it is woken.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        fut = loop.create_future()
+        entry = (loop, fut, since)
+        with _LOCK:
+            _WAITERS.setdefault(user_id, set()).add(entry)
+        try:
+            items = _from_ring(user_id, since, _clamp(limit))
+            if items is None:
+                items = await asyncio.to_thread(_read_fresh, user_id, since, limit)
+            remaining = deadline - loop.time()
+            if items or remaining <= 0:
+                return items
+            try:
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            with _LOCK:
+                waiters = _WAITERS.get(user_id)
+                if waiters is not None:
+                    waiters.discard(entry)
+                    if not waiters:
+                        _WAITERS.pop(user_id, None)
+
+
+def _latest_ids(user_ids: list[int]) -> dict[int, int]:
+    """Newest unexpired message id of each user that has one: one grouped query per 500 users."""
+    cutoff = _cutoff()
+    latest: dict[int, int] = {}
+    with SessionLocal() as db:
+        for i in range(0, len(user_ids), 500):
+            stmt = (
+                select(MailboxMessage.user_id, func.max(MailboxMessage.id))
+                .where(MailboxMessage.user_id.in_(user_ids[i:i + 500]))
+                .group_by(MailboxMessage.user_id)
+            )
+            if cutoff is not None:
+                stmt = stmt.where(MailboxMessage.created_at >= cutoff)
+            latest.update(db.execute(stmt).all())
+    return latest
+
+
+def poll_waiters() -> int:
+    """
+    Wake the parked waiters whose user has a message after their cursor, from the newest id of
+    every waited-on user in one grouped query; also confirms (or expires) those users' rings.
+    Returns the number of waiters woken.
+    """
+    with _LOCK:
+        users = list(_WAITERS)
+    if not users:
+        return 0
+    checked = time.monotonic()
+    latest = _latest_ids(users)
+    woken: list[tuple[asyncio.AbstractEventLoop, asyncio.Future, int]] = []
+    with _LOCK:
+        for user_id in users:
+            newest = latest.get(user_id, 0)
+            ring = _RINGS.get(user_id)
+            if ring is not None:
+                ring.checked = max(ring.checked, checked) if newest <= ring.head else 0.0
+            waiters = _WAITERS.get(user_id, ())
+            ready = [w for w in waiters if newest > w[2]]
+            for w in ready:
+                waiters.discard(w)
+            woken.extend(ready)
+    _wake(woken)
+    return len(woken)
+
+
+async def watch_mailbox_waiters(interval: float) -> None:
+    """Background task: every `interval` seconds, one `poll_waiters` pass while anyone is parked."""
+    while True:
+        await asyncio.sleep(interval)
+        if not _WAITERS:
+            continue
+        try:
+            await asyncio.to_thread(poll_waiters)
+        except Exception:
+            logger.exception("mailbox waiter poll failed")
+
+
+def delete_user_mailbox(db: Session, user_id: int) -> None:
+    """Delete a user's messages (part of the caller's transaction) and drop their ring."""
+    db.execute(delete(MailboxMessage).where(MailboxMessage.user_id == user_id))
+    with _LOCK:
+        _RINGS.pop(user_id, None)
+
+
+# ----- Retention -----
+
+_SWEEP_STATS = {
+    "passes": 0,
+    "rows_purged": 0,
+    "last_pass_rows": 0,
+    "last_pass_batches": 0,
+    "last_batch_ms": 0.0,
+    "max_batch_ms": 0.0,
+    "backlog": 0,
+    "last_run_at": None,
+}
+
+
+def purge_expired_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    Delete up to `batch_size` messages created before `cutoff`, oldest first, and commit.
+    The ids come from a LIMITed walk of the created_at index, so each call is one short write
+    transaction no matter how large the expired backlog is.
+    """
+    oldest = (
+        select(MailboxMessage.id)
+        .where(MailboxMessage.created_at < cutoff)
+        .order_by(MailboxMessage.created_at)
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(MailboxMessage).where(MailboxMessage.id.in_(oldest)),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    return result.rowcount
+
+
+def count_expired(db: Session, cutoff: datetime) -> int:
+    return db.scalar(select(func.count()).where(MailboxMessage.created_at < cutoff)) or 0
+
+
+def _sweep_batch(cutoff: datetime, batch_size: int) -> tuple[int, float]:
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        n = purge_expired_batch(db, cutoff, batch_size)
+    return n, (time.perf_counter() - t0) * 1000.0
+
+
+def _finish_pass(cutoff: datetime, vacuum_pages: int) -> int:
+    if vacuum_pages > 0:
+        # No-op unless the database was created (or VACUUMed) with auto_vacuum=INCREMENTAL
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+            conn.commit()
+    with SessionLocal() as db:
+        return count_expired(db, cutoff)
+
+
+async def sweep_mailbox_once() -> dict:
+    """
+    One retention pass: purge expired messages in MAILBOX_SWEEP_BATCH-sized transactions,
+    sleeping MAILBOX_SWEEP_PAUSE_MS between them so live writers are never queued behind a
+    long delete, and stop after MAILBOX_SWEEP_MAX_BATCHES. Returns the updated stats.
+    """
+    cutoff = _cutoff()
+    if cutoff is None:
+        return retention_stats()
+    batch_size = max(1, settings.MAILBOX_SWEEP_BATCH)
+    pause = settings.MAILBOX_SWEEP_PAUSE_MS / 1000.0
+    rows = batches = 0
+    while batches < settings.MAILBOX_SWEEP_MAX_BATCHES:
+        n, ms = await asyncio.to_thread(_sweep_batch, cutoff, batch_size)
+        batches += 1
+        rows += n
+        _SWEEP_STATS["last_batch_ms"] = ms
+        _SWEEP_STATS["max_batch_ms"] = max(_SWEEP_STATS["max_batch_ms"], ms)
+        if n < batch_size:
+            break
+        await asyncio.sleep(pause)
+    backlog = await asyncio.to_thread(_finish_pass, cutoff, settings.MAILBOX_SWEEP_VACUUM_PAGES)
+    _SWEEP_STATS.update(
+        passes=_SWEEP_STATS["passes"] + 1,
+        rows_purged=_SWEEP_STATS["rows_purged"] + rows,
+        last_pass_rows=rows,
+        last_pass_batches=batches,
+        backlog=backlog,
+        last_run_at=datetime.now(timezone.utc),
+    )
+    if rows:
+        logger.info("mailbox retention: purged %d rows in %d batches, backlog %d", rows, batches, backlog)
+    return retention_stats()
+
+
+async def watch_mailbox_retention(interval: float) -> None:
+    """Background task: run a retention pass every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sweep_mailbox_once()
+        except Exception:
+            logger.exception("mailbox retention pass failed")
+
+
+def retention_stats() -> dict:
+    return {"retention_hours": settings.MAILBOX_RETENTION_HOURS, **_SWEEP_STATS}
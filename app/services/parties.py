@@ -0,0 +1,420 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.anchor_optin import AnchorOptIn
+from app.models.party import Party, PartyInvite, PartyMember
+from app.models.user import User
+from app.models.vector import Vector
+from app.services.anchors import get_anchor, get_ghost
+from app.services.grouping import form_groups, grouping_stats
+from app.services.mailbox import post_messages
+from app.services.user_index import user_index
+
+logger = logging.getLogger(__name__)
+
+
+class _Seats:
+    """In-process view of an open party, so a join is checked in O(1) without a query."""
+    __slots__ = ("max_size", "deadline", "members", "invited", "open")
+
+    def __init__(self, max_size: int, deadline: float, members: set[int], invited: set[int]):
+        self.max_size = max_size
+        self.deadline = deadline
+        self.members = members
+        self.invited = invited
+        self.open = True
+
+
+_SEATS: dict[int, _Seats] = {}
+_LOCK = threading.Lock()
+
+
+class ExpiryScheduler:
+    """
+    Single heap of (deadline, key) drained by one asyncio task. `schedule` may be called
+    from any thread; it only wakes the task when the new deadline becomes the earliest, so
+    thousands of open parties cost one sleeping coroutine, not a timer each.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int]] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, deadline: float, key: int) -> None:
+        """Fire `key` at `deadline` (epoch seconds)."""
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, key))
+            earliest = self._heap[0] == (deadline, key)
+            loop, wake = self._loop, self._wake
+        if earliest and loop is not None:
+            loop.call_soon_threadsafe(wake.set)
+
+    def _pop_due(self) -> tuple[list[int], Optional[float]]:
+        now = time.time()
+        due: list[int] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+            delay = self._heap[0][0] - now if self._heap else None
+        return due, delay
+
+    async def run(self, handler: Callable[[list[int]], Awaitable[None]]) -> None:
+        """Background task: hand every batch of due keys to `handler`."""
+        self._loop, self._wake = asyncio.get_running_loop(), asyncio.Event()
+        try:
+            while True:
+                self._wake.clear()   # before reading the heap, so a concurrent schedule() isn't lost
+                due, delay = self._pop_due()
+                if due:
+                    try:
+                        await handler(due)
+                    except Exception:
+                        logger.exception("party expiry failed for %s", due)
+                    continue
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._loop = self._wake = None
+
+
+scheduler = ExpiryScheduler()
+
+
+def _render(template: str, **values) -> str:
+    """str.format that leaves unknown placeholders as-is instead of raising."""
+    class _Values(dict):
+        def __missing__(self, key):
+            return "{" + key + "}"
+    return template.format_map(_Values(values))
+
+
+def as_utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def get_party(db: Session, party_id: int) -> Party:
+    party = db.get(Party, party_id)
+    if not party:
+        raise HTTPException(status_code=404, detail="party not found")
+    return party
+
+
+def party_members(db: Session, party_id: int) -> list[int]:
+    return list(db.scalars(
+        select(PartyMember.user_id).where(PartyMember.party_id == party_id).order_by(PartyMember.joined_at)
+    ))
+
+
+def start_party(db: Session, initiator_id: int, initiator_username: str, slug: str,
+                fanout: Optional[int] = None) -> tuple[Party, int]:
+    """
+    Open a party for ghost anchor `slug` and invite the `fanout` users whose vectors are
+    closest to the anchor (to the initiator's own vector if the anchor has none).
+    The template is rendered once and every invitation goes out in one executemany, in the
+    same transaction as the party row. Returns (party, invited).
+    """
+    import numpy as np
+    anchor = get_ghost(slug)
+    if anchor is None:
+        raise HTTPException(status_code=404, detail="ghost anchor not found")
+    query = np.frombuffer(anchor.reduced_i8, dtype=np.int8)
+    if not query.any():   # no vector (the loader stores zero-norm ones as empty)
+        query = user_index.get(initiator_id)
+        if query is None:
+            raise HTTPException(status_code=422, detail="anchor and initiator both lack a vector")
+
+    meta = anchor.meta
+    fanout = min(fanout if fanout is not None else settings.PARTY_INVITE_FANOUT, settings.PARTY_INVITE_MAX)
+    candidates = max(settings.VECTOR_SEARCH_CANDIDATES, fanout) if settings.VECTOR_SEARCH_MODE == "binary" else None
+    invitees = [uid for uid, _ in user_index.search(query, fanout, exclude=initiator_id, candidates=candidates)]
+
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(minutes=meta["join_window_min"])
+    party = Party(
+        anchor_slug=slug,
+        initiator_id=initiator_id,
+        status="open",
+        min_size=meta["min_size"],
+        max_size=meta["max_size"],
+        member_count=1,
+        invited_count=len(invitees),
+        expires_at=expires_at,
+        created_at=now,
+    )
+    db.add(party)
+    db.flush()
+    db.add(PartyMember(party_id=party.id, user_id=initiator_id, joined_at=now))
+    db.flush()
+    if invitees:
+        db.execute(insert(PartyInvite), [{"party_id": party.id, "user_id": uid} for uid in invitees])
+
+    body = _render(
+        meta["notify_template"],
+        initiator_username=initiator_username,
+        anchor_title=anchor.title,
+        min_size=party.min_size,
+        max_size=party.max_size,
+    )
+    data = {"party_id": party.id, "anchor": slug, "expires_at": expires_at.isoformat()}
+    post_messages(db, [(uid, "party_invite", body, data) for uid in invitees])
+    if not invitees:
+        db.commit()
+    db.refresh(party)
+
+    with _LOCK:
+        _SEATS[party.id] = _Seats(party.max_size, expires_at.timestamp(), {initiator_id}, set(invitees))
+    scheduler.schedule(expires_at.timestamp(), party.id)
+    return party, len(invitees)
+
+
+def _load_seats(db: Session, party_id: int) -> _Seats:
+    """Seats for a party this process did not start (or forgot after a restart)."""
+    party = get_party(db, party_id)
+    deadline = as_utc(party.expires_at).timestamp()
+    if party.status != "open" or deadline <= time.time():
+        raise HTTPException(status_code=409, detail="party is closed")
+    invited = set(db.scalars(select(PartyInvite.user_id).where(PartyInvite.party_id == party_id)))
+    seats = _Seats(party.max_size, deadline, set(party_members(db, party_id)), invited)
+    with _LOCK:
+        return _SEATS.setdefault(party_id, seats)
+
+
+def join_party(db: Session, party_id: int, user_id: int) -> Party:
+    """
+    Take a seat in an open party the user was invited to. The invite and capacity checks are
+    set lookups and a length compare under one lock; the seat is reserved before touching
+    SQLite and released if the write fails. A conditional UPDATE keeps workers that don't
+    share this memory honest.
+    """
+    seats = _SEATS.get(party_id) or _load_seats(db, party_id)
+    with _LOCK:
+        if not seats.open or seats.deadline <= time.time():
+            raise HTTPException(status_code=409, detail="party is closed")
+        if user_id in seats.members:
+            raise HTTPException(status_code=409, detail="already joined")
+        if user_id not in seats.invited:
+            raise HTTPException(status_code=403, detail="not invited to this party")
+        if len(seats.members) >= seats.max_size:
+            raise HTTPException(status_code=409, detail="party is full")
+        seats.members.add(user_id)
+
+    try:
+        taken = db.execute(
+            update(Party)
+            .where(Party.id == party_id, Party.status == "open", Party.member_count < Party.max_size)
+            .values(member_count=Party.member_count + 1)
+        ).rowcount
+        if not taken:
+            raise HTTPException(status_code=409, detail="party is full")
+        db.add(PartyMember(party_id=party_id, user_id=user_id, joined_at=datetime.now(timezone.utc)))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        with _LOCK:
+            seats.members.discard(user_id)
+        raise HTTPException(status_code=409, detail="already joined")
+    except BaseException:
+        db.rollback()
+        with _LOCK:
+            seats.members.discard(user_id)
+            _SEATS.pop(party_id, None)   # another worker changed it; reload on the next join
+        raise
+    return get_party(db, party_id)
+
+
+def expire_parties(party_ids: list[int]) -> dict[str, list[int]]:
+    """
+    Close the join window of `party_ids`: parties that reached min_size become "formed",
+    the rest "expired", and every member hears about it in one mailbox batch. The status
+    UPDATEs only touch rows still open, so a party is closed (and announced) once.
+    """
+    with _LOCK:
+        for pid in party_ids:
+            seats = _SEATS.pop(pid, None)
+            if seats is not None:
+                seats.open = False
+
+    now = datetime.now(timezone.utc)
+    due = (Party.id.in_(party_ids), Party.status == "open", Party.expires_at <= now)
+    with SessionLocal() as db:
+        formed = db.scalars(
+            update(Party).where(*due, Party.member_count >= Party.min_size)
+            .values(status="formed").returning(Party.id),
+            execution_options={"synchronize_session": False},
+        ).all()
+        expired = db.scalars(
+            update(Party).where(*due).values(status="expired").returning(Party.id),
+            execution_options={"synchronize_session": False},
+        ).all()
+        closed = {**{pid: "formed" for pid in formed}, **{pid: "expired" for pid in expired}}
+        if not closed:
+            db.commit()
+            return {"formed": [], "expired": []}
+
+        slugs = dict(db.execute(select(Party.id, Party.anchor_slug).where(Party.id.in_(closed))).all())
+        members = db.execute(
+            select(PartyMember.party_id, PartyMember.user_id).where(PartyMember.party_id.in_(closed))
+        ).all()
+        messages = []
+        for pid, uid in members:
+            ghost = get_ghost(slugs[pid])
+            title = ghost.title if ghost else slugs[pid]
+            if closed[pid] == "formed":
+                body = f"'{title}' is on!"
+            else:
+                body = f"'{title}' did not get enough people in time."
+            messages.append((uid, f"party_{closed[pid]}", body, {"party_id": pid, "anchor": slugs[pid]}))
+        post_messages(db, messages)
+        if not messages:
+            db.commit()
+    return {"formed": list(formed), "expired": list(expired)}
+
+
+async def _expire_due(party_ids: list[int]) -> None:
+    report = await asyncio.to_thread(expire_parties, party_ids)
+    if report["formed"] or report["expired"]:
+        logger.info("parties closed: %s", report)
+
+
+async def run_party_expiry() -> None:
+    """Background task driving `scheduler`; pair with `load_open_parties` at startup."""
+    await scheduler.run(_expire_due)
+
+
+def load_open_parties(db: Session) -> int:
+    """Schedule the expiry of every party still open (e.g. after a restart)."""
+    rows = db.execute(select(Party.id, Party.expires_at).where(Party.status == "open")).all()
+    for pid, expires_at in rows:
+        scheduler.schedule(as_utc(expires_at).timestamp(), pid)
+    return len(rows)
+
+
+# ----- Batch grouping for normal anchors -----
+
+def _normal_anchor(slug: str):
+    anchor = get_anchor(slug)
+    if anchor is None:
+        raise HTTPException(status_code=404, detail="anchor not found")
+    return anchor
+
+
+def opt_in(db: Session, user_id: int, slug: str) -> None:
+    _normal_anchor(slug)
+    db.merge(AnchorOptIn(anchor_slug=slug, user_id=user_id, created_at=datetime.now(timezone.utc)))
+    db.commit()
+
+
+def opt_out(db: Session, user_id: int, slug: str) -> None:
+    db.execute(delete(AnchorOptIn).where(AnchorOptIn.anchor_slug == slug, AnchorOptIn.user_id == user_id))
+    db.commit()
+
+
+def form_anchor_groups(db: Session, slug: str, target_size: Optional[float] = None,
+                       apply: bool = False) -> dict:
+    """
+    Partition the users opted in to normal anchor `slug` into groups within its
+    min_size/max_size, by the similarity of their stored int8 vectors (see grouping.py).
+    Users without a vector are reported as unassigned.
+
+    With `apply`, every group becomes a "formed" party in one transaction: parties and
+    members are inserted with executemany, the grouped users' opt-ins are removed and each
+    member gets a mailbox message. Returns the groups (user ids), unassigned ids and stats.
+    """
+    import numpy as np
+    anchor = _normal_anchor(slug)
+    rows = db.execute(
+        select(AnchorOptIn.user_id, Vector.data)
+        .outerjoin(User, User.id == AnchorOptIn.user_id)
+        .outerjoin(Vector, User.vector_id == Vector.id)
+        .where(AnchorOptIn.anchor_slug == slug)
+        .order_by(AnchorOptIn.user_id)
+    ).all()
+    dim = settings.VECTOR_DIM
+    pool = [(uid, data) for uid, data in rows if data is not None and len(data) == dim]
+    no_vector = [uid for uid, data in rows if data is None or len(data) != dim]
+    ids = np.fromiter((uid for uid, _ in pool), dtype=np.int64, count=len(pool))
+    data = np.frombuffer(b"".join(d for _, d in pool), dtype=np.int8).reshape(len(pool), dim)
+
+    t0 = time.perf_counter()
+    grouping = form_groups(data, anchor.meta["min_size"], anchor.meta["max_size"], target_size)
+    stats = grouping_stats(data, grouping)
+    stats["seconds"] = time.perf_counter() - t0
+    groups = [ids[g].tolist() for g in grouping.groups]
+    unassigned = ids[grouping.unassigned].tolist() + no_vector
+
+    party_ids: list[int] = []
+    if apply and groups:
+        now = datetime.now(timezone.utc)
+        party_ids = db.scalars(
+            insert(Party).returning(Party.id, sort_by_parameter_order=True),
+            [
+                {
+                    "anchor_slug": slug, "initiator_id": members[0], "status": "formed",
+                    "min_size": anchor.meta["min_size"], "max_size": anchor.meta["max_size"],
+                    "member_count": len(members), "invited_count": 0,
+                    "expires_at": now, "created_at": now,
+                }
+                for members in groups
+            ],
+        ).all()
+        db.execute(insert(PartyMember), [
+            {"party_id": pid, "user_id": uid, "joined_at": now}
+            for pid, members in zip(party_ids, groups) for uid in members
+        ])
+        grouped = [uid for members in groups for uid in members]
+        db.execute(delete(AnchorOptIn).where(AnchorOptIn.anchor_slug == slug, AnchorOptIn.user_id.in_(grouped)))
+        post_messages(db, [
+            (uid, "party_formed", f"You're in a group of {len(members)} for '{anchor.title}'.",
+             {"party_id": pid, "anchor": slug})
+            for pid, members in zip(party_ids, groups) for uid in members
+        ])
+    return {"groups": groups, "unassigned": unassigned, "party_ids": list(party_ids), "stats": stats}
+
+
+def delete_user_parties(db: Session, user_id: int) -> None:
+    """
+    Drop a user's memberships, invites, opt-ins and the parties they started (part of the
+    caller's transaction). Open parties they had joined get their seat back; the member
+    count of formed and expired parties stays what it was when they closed.
+    """
+    db.execute(delete(AnchorOptIn).where(AnchorOptIn.user_id == user_id))
+    started = db.scalars(select(Party.id).where(Party.initiator_id == user_id)).all()
+    joined = select(PartyMember.party_id).where(PartyMember.user_id == user_id)
+    db.execute(
+        update(Party).where(Party.id.in_(joined), Party.status == "open").values(member_count=Party.member_count - 1),
+        execution_options={"synchronize_session": False},
+    )
+    db.execute(delete(PartyMember).where(PartyMember.user_id == user_id))
+    db.execute(delete(PartyInvite).where(PartyInvite.user_id == user_id))
+    if started:
+        db.execute(delete(PartyMember).where(PartyMember.party_id.in_(started)))
+        db.execute(delete(PartyInvite).where(PartyInvite.party_id.in_(started)))
+        db.execute(delete(Party).where(Party.id.in_(started)))
+    with _LOCK:
+        for pid in started:
+            seats = _SEATS.pop(pid, None)
+            if seats is not None:
+                seats.open = False
+        for seats in _SEATS.values():
+            seats.members.discard(user_id)
+            seats.invited.discard(user_id)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, database_lock
+from app.models.recommendation import UserRecommendation
+from app.models.user import User
+from app.models.vector import Vector
+from app.services.anchors import Anchor, AnchorMatrix, Catalogue, get_anchor, get_ghost, on_publish, published_catalogue
+from app.services.parties import as_utc
+
+logger = logging.getLogger(__name__)
+
+# Per-user top-k anchors and ghost templates, materialized in user_recommendations. A row is
+# rewritten when its user's vector changes (create/attach) and, in vectorized batches, when a
+# new catalogue is published; reads are one keyed lookup. Rows carry the catalogue content key
+# and the vector id they were computed for, so a stale row is detected (and recomputed on the
+# fly) instead of served.
+
+
+class Recommendations(NamedTuple):
+    user_id: int
+    catalogue: str                            # catalogue content key the lists were computed against
+    computed_at: datetime
+    materialized: bool                        # False: computed for this read (row missing or stale)
+    anchors: List[Tuple[Anchor, float]]       # best first, up to RECOMMEND_K
+    ghosts: List[Tuple[Anchor, float]]
+
+
+def _top(snap: AnchorMatrix, queries: np.ndarray, k: int) -> List[List[list]]:
+    """Per query row, the [slug, score] pairs of its `k` best anchors (only anchors with a vector)."""
+    n = len(snap.anchors)
+    k = min(k, int(snap.has_vector.sum()))
+    if k == 0:
+        return [[] for _ in range(len(queries))]
+    scores = queries @ snap.matrix.T
+    scores[:, ~snap.has_vector] = -np.inf
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (len(queries), 1))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+    return [
+        [[snap.anchors[i].slug, float(s)] for i, s in zip(row, row_scores)]
+        for row, row_scores in zip(top.tolist(), top_scores.tolist())
+    ]
+
+
+def _rank(catalogue: Catalogue, blobs: Sequence[bytes]) -> Tuple[List[List[list]], List[List[list]]]:
+    """(anchors, ghosts) top-k lists for packed int8 user vectors, one matmul per kind."""
+    q = np.frombuffer(b"".join(blobs), dtype=np.int8).reshape(len(blobs), settings.VECTOR_DIM).astype(np.float32) / 127.0
+    k = settings.RECOMMEND_K
+    return _top(catalogue.anchors, q, k), _top(catalogue.ghosts, q, k)
+
+
+def store_recommendations(db: Session, users: Sequence[Tuple[int, int, bytes]]) -> str:
+    """
+    Recompute the rows of `users` ((user_id, vector_id, packed vector) each) against the
+    published catalogue and replace them. Flushes, does not commit; returns the catalogue key used.
+    """
+    catalogue = published_catalogue()
+    if not users:
+        return catalogue.key
+    anchors, ghosts = _rank(catalogue, [u[2] for u in users])
+    now = datetime.now(timezone.utc)
+    db.execute(delete(UserRecommendation).where(UserRecommendation.user_id.in_([u[0] for u in users])))
+    db.execute(insert(UserRecommendation), [
+        {"user_id": uid, "vector_id": vid, "catalogue": catalogue.key, "anchors": a, "ghosts": g, "computed_at": now}
+        for (uid, vid, _), a, g in zip(users, anchors, ghosts)
+    ])
+    return catalogue.key
+
+
+def delete_user_recommendations(db: Session, user_id: int) -> None:
+    """Part of the caller's transaction."""
+    db.execute(delete(UserRecommendation).where(UserRecommendation.user_id == user_id))
+
+
+def _resolve(pairs: list, ghost: bool) -> List[Tuple[Anchor, float]]:
+    get = get_ghost if ghost else get_anchor
+    out = []
+    for slug, score in pairs:
+        a = get(slug)
+        if a is not None:
+            out.append((a, score))
+    return out
+
+
+def get_recommendations(db: Session, user_id: int) -> Recommendations:
+    """
+    The user's materialized recommendations, in one keyed query. A missing or stale row
+    (other catalogue, other vector) is recomputed for this read only; the write paths and the
+    publish-time refresh are what keep the table current.
+    """
+    row = db.execute(
+        select(User.vector_id, Vector.dim, Vector.data, UserRecommendation)
+        .outerjoin(Vector, User.vector_id == Vector.id)
+        .outerjoin(UserRecommendation, UserRecommendation.user_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    vector_id, dim, blob, rec = row
+    if vector_id is None or blob is None:
+        raise HTTPException(status_code=422, detail="user has no vector")
+    if dim != settings.VECTOR_DIM:   # like refresh_stale, which never materializes such a row
+        raise HTTPException(status_code=422, detail="vector dimension mismatch")
+    catalogue = published_catalogue()
+    if rec is not None and rec.catalogue == catalogue.key and rec.vector_id == vector_id:
+        return Recommendations(user_id, rec.catalogue, as_utc(rec.computed_at), True,
+                               _resolve(rec.anchors, False), _resolve(rec.ghosts, True))
+    anchors, ghosts = _rank(catalogue, [blob])
+    return Recommendations(user_id, catalogue.key, datetime.now(timezone.utc), False,
+                           _resolve(anchors[0], False), _resolve(ghosts[0], True))
+
+
+def refresh_stale(batch_size: Optional[int] = None) -> int:
+    """
+    Recompute every row that is missing or computed against another catalogue or vector, in
+    keyset batches of `batch_size` users (one matmul and one transaction each). Stops early if
+    the catalogue changes meanwhile; the next pass picks up from there. Returns rows written.
+    """
+    batch_size = batch_size or settings.RECOMMEND_BATCH
+    key = published_catalogue().key
+    written, after = 0, 0
+    with SessionLocal() as db:
+        while published_catalogue().key == key:
+            users = db.execute(
+                select(User.id, User.vector_id, Vector.data)
+                .join(Vector, User.vector_id == Vector.id)
+                .outerjoin(UserRecommendation, UserRecommendation.user_id == User.id)
+                .where(
+                    User.id > after,
+                    Vector.dim == settings.VECTOR_DIM,
+                    or_(
+                        UserRecommendation.user_id.is_(None),
+                        UserRecommendation.catalogue != key,
+                        UserRecommendation.vector_id != User.vector_id,
+                    ),
+                )
+                .order_by(User.id)
+                .limit(batch_size)
+            ).all()
+            if not users:
+                break
+            store_recommendations(db, [tuple(u) for u in users])
+            db.commit()
+            written += len(users)
+            after = users[-1][0]
+    return written
+
+
+_WAKE: Optional[asyncio.Event] = None
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _on_publish() -> None:
+    # Runs in whichever thread published; the refresh itself happens in run_recommendation_refresh.
+    loop, wake = _LOOP, _WAKE
+    if loop is not None and wake is not None:
+        loop.call_soon_threadsafe(wake.set)
+
+
+on_publish(_on_publish)
+
+
+def _refresh_if_elected() -> Optional[int]:
+    """Run `refresh_stale` unless another worker is already refreshing (then None)."""
+    with database_lock("recommend", blocking=False) as acquired:
+        return refresh_stale() if acquired else None
+
+
+async def run_recommendation_refresh() -> None:
+    """
+    Background task: bring the table up to date now and after every catalogue publish. One
+    worker at a time refreshes; the others, and a pass that failed, try again after
+    RECOMMEND_RETRY_S, so a refresher that dies or hits a locked database is taken over.
+    """
+    global _WAKE, _LOOP
+    _LOOP, _WAKE = asyncio.get_running_loop(), asyncio.Event()
+    _WAKE.set()
+    try:
+        while True:
+            await _WAKE.wait()
+            _WAKE.clear()
+            try:
+                written = await asyncio.to_thread(_refresh_if_elected)
+            except Exception:
+                logger.exception("recommendation refresh failed; retrying in %.0fs", settings.RECOMMEND_RETRY_S)
+                written = None
+            if written is None:
+                _LOOP.call_later(settings.RECOMMEND_RETRY_S, _WAKE.set)
+            elif written:
+                logger.info("recomputed recommendations for %d users (catalogue %s)", written, published_catalogue().key)
+    finally:
+        _LOOP = _WAKE = None
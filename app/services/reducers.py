@@ -0,0 +1,126 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+# A reducer maps raw embeddings (e.g. 384-dim) to VECTOR_DIM: out = unit((raw - mean) @ components).
+# Each one lives in REDUCER_DIR/<reducer_id>/ as meta.json + mean.npy + components.npy and is
+# memory-mapped on first use. Ids are immutable: refitting means a new id.
+
+
+class Reducer(NamedTuple):
+    reducer_id: str
+    method: str                # "pca" | "random"
+    mean: np.ndarray           # (in_dim,) float32
+    components: np.ndarray     # (in_dim, out_dim) float32
+
+    @property
+    def in_dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def out_dim(self) -> int:
+        return self.components.shape[1]
+
+    def reduce(self, raw: np.ndarray) -> np.ndarray:
+        """(n, in_dim) raw vectors -> (n, out_dim) float32 unit rows, in one matmul."""
+        raw = np.atleast_2d(np.asarray(raw, dtype=np.float32))
+        if raw.ndim != 2 or raw.shape[1] != self.in_dim:
+            raise ValueError(f"raw vectors have dim {raw.shape[-1]}, reducer {self.reducer_id!r} expects {self.in_dim}")
+        out = (raw - self.mean) @ self.components
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+_REDUCERS: Dict[str, Reducer] = {}
+_LOCK = threading.Lock()
+
+
+def reducer_path(reducer_id: str, root: Optional[Path] = None) -> Path:
+    if not reducer_id or "/" in reducer_id or "\\" in reducer_id or reducer_id.startswith("."):
+        raise ValueError(f"invalid reducer_id {reducer_id!r}")
+    return Path(root or settings.REDUCER_DIR) / reducer_id
+
+
+def fit_pca(raw: np.ndarray, out_dim: int) -> tuple[np.ndarray, np.ndarray]:
+    """(mean, components) of the top `out_dim` principal directions of `raw` (n, in_dim)."""
+    raw = np.asarray(raw, dtype=np.float32)
+    if raw.shape[0] < out_dim:
+        raise ValueError(f"PCA to {out_dim} dims needs at least {out_dim} samples, got {raw.shape[0]}")
+    mean = raw.mean(axis=0)
+    _, _, vt = np.linalg.svd(raw - mean, full_matrices=False)
+    return mean.astype(np.float32), np.ascontiguousarray(vt[:out_dim].T, dtype=np.float32)
+
+
+def fit_random(in_dim: int, out_dim: int, seed: int = 0, raw: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Random projection with orthonormal columns (Gaussian + QR), which needs no training data;
+    `raw`, if given, only supplies the mean to center on.
+    """
+    if out_dim > in_dim:
+        raise ValueError(f"cannot project {in_dim} dims up to {out_dim}")
+    q, _ = np.linalg.qr(np.random.default_rng(seed).normal(size=(in_dim, out_dim)))
+    mean = np.asarray(raw, dtype=np.float32).mean(axis=0) if raw is not None and len(raw) else np.zeros(in_dim)
+    return mean.astype(np.float32), np.ascontiguousarray(q, dtype=np.float32)
+
+
+def save_reducer(reducer_id: str, method: str, mean: np.ndarray, components: np.ndarray,
+                 root: Optional[Path] = None) -> Path:
+    """Persist a reducer; refuses to overwrite an existing id."""
+    path = reducer_path(reducer_id, root)
+    if (path / "meta.json").exists():
+        raise FileExistsError(f"reducer {reducer_id!r} already exists at {path}")
+    if mean.shape != (components.shape[0],):
+        raise ValueError("mean and components disagree on in_dim")
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / "mean.npy", np.asarray(mean, dtype=np.float32))
+    np.save(path / "components.npy", np.asarray(components, dtype=np.float32))
+    meta = {
+        "reducer_id": reducer_id,
+        "method": method,
+        "in_dim": int(components.shape[0]),
+        "out_dim": int(components.shape[1]),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    tmp = path / f"meta.json.tmp-{os.getpid()}"
+    tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    os.replace(tmp, path / "meta.json")   # written last: the reducer exists once this does
+    return path
+
+
+def get_reducer(reducer_id: str) -> Reducer:
+    """Load (memory-mapped, once per process) the reducer `reducer_id`; LookupError if missing."""
+    reducer = _REDUCERS.get(reducer_id)
+    if reducer is not None:
+        return reducer
+    path = reducer_path(reducer_id)
+    try:
+        meta = json.loads((path / "meta.json").read_bytes())
+        mean = np.load(path / "mean.npy", mmap_mode="r")
+        components = np.load(path / "components.npy", mmap_mode="r")
+    except FileNotFoundError as e:
+        raise LookupError(f"reducer {reducer_id!r} not found in {path.parent}") from e
+    if meta.get("reducer_id") != reducer_id or components.shape != (meta["in_dim"], meta["out_dim"]):
+        raise ValueError(f"reducer {reducer_id!r} at {path} is inconsistent")
+    reducer = Reducer(reducer_id, meta["method"], mean, components)
+    with _LOCK:
+        return _REDUCERS.setdefault(reducer_id, reducer)
+
+
+def reduce_batch(reducer_id: str, raw: np.ndarray) -> np.ndarray:
+    """
+    Reduce (n, in_dim) raw vectors with `reducer_id` to (n, VECTOR_DIM) unit rows.
+    LookupError if the reducer is missing, ValueError on any dimension mismatch.
+    """
+    reducer = get_reducer(reducer_id)
+    if reducer.out_dim != settings.VECTOR_DIM:
+        raise ValueError(f"reducer {reducer_id!r} outputs {reducer.out_dim} dims, VECTOR_DIM is {settings.VECTOR_DIM}")
+    return reducer.reduce(raw)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional
+
+from app.core.config import settings
+
+
+class UserRow(NamedTuple):
+    """Read model behind UserRead: the user columns only, never the vector blob."""
+    id: int
+    username: str
+    first_name: Optional[str]
+    vector_id: Optional[int]
+
+
+class LRUCache:
+    """Bounded LRU with a per-entry TTL and hit/miss/eviction counters. Thread-safe."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: object) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Keys are ("id", user_id) and ("username", username), both pointing at the same UserRow.
+user_cache = LRUCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_S)
+
+
+def cache_user(row: UserRow) -> None:
+    user_cache.set(("id", row.id), row)
+    user_cache.set(("username", row.username), row)
+
+
+def invalidate_user(user_id: int, username: str) -> None:
+    user_cache.delete(("id", user_id))
+    user_cache.delete(("username", username))
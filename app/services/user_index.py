@@ -0,0 +1,379 @@
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.shared_arrays import SharedArrays, SharedArraysReader, publish, publish_lock, read_header
+from app.models.user import User
+from app.models.vector import Vector
+
+logger = logging.getLogger(__name__)
+
+_SCALE = 127.0 * 127.0   # int8 dot product of two unit vectors -> cosine
+_FAR = np.iinfo(np.int32).max
+
+
+def sign_codes(data: np.ndarray) -> np.ndarray:
+    """
+    1-bit-per-dimension sign sketch of int8 vectors, packed into uint64 words
+    (128 dims -> 2 words / 16 bytes per row). Accepts (dim,) or (n, dim).
+    """
+    bits = np.packbits(np.atleast_2d(data) > 0, axis=1)
+    pad = -bits.shape[1] % 8
+    if pad:
+        bits = np.pad(bits, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+class UserVectorIndex:
+    """
+    Contiguous int8 matrix of user vectors with an id -> row map.
+
+    Writers (upsert/remove) take the lock; readers grab a consistent (data, ids, size)
+    snapshot under it and score without holding it. Deletes leave tombstones (id -1)
+    that are squeezed out by `compact()` once they make up `compact_ratio` of the rows.
+
+    Every row also carries a packed sign code (see `sign_codes`) so `search` can
+    optionally prefilter by Hamming distance and rerank only the survivors exactly.
+
+    With several workers, the bulk of the rows can instead come from a shared base
+    (`attach_base`): a read-only generation of (ids, data, codes) that every worker maps
+    from the same files. Local writes then only shadow base rows (`_base_dead`) and the
+    local arrays hold just the users written since that generation was read.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024, compact_ratio: float = 0.25, compact_min: int = 64):
+        self.dim = dim
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self._lock = threading.Lock()
+        self._data = np.zeros((capacity, dim), dtype=np.int8)
+        self._ids = np.full(capacity, -1, dtype=np.int64)
+        self._codes = sign_codes(self._data)
+        self._rows: dict[int, int] = {}
+        self._size = 0    # rows in use, tombstones included
+        self._dead = 0
+        self._base: Optional[SharedArrays] = None
+        self._base_dead = np.zeros(0, dtype=bool)   # base rows shadowed by a local write
+        self._base_dead_n = 0
+        self._stamps: dict[int, int] = {}           # user id -> time_ns of its last local write
+        self._removed: set[int] = set()             # ... whose last local write was a removal
+
+    def __len__(self) -> int:
+        base = 0 if self._base is None else len(self._base_dead) - self._base_dead_n
+        return len(self._rows) + base
+
+    @property
+    def base_generation(self) -> Optional[int]:
+        return None if self._base is None else self._base.generation
+
+    # ---- writes ----
+    def bulk_load(self, ids: np.ndarray, data: np.ndarray) -> None:
+        """Replace the whole index with `data[i]` for user `ids[i]`."""
+        n = len(ids)
+        cap = max(1024, n + n // 4)
+        new_data = np.zeros((cap, self.dim), dtype=np.int8)
+        new_ids = np.full(cap, -1, dtype=np.int64)
+        new_data[:n] = data
+        new_ids[:n] = ids
+        new_codes = sign_codes(new_data)
+        with self._lock:
+            self._data, self._ids, self._codes, self._size, self._dead = new_data, new_ids, new_codes, n, 0
+            self._rows = {int(uid): row for row, uid in enumerate(new_ids[:n])}
+            self._base, self._base_dead, self._base_dead_n = None, np.zeros(0, dtype=bool), 0
+            self._stamps, self._removed = {}, set()
+
+    def attach_base(self, shared: SharedArrays) -> None:
+        """
+        Serve the rows of `shared` (a generation with "ids" sorted ascending, "data" and
+        "codes") from its mapping. Local writes stamped before the generation was read from
+        the database (`meta["as_of_ns"]`) are already in it and are dropped; later ones keep
+        shadowing their base rows.
+        """
+        base_ids = shared.arrays["ids"]
+        if shared.arrays["data"].shape[1:] != (self.dim,):
+            raise ValueError(f"shared user matrix has dim {shared.arrays['data'].shape[1:]}, index has {self.dim}")
+        as_of = int(shared.meta.get("as_of_ns", 0))
+        with self._lock:
+            dead = np.zeros(len(base_ids), dtype=bool)
+            for uid, stamp in list(self._stamps.items()):
+                if stamp < as_of:
+                    del self._stamps[uid]
+                    self._removed.discard(uid)
+                    row = self._rows.pop(uid, None)
+                    if row is not None:
+                        self._ids[row] = -1
+                        self._dead += 1
+                    continue
+                base_row = _find(base_ids, uid)
+                if base_row is not None:
+                    dead[base_row] = True
+            self._base, self._base_dead, self._base_dead_n = shared, dead, int(dead.sum())
+            if self._dead >= self.compact_min and self._dead >= self.compact_ratio * self._size:
+                self._compact_locked()
+
+    def _shadow_locked(self, user_id: int, removed: bool) -> None:
+        if self._base is None:
+            return
+        self._stamps[user_id] = time.time_ns()
+        if removed:
+            self._removed.add(user_id)
+        else:
+            self._removed.discard(user_id)
+        row = _find(self._base.arrays["ids"], user_id)
+        if row is not None and not self._base_dead[row]:
+            self._base_dead[row] = True
+            self._base_dead_n += 1
+
+    def upsert(self, user_id: int, blob: bytes) -> None:
+        vec = np.frombuffer(blob, dtype=np.int8)
+        if vec.shape[0] != self.dim:
+            return
+        with self._lock:
+            self._shadow_locked(user_id, removed=False)
+            row = self._rows.get(user_id)
+            if row is None:
+                if self._size == len(self._ids):
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._rows[user_id] = row
+                self._ids[row] = user_id
+            self._data[row] = vec
+            self._codes[row] = sign_codes(vec)[0]
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            self._shadow_locked(user_id, removed=True)
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return
+            self._ids[row] = -1
+            self._dead += 1
+            if self._dead >= self.compact_min and self._dead >= self.compact_ratio * self._size:
+                self._compact_locked()
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact_locked()
+
+    def _grow(self) -> None:
+        cap = len(self._ids) * 2
+        data = np.zeros((cap, self.dim), dtype=np.int8)
+        ids = np.full(cap, -1, dtype=np.int64)
+        codes = np.zeros((cap, self._codes.shape[1]), dtype=np.uint64)
+        data[: self._size] = self._data[: self._size]
+        ids[: self._size] = self._ids[: self._size]
+        codes[: self._size] = self._codes[: self._size]
+        self._data, self._ids, self._codes = data, ids, codes
+
+    def _compact_locked(self) -> None:
+        # Fresh arrays, so readers still holding the old snapshot are unaffected.
+        live = self._ids[: self._size] >= 0
+        n = int(live.sum())
+        cap = max(1024, n + n // 4)
+        data = np.zeros((cap, self.dim), dtype=np.int8)
+        ids = np.full(cap, -1, dtype=np.int64)
+        codes = np.zeros((cap, self._codes.shape[1]), dtype=np.uint64)
+        data[:n] = self._data[: self._size][live]
+        ids[:n] = self._ids[: self._size][live]
+        codes[:n] = self._codes[: self._size][live]
+        self._data, self._ids, self._codes, self._size, self._dead = data, ids, codes, n, 0
+        self._rows = {int(uid): row for row, uid in enumerate(ids[:n])}
+
+    # ---- reads ----
+    def get(self, user_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is not None:
+                return self._data[row].copy()
+            if self._base is None or user_id in self._removed:
+                return None
+            row = _find(self._base.arrays["ids"], user_id)
+            return None if row is None else np.array(self._base.arrays["data"][row])
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[int] = None,
+        candidates: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k (user_id, cosine) by int32-accumulated int8 dot product.
+
+        With `candidates`, run two stages instead of a full scan: keep the `candidates`
+        rows closest in Hamming distance over the sign codes, then rerank those exactly.
+        """
+        with self._lock:
+            data, ids, codes, size = self._data, self._ids, self._codes, self._size
+            skip = self._rows.get(exclude) if exclude is not None else None
+            base, base_dead = self._base, self._base_dead.copy()
+        if k <= 0:
+            return []
+
+        # Segments of (data, ids, codes, live mask): the shared base, then the local rows.
+        segments = []
+        if base is not None and len(base_dead):
+            live = ~base_dead
+            if exclude is not None:
+                row = _find(base.arrays["ids"], exclude)
+                if row is not None:
+                    live[row] = False
+            segments.append((base.arrays["data"], base.arrays["ids"], base.arrays["codes"], live))
+        if size:
+            live = ids[:size] >= 0
+            if skip is not None:
+                live[skip] = False
+            segments.append((data[:size], ids[:size], codes[:size], live))
+        total = sum(len(seg[1]) for seg in segments)
+        if total == 0:
+            return []
+        q32 = query.astype(np.int32)
+
+        if candidates is not None and candidates < total:
+            qcode = sign_codes(query)[0]
+            dists = []
+            for _, _, seg_codes, live in segments:
+                dist = np.bitwise_count(seg_codes ^ qcode).sum(axis=1, dtype=np.int32)
+                dist[~live] = _FAR
+                dists.append(dist)
+            dist = np.concatenate(dists)
+            picked = np.argpartition(dist, candidates)[:candidates]
+            picked = np.sort(picked[dist[picked] < _FAR])
+            offsets = np.cumsum([0] + [len(seg[1]) for seg in segments])
+            found_ids, found_scores = [], []
+            for (seg_data, seg_ids, _, _), lo, hi in zip(segments, offsets[:-1], offsets[1:]):
+                rows = picked[(picked >= lo) & (picked < hi)] - lo
+                found_ids.append(seg_ids[rows])
+                found_scores.append(np.einsum("ij,j->i", seg_data[rows], q32, dtype=np.int32))
+        else:
+            found_ids, found_scores = [], []
+            for seg_data, seg_ids, _, live in segments:
+                rows = np.flatnonzero(live)
+                found_ids.append(seg_ids[rows])
+                found_scores.append(np.einsum("ij,j->i", seg_data, q32, dtype=np.int32)[rows])
+        found = np.concatenate(found_ids)
+        scores = np.concatenate(found_scores)
+
+        n = len(scores)
+        k = min(k, n)
+        if k == 0:
+            return []
+        top = np.argpartition(scores, n - k)[n - k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(found[i]), float(scores[i]) / _SCALE) for i in top]
+
+
+def _find(sorted_ids: np.ndarray, user_id: int) -> Optional[int]:
+    """Row of `user_id` in an ascending id array, or None."""
+    row = int(np.searchsorted(sorted_ids, user_id))
+    return row if row < len(sorted_ids) and sorted_ids[row] == user_id else None
+
+
+user_index = UserVectorIndex(settings.VECTOR_DIM)
+
+
+def _read_user_matrix(db: Session) -> tuple[np.ndarray, np.ndarray]:
+    """(ids ascending, int8 data) of every user vector of VECTOR_DIM."""
+    rows = db.execute(
+        select(User.id, Vector.data)
+        .join(Vector, User.vector_id == Vector.id)
+        .where(Vector.dim == settings.VECTOR_DIM)
+        .order_by(User.id)
+    ).all()
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    data = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.int8).reshape(len(rows), settings.VECTOR_DIM)
+    return ids, data
+
+
+# ---- shared user matrix (USER_MATRIX_DIR) ----
+# One worker reads the users from the database and publishes them as a generation of
+# mmapped arrays; every worker attaches to it and keeps only its own later writes locally.
+# Writes made by other workers show up once the next generation is published, at most
+# USER_MATRIX_REFRESH_S later.
+
+_READER: Optional[SharedArraysReader] = None
+
+
+def _matrix_dir() -> Path:
+    return Path(settings.USER_MATRIX_DIR)
+
+
+def _stale(header: Optional[dict]) -> bool:
+    if header is None:
+        return True
+    meta = header.get("meta", {})
+    if meta.get("database") != settings.DATABASE_URL or meta.get("dim") != settings.VECTOR_DIM:
+        return True
+    return time.time_ns() - header["created_ns"] >= settings.USER_MATRIX_REFRESH_S * 1e9
+
+
+def publish_user_matrix(db: Session, directory: Optional[Path] = None) -> int:
+    """Read every user vector and publish it as the next shared generation. Hold `publish_lock`."""
+    as_of = time.time_ns()   # before the read: writes committed after this are newer than the generation
+    ids, data = _read_user_matrix(db)
+    meta = {"as_of_ns": as_of, "dim": settings.VECTOR_DIM, "database": settings.DATABASE_URL, "rows": len(ids)}
+    return publish(directory or _matrix_dir(), {"ids": ids, "data": data, "codes": sign_codes(data)}, meta)
+
+
+def _poll_shared() -> bool:
+    shared = _READER.poll() if _READER is not None else None
+    if shared is None:
+        return False
+    user_index.attach_base(shared)
+    return True
+
+
+def load_user_index(db: Session) -> int:
+    """
+    Load every user vector into `user_index`; returns the number of users it holds.
+    With USER_MATRIX_DIR set, the first worker to start publishes the shared matrix and the
+    others attach to it.
+    """
+    global _READER
+    if not settings.USER_MATRIX_DIR:
+        ids, data = _read_user_matrix(db)
+        user_index.bulk_load(ids, data)
+        return len(ids)
+
+    directory = _matrix_dir()
+    with publish_lock(directory):
+        if _stale(read_header(directory)):
+            publish_user_matrix(db, directory)
+    _READER = SharedArraysReader(directory)
+    if not _poll_shared():
+        raise RuntimeError(f"could not attach the shared user matrix in {directory}")
+    return len(user_index)
+
+
+def refresh_user_matrix() -> bool:
+    """Publish a new generation if the current one is due (unless another worker already is), then attach the newest."""
+    directory = _matrix_dir()
+    if _stale(read_header(directory)):
+        with publish_lock(directory, blocking=False) as acquired:
+            if acquired and _stale(read_header(directory)):
+                with SessionLocal() as db:
+                    publish_user_matrix(db, directory)
+    return _poll_shared()
+
+
+async def watch_user_matrix(interval: Optional[float] = None) -> None:
+    """Background task: follow the shared user matrix every `interval` seconds."""
+    interval = interval or settings.USER_MATRIX_CHECK_S
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await asyncio.to_thread(refresh_user_matrix):
+                logger.info("attached shared user matrix generation %s", user_index.base_generation)
+        except Exception:
+            logger.exception("shared user matrix refresh failed")
@@ -1,11 +1,29 @@
-import numpy as np
+from __future__ import annotations
+import threading
+import time
+from typing import TYPE_CHECKING
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from sqlalchemy import select, func
+from datetime import datetime, timezone
+from sqlalchemy import select, func, insert
 
 from app.core.config import settings
+from app.core.writer import writer
 from app.models.user import User
 from app.models.vector import Vector
+from app.services.anchors import Anchor, score_anchors
+from app.services.mailbox import delete_user_mailbox
+from app.services.parties import delete_user_parties
+from app.services.recommendations import delete_user_recommendations, get_recommendations, store_recommendations
+from app.services.reducers import reduce_batch
+from app.services.user_cache import UserRow, cache_user, invalidate_user, user_cache
+from app.services.user_index import user_index
+from app.services.vectors import (
+    ensure_vectors, get_or_create_vector, quantize_int8_normalized, validate_int8_blob,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
 
 # -------- helpers --------
 
@@ -19,6 +37,11 @@ def _ensure_vector_dim(data: list[float]) -> None:
             detail=f"Vector length {len(data)} != expected {settings.VECTOR_DIM}",
         )
 
+def _ensure_blob(blob: bytes) -> None:
+    err = validate_int8_blob(blob)
+    if err:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=err)
+
 def _pack_int8_normalized(vec_f32: list[float], *, renorm_tolerance: float = 1e-6) -> bytes:
     """
     Assumes the intent is L2-normalized input. We gently renormalize to be robust:
@@ -26,58 +49,205 @@ def _pack_int8_normalized(vec_f32: list[float], *, renorm_tolerance: float = 1e-
       - else vec := vec / norm
     Then quantize with fixed mapping: q = round(127 * vec), clamped to [-127, 127].
     """
-    arr = np.asarray(vec_f32, dtype=np.float32)
-    norm = float(np.linalg.norm(arr))
-    if norm == 0.0:
+    import numpy as np
+    arr = np.asarray(vec_f32, dtype=np.float32).reshape(1, -1)
+    q, zero = quantize_int8_normalized(arr, renorm_tolerance=renorm_tolerance)
+    if zero[0]:
         raise HTTPException(status_code=422, detail="Zero-norm vector is not allowed")
-    if abs(norm - 1.0) > renorm_tolerance:
-        arr = arr / norm  # gentle renorm; keeps contract "normalized"
-    q = np.clip(np.round(arr * 127.0), -127, 127).astype(np.int8)
-    return q.tobytes()
-
-def _create_vector(db: Session, vec_f32: list[float]) -> Vector:
-    _ensure_vector_dim(vec_f32)
-    blob = _pack_int8_normalized(vec_f32)
-    vec = Vector(dim=len(vec_f32), data=blob)
-    if len(blob) != vec.dim:
+    return q[0].tobytes()
+
+def check_reducer_id(reducer_id: str | None) -> None:
+    """422 unless `reducer_id` (if the client sent one) is the reducer this server uses."""
+    if reducer_id is not None and reducer_id != settings.REDUCER_ID:
+        raise HTTPException(
+            status_code=422,
+            detail=f"reducer_id {reducer_id!r} does not match the server's ({settings.REDUCER_ID!r})",
+        )
+
+def reduce_raw_vectors(raw: list[list[float]]) -> np.ndarray:
+    """Reduce raw embeddings to VECTOR_DIM unit rows with settings.REDUCER_ID, in one matmul."""
+    import numpy as np
+    if settings.REDUCER_ID is None:
+        raise HTTPException(status_code=422, detail="raw vectors are not accepted: no reducer configured")
+    try:
+        return reduce_batch(settings.REDUCER_ID, np.asarray(raw, dtype=np.float32))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _create_vector(db: Session, vec_f32: list[float] | bytes) -> Vector:
+    """`vec_f32` is either floats to normalize and quantize, or an already-packed int8 blob stored as-is."""
+    if isinstance(vec_f32, bytes):
+        blob = vec_f32
+        _ensure_blob(blob)
+    else:
+        _ensure_vector_dim(vec_f32)
+        blob = _pack_int8_normalized(vec_f32)
+    if len(blob) != len(vec_f32):
         # 1 byte per dim invariant
         raise HTTPException(status_code=500, detail="packed vector size mismatch")
-    db.add(vec)
-    db.flush()
-    return vec
+    return get_or_create_vector(db, blob)  # content-addressed: identical blobs share a row
 
 # -------- CRUD unchanged below (uses _create_vector) --------
 
+def _write(db: Session, job):
+    """
+    Run a write job (a function of a Session that flushes but does not commit): through the
+    group-commit writer when it is running, otherwise on `db` followed by a commit.
+    """
+    if writer.running:
+        return writer.submit(job)
+    result = job(db)
+    db.commit()
+    return result
+
 def create_user(db: Session, email: str, first_name: str | None,
-                vector_id: int | None, vector_data: list[float] | None) -> User:
+                vector_id: int | None, vector_data: list[float] | bytes | None) -> User:
     username = username_from_email(email)
-    exists = db.scalar(select(func.count()).select_from(User).where(User.username == username))
-    if exists:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="username already exists")
-
-    vec_obj: Vector | None = None
     if vector_id is not None and vector_data is not None:
         raise HTTPException(status_code=400, detail="Provide either vector_id or vector, not both")
 
-    if vector_id is not None:
-        vec_obj = db.get(Vector, vector_id)
-        if not vec_obj:
-            raise HTTPException(status_code=404, detail="vector not found")
-        if vec_obj.dim != settings.VECTOR_DIM:
-            raise HTTPException(status_code=422, detail="vector dimension mismatch")
+    def job(s: Session) -> User:
+        exists = s.scalar(select(func.count()).select_from(User).where(User.username == username))
+        if exists:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="username already exists")
 
-    if vector_data is not None:
-        vec_obj = _create_vector(db, vector_data)
+        vec_obj: Vector | None = None
+        if vector_id is not None:
+            vec_obj = s.get(Vector, vector_id)
+            if not vec_obj:
+                raise HTTPException(status_code=404, detail="vector not found")
+            if vec_obj.dim != settings.VECTOR_DIM:
+                raise HTTPException(status_code=422, detail="vector dimension mismatch")
 
-    user = User(username=username, first_name=first_name, vector=vec_obj)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+        if vector_data is not None:
+            vec_obj = _create_vector(s, vector_data)
+
+        user = User(username=username, first_name=first_name, vector=vec_obj)
+        s.add(user)
+        s.flush()
+        if vec_obj is not None:
+            store_recommendations(s, [(user.id, vec_obj.id, vec_obj.data)])
+        return user
+
+    user = _write(db, job)
+    _adjust_count(1)
+    if user.vector is not None:
+        user_index.upsert(user.id, user.vector.data)
     return user
 
-def list_users(db: Session, offset: int, limit: int):
-    total = db.scalar(select(func.count()).select_from(User)) or 0
-    items = db.scalars(select(User).order_by(User.id).offset(offset).limit(limit)).all()
+def create_users_bulk(db: Session, entries: list[tuple[int, str, str | None, int | None, list[float] | bytes | None]]):
+    """
+    Create many users in one transaction. `entries` are (index, email, first_name, vector_id, vector_data),
+    where vector_data is floats or a packed int8 blob (stored as-is).
+
+    Returns {index: User-like row | error string}. Row-level problems (conflicting usernames,
+    bad vectors, unknown vector ids) are reported per index instead of failing the batch.
+    Uniqueness and vector-id checks are one IN query each; inline vectors are quantized in one
+    NumPy pass and inserted, like the users, with a single executemany.
+    """
+    import numpy as np
+    results: dict[int, object] = {}
+    pending = []  # (index, username, first_name, vector_id, vector_data)
+
+    usernames = {username_from_email(e[1]) for e in entries}
+    taken = set(db.scalars(select(User.username).where(User.username.in_(usernames)))) if usernames else set()
+    ref_ids = {e[3] for e in entries if e[3] is not None}
+    known_dims = dict(db.execute(select(Vector.id, Vector.dim).where(Vector.id.in_(ref_ids))).all()) if ref_ids else {}
+
+    for index, email, first_name, vector_id, vector_data in entries:
+        username = username_from_email(email)
+        if username in taken:
+            results[index] = "username already exists"
+        elif vector_id is not None and vector_data is not None:
+            results[index] = "Provide either vector_id or vector, not both"
+        elif vector_id is not None and vector_id not in known_dims:
+            results[index] = "vector not found"
+        elif vector_id is not None and known_dims[vector_id] != settings.VECTOR_DIM:
+            results[index] = "vector dimension mismatch"
+        elif isinstance(vector_data, bytes) and validate_int8_blob(vector_data):
+            results[index] = validate_int8_blob(vector_data)
+        elif vector_data is not None and len(vector_data) != settings.VECTOR_DIM:
+            results[index] = f"Vector length {len(vector_data)} != expected {settings.VECTOR_DIM}"
+        else:
+            taken.add(username)  # later duplicates inside the batch conflict too
+            pending.append((index, username, first_name, vector_id, vector_data))
+
+    blobs: dict[int, bytes] = {p[0]: p[4] for p in pending if isinstance(p[4], bytes)}
+    with_vec = [p for p in pending if p[4] is not None and p[0] not in blobs]
+    if with_vec:
+        q, zero = quantize_int8_normalized(np.asarray([p[4] for p in with_vec], dtype=np.float32))
+        for p, row, is_zero in zip(with_vec, q, zero):
+            if is_zero:
+                results[p[0]] = "Zero-norm vector is not allowed"
+            else:
+                blobs[p[0]] = row.tobytes()
+        pending = [p for p in pending if p[0] not in results]
+
+    if not pending:
+        return results
+
+    now = datetime.now(timezone.utc)
+    vec_rows = [p for p in pending if p[0] in blobs]
+    vector_ids = {p[0]: p[3] for p in pending}
+    if vec_rows:
+        # Content addressing: reuse stored rows and insert each distinct new blob once
+        by_blob = ensure_vectors(db, [blobs[p[0]] for p in vec_rows])
+        vector_ids.update({p[0]: by_blob[blobs[p[0]]] for p in vec_rows})
+
+    user_ids = db.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{"username": p[1], "first_name": p[2], "vector_id": vector_ids[p[0]], "created_at": now} for p in pending],
+    ).all()
+
+    with_vectors = [(uid, vector_ids[p[0]], blobs[p[0]]) for p, uid in zip(pending, user_ids) if p[0] in blobs]
+    ref_users = [(uid, p[3]) for p, uid in zip(pending, user_ids) if p[3] is not None]
+    if ref_users:
+        # Users pointing at pre-existing vectors: one more IN query for their blobs
+        data_by_id = dict(db.execute(select(Vector.id, Vector.data).where(Vector.id.in_({v for _, v in ref_users}))).all())
+        with_vectors += [(uid, vid, data_by_id[vid]) for uid, vid in ref_users]
+    if with_vectors:
+        store_recommendations(db, with_vectors)   # one matmul, same transaction as the users
+    db.commit()
+    _adjust_count(len(user_ids))
+
+    for p, uid in zip(pending, user_ids):
+        results[p[0]] = User(id=uid, username=p[1], first_name=p[2], vector_id=vector_ids[p[0]])
+    for uid, _, blob in with_vectors:
+        user_index.upsert(uid, blob)
+    return results
+
+# Cached users count: refreshed at most every USER_COUNT_TTL_S, adjusted in place by our own writes.
+_COUNT: list = [None, 0.0]   # [count | None, monotonic expiry]
+_COUNT_LOCK = threading.Lock()
+
+def _adjust_count(delta: int) -> None:
+    with _COUNT_LOCK:
+        if _COUNT[0] is not None:
+            _COUNT[0] += delta
+
+def count_users(db: Session) -> int:
+    now = time.monotonic()
+    if _COUNT[0] is None or now >= _COUNT[1]:
+        total = db.scalar(select(func.count()).select_from(User)) or 0
+        with _COUNT_LOCK:
+            _COUNT[0], _COUNT[1] = total, now + settings.USER_COUNT_TTL_S
+    return _COUNT[0]
+
+def list_users(db: Session, offset: int, limit: int, after_id: int | None = None, with_total: bool = True):
+    """
+    One page of users as (id, username, first_name, vector_id) rows, never the vector blobs.
+    With `after_id` the page seeks on the primary key (keyset pagination) and `offset` is ignored.
+    `total` comes from the cached counter, or is None when `with_total` is False.
+    """
+    stmt = select(User.id, User.username, User.first_name, User.vector_id).order_by(User.id).limit(limit)
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    else:
+        stmt = stmt.offset(offset)
+    items = db.execute(stmt).all()
+    total = count_users(db) if with_total else None
     return items, total
 
 def get_user(db: Session, user_id: int) -> User:
@@ -92,39 +262,100 @@ def get_user_by_username(db: Session, username: str) -> User:
         raise HTTPException(status_code=404, detail="user not found")
     return user
 
+_USER_ROW_COLUMNS = (User.id, User.username, User.first_name, User.vector_id)
+
+def get_user_read(db: Session, user_id: int) -> UserRow:
+    """Read-through cached UserRow by id; loads only the user columns."""
+    row = user_cache.get(("id", user_id))
+    if row is None:
+        found = db.execute(select(*_USER_ROW_COLUMNS).where(User.id == user_id)).first()
+        if not found:
+            raise HTTPException(status_code=404, detail="user not found")
+        row = UserRow(*found)
+        cache_user(row)
+    return row
+
+def get_user_read_by_username(db: Session, username: str) -> UserRow:
+    """Read-through cached UserRow by username; loads only the user columns."""
+    username = username.lower()
+    row = user_cache.get(("username", username))
+    if row is None:
+        found = db.execute(select(*_USER_ROW_COLUMNS).where(User.username == username)).first()
+        if not found:
+            raise HTTPException(status_code=404, detail="user not found")
+        row = UserRow(*found)
+        cache_user(row)
+    return row
+
 def update_user(db: Session, user_id: int, first_name: str | None) -> User:
     user = get_user(db, user_id)
     if first_name is not None:
         user.first_name = first_name
     db.commit()
     db.refresh(user)
+    invalidate_user(user.id, user.username)
     return user
 
 def delete_user(db: Session, user_id: int) -> None:
     user = get_user(db, user_id)
+    delete_user_mailbox(db, user_id)
+    delete_user_parties(db, user_id)
+    delete_user_recommendations(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_user(user_id, user.username)
+    _adjust_count(-1)
+    user_index.remove(user_id)
 
-def attach_vector(db: Session, user_id: int, vector_id: int | None, vector_data: list[float] | None) -> User:
-    user = get_user(db, user_id)
+def attach_vector(db: Session, user_id: int, vector_id: int | None, vector_data: list[float] | bytes | None) -> User:
     if (vector_id is None) == (vector_data is None):
         raise HTTPException(status_code=400, detail="Provide either vector_id or vector")
 
-    if vector_id is not None:
-        vec = db.get(Vector, vector_id)
-        if not vec:
-            raise HTTPException(status_code=404, detail="vector not found")
-        if vec.dim != settings.VECTOR_DIM:
-            raise HTTPException(status_code=422, detail="vector dimension mismatch")
-        user.vector = vec
-    else:
-        vec = _create_vector(db, vector_data or [])
-        user.vector = vec
+    def job(s: Session) -> User:
+        user = get_user(s, user_id)
+        if vector_id is not None:
+            vec = s.get(Vector, vector_id)
+            if not vec:
+                raise HTTPException(status_code=404, detail="vector not found")
+            if vec.dim != settings.VECTOR_DIM:
+                raise HTTPException(status_code=422, detail="vector dimension mismatch")
+            user.vector = vec
+        else:
+            vec = _create_vector(s, vector_data or [])
+            user.vector = vec
+        s.flush()
+        store_recommendations(s, [(user.id, vec.id, vec.data)])
+        return user
 
-    db.commit()
-    db.refresh(user)
+    user = _write(db, job)
+    invalidate_user(user.id, user.username)
+    user_index.upsert(user.id, user.vector.data)
     return user
 
 def unpack_int8_to_unit_float(blob: bytes) -> np.ndarray:
+    import numpy as np
     q = np.frombuffer(blob, dtype=np.int8).astype(np.float32)
-    return q / 127.0  # approximately unit-norm again
\ No newline at end of file
+    return q / 127.0  # approximately unit-norm again
+
+def recommend_anchors(db: Session, user_id: int, k: int, ghost: bool = False) -> list[tuple[Anchor, float]]:
+    if k <= settings.RECOMMEND_K:
+        recs = get_recommendations(db, user_id)
+        return (recs.ghosts if ghost else recs.anchors)[:k]
+    user = get_user(db, user_id)
+    if user.vector is None:
+        raise HTTPException(status_code=422, detail="user has no vector")
+    if user.vector.dim != settings.VECTOR_DIM:
+        raise HTTPException(status_code=422, detail="vector dimension mismatch")
+    return score_anchors(unpack_int8_to_unit_float(user.vector.data), k, ghost=ghost)
+
+
+def nearest_users(db: Session, user_id: int, k: int, mode: str | None = None) -> list[tuple[int, str, float]]:
+    import numpy as np
+    user = get_user(db, user_id)
+    if user.vector is None:
+        raise HTTPException(status_code=422, detail="user has no vector")
+    mode = mode or settings.VECTOR_SEARCH_MODE
+    candidates = max(settings.VECTOR_SEARCH_CANDIDATES, k) if mode == "binary" else None
+    hits = user_index.search(np.frombuffer(user.vector.data, dtype=np.int8), k, exclude=user.id, candidates=candidates)
+    names = dict(db.execute(select(User.id, User.username).where(User.id.in_([uid for uid, _ in hits]))).all())
+    return [(uid, names[uid], score) for uid, score in hits if uid in names]
@@ -1,18 +1,111 @@
-import numpy as np
+from __future__ import annotations
+import hashlib
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+from sqlalchemy import Column, Integer, MetaData, Table, bindparam, func, select, update, delete, insert, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.models.recommendation import UserRecommendation
+from app.models.user import User
 from app.models.vector import Vector
 
+if TYPE_CHECKING:
+    import numpy as np
+
 def pack_int8(vec_f32: list[float]) -> bytes:
+    import numpy as np
     arr = np.asarray(vec_f32, dtype=np.float32)
     q = np.clip(np.round(arr), -128, 127).astype(np.int8)
     return q.tobytes()
 
+def quantize_int8_normalized(arr: np.ndarray, *, renorm_tolerance: float = 1e-6) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise L2-renorm + fixed int8 mapping q = round(127 * v), clamped to [-127, 127],
+    for a (n, dim) float32 batch in one NumPy pass.
+    Returns (int8 matrix, zero-norm mask); zero-norm rows are left as zeros for the caller to reject.
+    """
+    import numpy as np
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    zero = norms[:, 0] == 0.0
+    scale = np.where(np.abs(norms - 1.0) > renorm_tolerance, norms, 1.0)  # gentle renorm
+    scale[zero] = 1.0
+    q = np.clip(np.round(arr / scale * 127.0), -127, 127).astype(np.int8)
+    return q, zero
+
+def validate_int8_blob(blob: bytes) -> str | None:
+    """Checks a client-packed int8 vector against the stored invariants; returns an error message or None."""
+    import numpy as np
+    if len(blob) != settings.VECTOR_DIM:
+        return f"Vector length {len(blob)} != expected {settings.VECTOR_DIM}"
+    q = np.frombuffer(blob, dtype=np.int8)
+    if (q == -128).any():
+        return "int8 vector values must be in [-127, 127]"
+    if not q.any():
+        return "Zero-norm vector is not allowed"
+    return None
+
 def unpack_int8(blob: bytes) -> np.ndarray:
+    import numpy as np
     q = np.frombuffer(blob, dtype=np.int8)
     return q.astype(np.float32)
 
+def vector_hash(blob: bytes) -> str:
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+def get_or_create_vector(db: Session, blob: bytes) -> Vector:
+    """
+    Content-addressed insert: reuse the row holding byte-identical data, else add a new one.
+    Sharing is safe because vector rows are immutable (users are repointed, never mutated in
+    place) and no user path deletes vectors, so ondelete="SET NULL" never fires through sharing.
+    """
+    return db.get(Vector, ensure_vectors(db, [blob])[blob])
+
+def find_vectors_by_hash(db: Session, blobs: list[bytes]) -> dict[bytes, int]:
+    """Existing vector ids for the given blobs, in one IN query. Missing blobs are absent."""
+    by_hash = {vector_hash(b): b for b in blobs}
+    if not by_hash:
+        return {}
+    rows = db.execute(select(Vector.id, Vector.content_hash, Vector.data).where(Vector.content_hash.in_(by_hash)))
+    return {data: vid for vid, h, data in rows if by_hash.get(h) == data}
+
+def _insert_new_hashes(db: Session, rows: list[dict]) -> None:
+    """
+    INSERT ... ON CONFLICT (content_hash) DO NOTHING: a row whose hash is already stored, or
+    was just stored by a concurrent writer, is skipped instead of duplicated or failing.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:   # the unique index still stops duplicates; a race then fails instead of sharing
+        db.execute(insert(Vector), rows)
+        return
+    db.execute(dialect_insert(Vector).on_conflict_do_nothing(index_elements=["content_hash"]), rows)
+
+def ensure_vectors(db: Session, blobs: list[bytes]) -> dict[bytes, int]:
+    """
+    Vector id for every blob: reuse stored rows (one IN query), insert the distinct new blobs
+    with one insert-or-ignore executemany on the unique content_hash, then re-select them, so
+    concurrent writers of the same blob end up sharing one row. Flushes, does not commit.
+    """
+    by_blob = find_vectors_by_hash(db, blobs)
+    fresh = list(dict.fromkeys(b for b in blobs if b not in by_blob))
+    if fresh:
+        now = datetime.now(timezone.utc)
+        _insert_new_hashes(db, [{"dim": len(b), "data": b, "content_hash": vector_hash(b), "created_at": now} for b in fresh])
+        by_blob.update(find_vectors_by_hash(db, fresh))
+        collided = [b for b in fresh if b not in by_blob]
+        if collided:   # another blob holds the hash (a 128-bit collision): store these unshared
+            new_ids = db.scalars(
+                insert(Vector).returning(Vector.id, sort_by_parameter_order=True),
+                [{"dim": len(b), "data": b, "content_hash": None, "created_at": now} for b in collided],
+            ).all()
+            by_blob.update(zip(collided, new_ids))
+    return by_blob
+
 def create_vector_from_floats(db: Session, vec_f32: list[float]) -> Vector:
     if len(vec_f32) != settings.VECTOR_DIM:
         raise HTTPException(
@@ -20,10 +113,78 @@ def create_vector_from_floats(db: Session, vec_f32: list[float]) -> Vector:
             detail=f"Vector length {len(vec_f32)} != expected {settings.VECTOR_DIM}",
         )
     blob = pack_int8(vec_f32)  # scale=1.0, zero_point=0.0 for MVP
-    vec = Vector(dim=len(vec_f32), data=blob)
-    # optional extra guard: assert len(blob) == vec.dim
-    if len(blob) != vec.dim:
+    # optional extra guard: assert len(blob) == dim
+    if len(blob) != len(vec_f32):
         raise HTTPException(status_code=500, detail="packed vector size mismatch")
-    db.add(vec)
-    db.flush()
-    return vec
+    return get_or_create_vector(db, blob)
+
+# -------- one-off maintenance --------
+
+def ensure_hash_column(engine: Engine) -> None:
+    """Add vectors.content_hash (+ index) to databases created before content addressing."""
+    cols = {c["name"] for c in inspect(engine).get_columns("vectors")}
+    if "content_hash" in cols:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE vectors ADD COLUMN content_hash VARCHAR(32)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_vectors_content_hash ON vectors (content_hash)"))
+
+def compact_duplicate_vectors(db: Session, batch_size: int = 10_000) -> dict:
+    """
+    Hash the vectors stored without a content_hash and merge those whose bytes are already
+    held by another row: repoint users.vector_id (and the materialized recommendations) to
+    that row, then delete the duplicates, in one transaction. Hashed rows are unique already
+    (unique index on content_hash), so only unhashed rows can be duplicates.
+
+    Works in keyset batches of `batch_size` unhashed rows: memory is O(batch_size) blobs plus
+    one (dup, keeper) pair per duplicate, kept in a temporary table so the repoint is one
+    UPDATE per table, through the users.vector_id index.
+    """
+    vectors = Vector.__table__
+    merge = Table(
+        "vector_merge", MetaData(),
+        Column("dup", Integer, primary_key=True), Column("keeper", Integer, nullable=False),
+        prefixes=["TEMPORARY"],
+    )
+    conn = db.connection()
+    merge.create(conn)
+    backfilled = merged = after = 0
+    while True:
+        rows = db.execute(
+            select(Vector.id, Vector.data)
+            .where(Vector.content_hash.is_(None), Vector.id > after)
+            .order_by(Vector.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        hashes = [vector_hash(data) for _, data in rows]
+        owners = {h: (vid, data) for vid, h, data in db.execute(
+            select(Vector.id, Vector.content_hash, Vector.data).where(Vector.content_hash.in_(set(hashes)))
+        )}
+        hashed, pairs = [], []
+        for (vid, data), h in zip(rows, hashes):
+            owner = owners.get(h)
+            if owner is None:
+                owners[h] = (vid, data)
+                hashed.append({"vid": vid, "h": h})
+            elif owner[1] == data:
+                pairs.append({"dup": vid, "keeper": owner[0]})
+            # else: a 128-bit collision; the row stays unhashed and unshared
+        if hashed:
+            db.execute(update(vectors).where(vectors.c.id == bindparam("vid")).values(content_hash=bindparam("h")), hashed)
+        if pairs:
+            db.execute(insert(merge), pairs)
+        backfilled += len(hashed)
+        merged += len(pairs)
+        after = rows[-1][0]
+
+    if merged:
+        dups = select(merge.c.dup)
+        for table in (User.__table__, UserRecommendation.__table__):
+            keeper = select(merge.c.keeper).where(merge.c.dup == table.c.vector_id).scalar_subquery()
+            db.execute(update(table).where(table.c.vector_id.in_(dups)).values(vector_id=keeper))
+        db.execute(delete(vectors).where(vectors.c.id.in_(dups)))
+    merge.drop(conn)
+    db.commit()
+    return {"scanned": db.scalar(select(func.count()).select_from(Vector)) + merged, "backfilled": backfilled, "merged": merged}
@@ -0,0 +1,385 @@
+"""
+Throughput and p50/p99 latency of the API hot paths, against the in-process app, for several
+user-base / catalogue sizes:
+
+  startup   load_anchors (cold parse, parse + snapshot write, snapshot load), user index load
+  users     POST /users (float and b64 vectors), POST /users/bulk, GET /users (offset and
+            keyset pages), GET /users/{id}, GET /users/by-username/{username}
+  anchors   GET /anchors, GET /ghost-anchors, GET /anchor/{slug} plain, with include_reduced
+            (float and b64), with include_html, with both
+  vectors   quantize_int8_normalized (batches and single rows), unpack_int8
+
+    uv run python -m benchmarks.api_hot_paths --sizes 1000,10000,100000 --out bench.json
+    uv run python -m benchmarks.api_hot_paths --sizes 10000 --anchors 1000 --baseline bench.json
+
+Each size runs in a fresh interpreter with its own temporary SQLite DB, anchor directory and
+snapshot directory, seeded from --seed with N users (random unit vectors) and M synthetic
+anchors (one in ten a ghost), so two runs on one machine differ only by the code and the
+APP_* settings under test. Requests go through httpx's ASGI transport without the lifespan
+(no background tasks), --concurrency at a time, so sync endpoints share the threadpool as
+they do under uvicorn; the network and the server loop are not included.
+
+Results are written as JSON with stable keys (--out); --baseline prints p50/throughput
+ratios against an earlier file.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+WORDS = (
+    "campus study group chess football music jazz choir hiking walk picnic coffee debate robotics "
+    "coding film photo painting yoga running climbing board games language exchange poetry theatre "
+    "volunteer garden cooking salsa startup research lab library night market"
+).split()
+TAGS = (
+    "social sport game music art outdoor indoor study tech food wellness culture competition "
+    "strategy campus language volunteer night weekend beginner"
+).split()
+
+
+# ---- seeding ----
+
+def unit_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    v = rng.normal(size=(n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def write_anchors(base: Path, m: int, dim: int, rng: np.random.Generator) -> None:
+    """M anchor YAMLs with reduced vectors; instructions_html cycles through the real static pages."""
+    base.mkdir(parents=True)
+    html = sorted(str(p) for p in Path("static/anchors").glob("*.html"))
+    vecs = unit_vectors(rng, m, dim)
+    for i in range(m):
+        slug = f"bench-{i:06d}"
+        ghost = i % 10 == 9
+        vec_file = base / f"{slug}.reduced.json"
+        vec_file.write_text(json.dumps(np.round(vecs[i], 6).tolist()))
+        doc = {
+            "version": 1,
+            "slug": slug,
+            "title": " ".join(rng.choice(WORDS, 3)).title(),
+            "description": " ".join(rng.choice(WORDS, 16)),
+            "tags": sorted(set(rng.choice(TAGS, 4).tolist())),
+            "is_ghost": ghost,
+            "min_size": 2 if ghost else int(rng.integers(2, 6)),
+            "max_size": 4 if ghost else int(rng.integers(6, 20)),
+            "reduced_dim": dim,
+            "reduced_vec_file": str(vec_file),
+        }
+        if html:
+            doc["instructions_html"] = html[i % len(html)]
+        (base / f"{slug}.yaml").write_text(yaml.safe_dump(doc, sort_keys=False))
+
+
+def seed_users(n: int, dim: int, rng: np.random.Generator, batch: int = 10_000) -> None:
+    """N users named seed<k>, inserted directly (no recommendation rows: those are not on the read paths)."""
+    from sqlalchemy import insert
+
+    from app.core.database import SessionLocal
+    from app.models.user import User
+    from app.services.vectors import ensure_vectors, quantize_int8_normalized
+
+    with SessionLocal() as db:
+        for start in range(0, n, batch):
+            q, _ = quantize_int8_normalized(unit_vectors(rng, min(batch, n - start), dim))
+            blobs = [row.tobytes() for row in q]
+            ids = ensure_vectors(db, blobs)
+            db.execute(insert(User), [
+                {"username": f"seed{start + k}", "first_name": "Seed", "vector_id": ids[b]}
+                for k, b in enumerate(blobs)
+            ])
+            db.commit()
+
+
+# ---- measurement ----
+
+def summary(latencies: list, elapsed: float, errors: int = 0) -> dict:
+    ms = np.array(latencies) * 1000.0
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "ops_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def timed_calls(fn, args: list) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for a in args:
+        t0 = time.perf_counter()
+        fn(a)
+        latencies.append(time.perf_counter() - t0)
+    return summary(latencies, time.perf_counter() - start)
+
+
+async def drive(client, requests: list, concurrency: int, warmup: int) -> dict:
+    """Send (method, url, kwargs) `requests`, `concurrency` in flight; the first `warmup` are not timed."""
+    for method, url, kw in requests[:warmup]:
+        await client.request(method, url, **kw)
+    latencies, errors = [], 0
+    pending = iter(requests[warmup:])
+
+    async def worker():
+        nonlocal errors
+        for method, url, kw in pending:
+            t0 = time.perf_counter()
+            r = await client.request(method, url, **kw)
+            latencies.append(time.perf_counter() - t0)
+            errors += r.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summary(latencies, time.perf_counter() - start, errors)
+
+
+def _user_payload(n: int, vec: np.ndarray, b64: bool) -> dict:
+    if b64:
+        q = np.clip(np.round(vec * 127.0), -127, 127).astype(np.int8)
+        vector = {"b64": base64.b64encode(q.tobytes()).decode("ascii")}
+    else:
+        vector = {"data": vec.tolist()}
+    return {"email": f"bench{n}@uniandes.edu.co", "first_name": "Bench", "vector": vector}
+
+
+async def http_ops(n_users: int, rng: np.random.Generator, args) -> dict:
+    import httpx
+
+    from app.core.config import settings
+    from app.main import app
+    from app.services.anchors import list_anchors, list_ghosts
+
+    dim = settings.VECTOR_DIM
+    reqs = args.requests
+    slugs = [a.slug for a in list_anchors()]
+    ghost_slugs = [a.slug for a in list_ghosts()]
+    ids = rng.integers(1, n_users + 1, reqs).tolist() if n_users else []
+    ops = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def run(name, requests):
+            if requests:
+                ops[name] = await drive(client, requests, args.concurrency, min(args.warmup, len(requests) // 10))
+
+        counter = iter(range(10**9))
+        vecs = unit_vectors(rng, reqs, dim)
+        await run("users.create", [("POST", "/users", {"json": _user_payload(next(counter), v, False)}) for v in vecs])
+        await run("users.create_b64", [("POST", "/users", {"json": _user_payload(next(counter), v, True)}) for v in vecs])
+
+        bulk = []
+        for _ in range(args.bulk_batches):
+            rows = [_user_payload(next(counter), v, False) for v in unit_vectors(rng, args.bulk_rows, dim)]
+            bulk.append(("POST", "/users/bulk", {"json": rows}))
+        await run("users.bulk", bulk)
+        if "users.bulk" in ops:
+            ops["users.bulk"]["rows_per_s"] = ops["users.bulk"]["ops_per_s"] * args.bulk_rows
+
+        if n_users:
+            offsets = rng.integers(0, n_users, reqs).tolist()
+            await run("users.list_offset", [("GET", "/users", {"params": {"limit": 50, "offset": o}}) for o in offsets])
+            await run("users.list_keyset", [
+                ("GET", "/users", {"params": {"limit": 50, "after_id": o, "include_total": "false"}}) for o in offsets
+            ])
+            await run("users.get", [("GET", f"/users/{i}", {}) for i in ids])
+            await run("users.get_by_username", [("GET", f"/users/by-username/seed{i - 1}", {}) for i in ids])
+
+        await run("anchors.index", [("GET", "/anchors", {})] * max(1, reqs // 10))
+        await run("ghosts.index", [("GET", "/ghost-anchors", {})] * max(1, reqs // 10))
+        if slugs:
+            picks = [slugs[i] for i in rng.integers(0, len(slugs), reqs)]
+            variants = {
+                "anchors.detail": {},
+                "anchors.detail_reduced": {"include_reduced": "true"},
+                "anchors.detail_reduced_b64": {"include_reduced": "true", "vector_format": "b64"},
+                "anchors.detail_html": {"include_html": "true"},
+                "anchors.detail_full": {"include_reduced": "true", "include_html": "true"},
+            }
+            for name, params in variants.items():
+                await run(name, [("GET", f"/anchor/{s}", {"params": params}) for s in picks])
+        if ghost_slugs:
+            picks = [ghost_slugs[i] for i in rng.integers(0, len(ghost_slugs), reqs)]
+            await run("ghosts.detail", [("GET", f"/ghost-anchors/{s}", {}) for s in picks])
+    return ops
+
+
+def vector_ops(rng: np.random.Generator, args) -> dict:
+    from app.core.config import settings
+    from app.services.vectors import quantize_int8_normalized, unpack_int8
+
+    dim = settings.VECTOR_DIM
+    batches = [unit_vectors(rng, 1000, dim) for _ in range(max(1, args.requests // 100))]
+    rows = list(unit_vectors(rng, args.requests, dim).reshape(args.requests, 1, dim))
+    blobs = [q.tobytes() for q in quantize_int8_normalized(unit_vectors(rng, args.requests, dim))[0]]
+    ops = {
+        "vectors.quantize_batch": timed_calls(quantize_int8_normalized, batches),
+        "vectors.quantize_row": timed_calls(quantize_int8_normalized, rows),
+        "vectors.unpack": timed_calls(unpack_int8, blobs),
+    }
+    ops["vectors.quantize_batch"]["rows_per_s"] = ops["vectors.quantize_batch"]["ops_per_s"] * 1000
+    return ops
+
+
+def run_size(n_users: int, n_anchors: int, args) -> dict:
+    """One size, in this process; APP_DATABASE_URL / APP_ANCHOR_SNAPSHOT_DIR must point at scratch space."""
+    from app.core.config import settings
+    from app.core.database import SessionLocal, engine
+    from app.core.schema import ensure_schema
+    from app.core.writer import writer
+    from app.main import app  # noqa: F401  (imports every model and router)
+    from app.services.anchors import load_anchors
+    from app.services.instructions import load_instructions
+    from app.services.user_index import load_user_index
+
+    rng = np.random.default_rng(args.seed)
+    work = Path(settings.ANCHOR_SNAPSHOT_DIR).parent
+    anchors_dir = work / "anchors"
+    write_anchors(anchors_dir, n_anchors, settings.VECTOR_DIM, rng)
+    ensure_schema(engine)
+    seed_users(n_users, settings.VECTOR_DIM, rng)
+
+    startup = {
+        "startup.load_anchors_parse": timed_calls(lambda _: load_anchors(str(anchors_dir), use_snapshot=False), [None]),
+        "startup.load_anchors_snapshot_write": timed_calls(lambda _: load_anchors(str(anchors_dir)), [None]),
+        "startup.load_anchors_snapshot": timed_calls(lambda _: load_anchors(str(anchors_dir)), [None] * args.startup_repeats),
+    }
+    load_instructions()
+
+    def index(_):
+        with SessionLocal() as db:
+            load_user_index(db)
+
+    startup["startup.load_user_index"] = timed_calls(index, [None] * args.startup_repeats)
+
+    if settings.DB_GROUP_COMMIT:
+        writer.start()
+    try:
+        ops = {**startup, **asyncio.run(http_ops(n_users, rng, args)), **vector_ops(rng, args)}
+    finally:
+        writer.stop()
+        engine.dispose()
+    return {"users": n_users, "anchors": n_anchors, "ops": dict(sorted(ops.items()))}
+
+
+# ---- driver ----
+
+def _pairs(sizes: str, anchors: str | None) -> list:
+    users = [int(s) for s in sizes.split(",")]
+    cats = [int(s) for s in (anchors or sizes).split(",")]
+    if len(cats) == 1:
+        cats *= len(users)
+    if len(users) == 1:
+        users *= len(cats)
+    if len(users) != len(cats):
+        raise SystemExit("--sizes and --anchors need the same number of values (or one of them a single value)")
+    return list(zip(users, cats))
+
+
+def _git_rev() -> str | None:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_isolated(n_users: int, n_anchors: int, args) -> dict:
+    """run_size in a fresh interpreter, so settings, engine and catalogue start empty for every size."""
+    with tempfile.TemporaryDirectory(prefix="senecampus-bench-") as tmp:
+        env = {
+            **os.environ,
+            "APP_DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "APP_ANCHOR_SNAPSHOT_DIR": f"{tmp}/snapshot",
+            "APP_USER_MATRIX_DIR": "",
+            "APP_DEBUG": "false",
+        }
+        argv = [sys.executable, "-m", "benchmarks.api_hot_paths", "--child", f"{n_users},{n_anchors}"]
+        for flag in ("requests", "concurrency", "warmup", "bulk_rows", "bulk_batches", "startup_repeats", "seed"):
+            argv += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+        out = subprocess.run(argv, env=env, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(out)
+
+
+def _print(results: list, baseline: dict | None) -> None:
+    base = {(r["users"], r["anchors"]): r["ops"] for r in (baseline or {}).get("results", [])}
+    for r in results:
+        print(f"\nusers={r['users']} anchors={r['anchors']}")
+        header = f"{'op':>34} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>6}"
+        print(header + (f" {'p50 vs base':>11} {'ops/s vs base':>13}" if baseline else ""))
+        prev = base.get((r["users"], r["anchors"]), {})
+        for name, s in r["ops"].items():
+            line = f"{name:>34} {s['ops_per_s']:10.1f} {s['p50_ms']:9.3f} {s['p99_ms']:9.3f} {s['errors']:6d}"
+            if name in prev and prev[name]["p50_ms"] and prev[name]["ops_per_s"]:
+                line += f" {s['p50_ms'] / prev[name]['p50_ms']:10.2f}x {s['ops_per_s'] / prev[name]['ops_per_s']:12.2f}x"
+            print(line)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000,100000", help="seeded users per run")
+    ap.add_argument("--anchors", default=None, help="synthetic anchors per run (default: same as --sizes)")
+    ap.add_argument("--requests", type=int, default=1000, help="requests per HTTP operation")
+    ap.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    ap.add_argument("--warmup", type=int, default=20, help="untimed requests before each operation")
+    ap.add_argument("--bulk-rows", type=int, default=500)
+    ap.add_argument("--bulk-batches", type=int, default=20)
+    ap.add_argument("--startup-repeats", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="Write the results as JSON to this file")
+    ap.add_argument("--baseline", help="Earlier --out file to compare against")
+    ap.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        n_users, n_anchors = (int(v) for v in args.child.split(","))
+        json.dump(run_size(n_users, n_anchors, args), sys.stdout)
+        return
+
+    from app.core.config import settings
+
+    report = {
+        "meta": {
+            "git": _git_rev(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {
+                "VECTOR_DIM": settings.VECTOR_DIM,
+                "DB_GROUP_COMMIT": settings.DB_GROUP_COMMIT,
+                "SQLITE_JOURNAL_MODE": settings.SQLITE_JOURNAL_MODE,
+                "SQLITE_SYNCHRONOUS": settings.SQLITE_SYNCHRONOUS,
+                "USER_CACHE_SIZE": settings.USER_CACHE_SIZE,
+                "RECOMMEND_K": settings.RECOMMEND_K,
+            },
+            "args": {k: v for k, v in vars(args).items() if k not in ("child", "out", "baseline", "json")},
+        },
+        "results": [run_isolated(u, m, args) for u, m in _pairs(args.sizes, args.anchors)],
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    _print(report["results"], json.loads(Path(args.baseline).read_text()) if args.baseline else None)
+
+
+if __name__ == "__main__":
+    main()
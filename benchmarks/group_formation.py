@@ -0,0 +1,70 @@
+"""
+Runtime and group quality of the batch group-formation solver on synthetic pools.
+
+    uv run python -m benchmarks.group_formation --sizes 1000,10000,50000 --min-size 3 --max-size 16
+
+Quality is the mean pairwise cosine inside groups, next to a random partition with the
+same group sizes as the baseline.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.grouping import Grouping, form_groups, grouping_stats
+from benchmarks.vector_search import synthetic_vectors
+
+
+def run(n: int, min_size: int, max_size: int, target: float | None, clusters: int, spread: float, seed: int) -> dict:
+    data = synthetic_vectors(n, settings.VECTOR_DIM, clusters, spread, seed)
+    t0 = time.perf_counter()
+    grouping = form_groups(data, min_size, max_size, target, seed=seed)
+    elapsed = time.perf_counter() - t0
+    stats = grouping_stats(data, grouping)
+
+    sizes = [len(g) for g in grouping.groups]
+    shuffled = np.random.default_rng(seed + 1).permutation(n)[:sum(sizes)]
+    baseline = Grouping(np.split(shuffled, np.cumsum(sizes)[:-1]) if sizes else [], np.empty(0, dtype=np.int64))
+    return {
+        "n": n,
+        "min_size": min_size,
+        "max_size": max_size,
+        "seconds": elapsed,
+        **stats,
+        "random_intra_similarity": grouping_stats(data, baseline)["mean_intra_similarity"],
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000,50000", help="pool sizes to solve")
+    ap.add_argument("--min-size", type=int, default=3)
+    ap.add_argument("--max-size", type=int, default=16)
+    ap.add_argument("--target", type=float, default=None, help="preferred group size")
+    ap.add_argument("--clusters", type=int, default=256)
+    ap.add_argument("--spread", type=float, default=0.6)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = ap.parse_args()
+
+    results = [
+        run(int(n), args.min_size, args.max_size, args.target, args.clusters, args.spread, args.seed)
+        for n in args.sizes.split(",")
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"sizes {args.min_size}-{args.max_size}")
+    print(f"{'pool':>7} {'seconds':>8} {'groups':>7} {'unassigned':>10} {'sizes':>7} {'intra':>7} {'random':>7}")
+    for r in results:
+        sizes = f"{r['min_group']}-{r['max_group']}"
+        print(
+            f"{r['n']:7d} {r['seconds']:8.2f} {r['groups']:7d} {r['unassigned']:10d} {sizes:>7} "
+            f"{r['mean_intra_similarity']:7.3f} {r['random_intra_similarity']:7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
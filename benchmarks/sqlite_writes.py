@@ -0,0 +1,116 @@
+"""
+Concurrent user+vector write throughput on SQLite for three engine setups:
+
+  bare     create_engine with only check_same_thread=False (the old default)
+  tuned    the Settings profile: WAL, synchronous=NORMAL, busy_timeout, cache/mmap, pool sizing
+  group    tuned + GroupCommitWriter batching concurrent writes into shared commits
+
+    uv run python -m benchmarks.sqlite_writes --threads 16 --ops 200
+"""
+import argparse
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base, make_engine
+from app.core.writer import GroupCommitWriter
+from app.models.user import User
+from app.models.vector import Vector
+
+
+def _insert(db, username: str, blob: bytes) -> None:
+    db.add(User(username=username, vector=Vector(dim=len(blob), data=blob)))
+    db.flush()
+
+
+def run_profile(name: str, threads: int, ops: int, workdir: Path) -> dict:
+    url = f"sqlite:///{workdir / (name + '.db')}"
+    engine = make_engine(url, tuned=name != "bare")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    writer = None
+    if name == "group":
+        writer = GroupCommitWriter(
+            Session,
+            max_batch=settings.DB_GROUP_COMMIT_MAX_BATCH,
+            max_wait_s=settings.DB_GROUP_COMMIT_WAIT_MS / 1000.0,
+        )
+        writer.start()
+
+    rng = np.random.default_rng(0)
+    blobs = rng.integers(-127, 128, (threads * ops, settings.VECTOR_DIM)).astype(np.int8)
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(t: int) -> None:
+        nonlocal errors
+        local, failed = [], 0
+        for i in range(ops):
+            n = t * ops + i
+            blob = blobs[n].tobytes()
+            t0 = time.perf_counter()
+            try:
+                if writer is not None:
+                    writer.submit(lambda db, n=n, blob=blob: _insert(db, f"user{n}", blob))
+                else:
+                    with Session() as db:
+                        _insert(db, f"user{n}", blob)
+                        db.commit()
+            except Exception:
+                failed += 1
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for th in pool:
+        th.start()
+    for th in pool:
+        th.join()
+    elapsed = time.perf_counter() - start
+    if writer is not None:
+        writer.stop()
+    engine.dispose()
+
+    ms = np.array(latencies) * 1000.0
+    return {
+        "profile": name,
+        "ops": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "ops_per_s": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--ops", type=int, default=200, help="writes per thread")
+    ap.add_argument("--profiles", default="bare,tuned,group")
+    ap.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [run_profile(p, args.threads, args.ops, Path(tmp)) for p in args.profiles.split(",")]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"threads={args.threads} writes/thread={args.ops}")
+    print(f"{'profile':>8} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7}")
+    for r in results:
+        print(f"{r['profile']:>8} {r['ops_per_s']:9.0f} {r['p50_ms']:8.2f} {r['p99_ms']:9.2f} {r['errors']:7d}")
+
+
+if __name__ == "__main__":
+    main()
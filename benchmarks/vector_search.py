@@ -0,0 +1,82 @@
+"""
+Recall-vs-latency report for user similarity search: exact int8 scan vs the
+binary sign-code prefilter + int8 rerank, across candidate counts.
+
+    uv run python -m benchmarks.vector_search --n 100000 --k 10 --candidates 128,256,512,1024,2048
+
+Use the output to pick APP_VECTOR_SEARCH_CANDIDATES.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.user_index import UserVectorIndex
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, spread: float, seed: int) -> np.ndarray:
+    """Clustered unit vectors quantized with the same q = round(127 * v) mapping as ingestion."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vecs = centers[rng.integers(0, clusters, n)] + spread * rng.normal(size=(n, dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return np.clip(np.round(vecs * 127.0), -127, 127).astype(np.int8)
+
+
+def _timed(index: UserVectorIndex, queries: np.ndarray, k: int, candidates: int | None):
+    results, times = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append({uid for uid, _ in index.search(q, k, candidates=candidates)})
+        times.append(time.perf_counter() - t0)
+    ms = np.array(times) * 1000.0
+    return results, {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99))}
+
+
+def run(n: int, k: int, candidates: list[int], queries: int, clusters: int, spread: float, seed: int) -> dict:
+    data = synthetic_vectors(n, settings.VECTOR_DIM, clusters, spread, seed)
+    index = UserVectorIndex(settings.VECTOR_DIM)
+    index.bulk_load(np.arange(n, dtype=np.int64), data)
+    qs = data[np.random.default_rng(seed + 1).integers(0, n, queries)]
+
+    exact, exact_lat = _timed(index, qs, k, None)
+    report = {"n": n, "k": k, "queries": queries, "exact": exact_lat, "binary": []}
+    for c in candidates:
+        approx, lat = _timed(index, qs, k, c)
+        recall = float(np.mean([len(a & e) / len(e) for a, e in zip(approx, exact)]))
+        report["binary"].append({"candidates": c, "recall": recall, **lat})
+    return report
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--candidates", default="64,128,256,512,1024,2048")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--clusters", type=int, default=64)
+    ap.add_argument("--spread", type=float, default=0.3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = ap.parse_args()
+
+    report = run(
+        args.n, args.k, [int(c) for c in args.candidates.split(",")],
+        args.queries, args.clusters, args.spread, args.seed,
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"n={report['n']} k={report['k']} queries={report['queries']}")
+    print(f"{'mode':>16} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    ex = report["exact"]
+    print(f"{'exact':>16} {1.0:7.3f} {ex['p50_ms']:8.3f} {ex['p99_ms']:8.3f}")
+    for row in report["binary"]:
+        label = f"binary c={row['candidates']}"
+        print(f"{label:>16} {row['recall']:7.3f} {row['p50_ms']:8.3f} {row['p99_ms']:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
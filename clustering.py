@@ -1,16 +1,13 @@
+import numpy as np
+
+from app.services.embeddings import embed_texts
 
-import sys, argparse, re, unicodedata, numpy as np
-import spacy
-from sklearn.cluster import KMeans
-nlp = spacy.load("en_core_web_md")
 
 def activities_vec(activities):
-    act_vec=[]
-    for activity in activities:
-        doc=nlp(activity)
-        act_vec.append(np.ndarray(doc.vector))
-    return act_vec
+    # One batched nlp.pipe pass (model loaded lazily, cached on disk) instead of nlp() per string
+    return embed_texts(activities)
 
-def activites_cluster(act_vec):
-    Kmeans=KMeans(n_clusters = 5, random_state=42)
-    return Kmeans.fit(act_vec)
+def activites_cluster(act_vec, n_clusters=5):
+    from sklearn.cluster import KMeans
+    Kmeans = KMeans(n_clusters=min(n_clusters, len(act_vec)), random_state=42)
+    return Kmeans.fit(np.asarray(act_vec))
@@ -0,0 +1,50 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.config import settings
+from app.core.database import Base, make_engine
+from app.core.schema import import_models
+
+config = context.config
+
+# Only the alembic CLI has an ini file; app startup (app/core/schema.py) keeps its own logging.
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+import_models()
+target_metadata = Base.metadata
+
+
+def _configure(**kwargs) -> None:
+    # Batch mode: SQLite can't ALTER most things, so table changes are done copy-and-move there.
+    context.configure(target_metadata=target_metadata, render_as_batch=True, compare_type=True, **kwargs)
+
+
+def run_migrations_offline() -> None:
+    _configure(url=settings.DATABASE_URL, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:   # handed over by ensure_schema, inside its lock
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    engine = make_engine(settings.DATABASE_URL)
+    try:
+        with engine.connect() as connection:
+            _configure(connection=connection)
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,116 @@
+"""initial schema
+
+The tables create_all built before migrations, with every index (including
+vectors.content_hash and the mailbox retention index that older databases were patched with).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 02:59:40.888790
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vectors',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('dim', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_vectors_content_hash', 'vectors', ['content_hash'])
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('username', sa.String(length=120), nullable=False),
+    sa.Column('first_name', sa.String(length=120), nullable=True),
+    sa.Column('vector_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['vector_id'], ['vectors.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_username', 'users', ['username'])
+
+    op.create_table('anchor_optins',
+    sa.Column('anchor_slug', sa.String(length=120), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('anchor_slug', 'user_id')
+    )
+    op.create_index('ix_anchor_optins_user_id', 'anchor_optins', ['user_id'])
+
+    op.create_table('mailbox_messages',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_mailbox_messages_user_id_id', 'mailbox_messages', ['user_id', 'id'])
+    op.create_index('ix_mailbox_messages_created_at', 'mailbox_messages', ['created_at'])
+
+    op.create_table('parties',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('anchor_slug', sa.String(length=120), nullable=False),
+    sa.Column('initiator_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('min_size', sa.Integer(), nullable=False),
+    sa.Column('max_size', sa.Integer(), nullable=False),
+    sa.Column('member_count', sa.Integer(), nullable=False),
+    sa.Column('invited_count', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['initiator_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_parties_status_expires_at', 'parties', ['status', 'expires_at'])
+
+    op.create_table('party_members',
+    sa.Column('party_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('joined_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['party_id'], ['parties.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('party_id', 'user_id')
+    )
+    op.create_index('ix_party_members_user_id', 'party_members', ['user_id'])
+
+    op.create_table('user_recommendations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('vector_id', sa.Integer(), nullable=False),
+    sa.Column('catalogue', sa.String(length=16), nullable=False),
+    sa.Column('anchors', sa.JSON(), nullable=False),
+    sa.Column('ghosts', sa.JSON(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_recommendations_catalogue', 'user_recommendations', ['catalogue'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_recommendations')
+    op.drop_table('party_members')
+    op.drop_table('parties')
+    op.drop_table('mailbox_messages')
+    op.drop_table('anchor_optins')
+    op.drop_table('users')
+    op.drop_table('vectors')
@@ -0,0 +1,58 @@
+"""unique vectors.content_hash, index users.vector_id
+
+Content addressing relies on one row per hash: two writers that both miss the lookup now
+conflict on the unique index instead of inserting the same vector twice. Rows already sharing
+a hash are merged first (users and recommendations repointed to the lowest id holding the same
+bytes); a true 128-bit collision keeps its bytes but loses the hash. users.vector_id gets the
+index that repointing and ON DELETE SET NULL look it up by.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 03:40:12.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_DUP_HASHES = "SELECT content_hash FROM vectors GROUP BY content_hash HAVING count(*) > 1"
+_SAME_BYTES = "SELECT min(k.id) FROM vectors k WHERE k.content_hash = {v}.content_hash AND k.data = {v}.data"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: databases adopted from create_all (app/core/schema.py) may already have it
+    op.create_index('ix_users_vector_id', 'users', ['vector_id'], if_not_exists=True)
+
+    for table in ('users', 'user_recommendations'):
+        op.execute(
+            f"UPDATE {table} SET vector_id = ("
+            f"SELECT ({_SAME_BYTES.format(v='v')}) FROM vectors v WHERE v.id = {table}.vector_id) "
+            f"WHERE vector_id IN (SELECT id FROM vectors WHERE content_hash IN ({_DUP_HASHES}))"
+        )
+    op.execute(
+        f"DELETE FROM vectors WHERE content_hash IN ({_DUP_HASHES}) "
+        f"AND id > ({_SAME_BYTES.format(v='vectors')})"
+    )
+    op.execute(
+        f"UPDATE vectors SET content_hash = NULL WHERE content_hash IN ({_DUP_HASHES}) "
+        f"AND id > (SELECT min(k.id) FROM vectors k WHERE k.content_hash = vectors.content_hash)"
+    )
+
+    op.drop_index('ix_vectors_content_hash', table_name='vectors')
+    op.create_index('ix_vectors_content_hash', 'vectors', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_vectors_content_hash', table_name='vectors')
+    op.create_index('ix_vectors_content_hash', 'vectors', ['content_hash'])
+    op.drop_index('ix_users_vector_id', table_name='users')
@@ -0,0 +1,39 @@
+"""party invites
+
+The users invited to each ghost party, so a join can be refused to anyone else.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 03:52:44.104615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: databases adopted from create_all (app/core/schema.py) may already have it
+    op.create_table('party_invites',
+    sa.Column('party_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['party_id'], ['parties.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('party_id', 'user_id'),
+    if_not_exists=True,
+    )
+    op.create_index('ix_party_invites_user_id', 'party_invites', ['user_id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('party_invites')
@@ -0,0 +1,59 @@
+"""Shared setup: the app runs against a throwaway database and anchor snapshot for the whole session."""
+import atexit
+import itertools
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+_DATA = tempfile.mkdtemp(prefix="senecampus-tests-")
+atexit.register(shutil.rmtree, _DATA, True)
+
+# Settings are read once, when app.core.config is first imported, so this has to come first.
+os.environ.update({
+    "APP_DATABASE_URL": f"sqlite:///{_DATA}/test.db",
+    "APP_ANCHOR_SNAPSHOT_DIR": f"{_DATA}/anchor-snapshot",
+    "APP_ANCHOR_RELOAD_INTERVAL_S": "0",
+    "APP_USER_MATRIX_DIR": "",
+    "APP_ADMIN_TOKEN": "",
+    "APP_DEBUG": "true",
+})
+os.chdir(ROOT)   # data/anchors and static/ are resolved from the repo root
+
+_EMAILS = itertools.count(1)
+
+
+def unit_vector(rng, dim: int = 128) -> list[float]:
+    v = rng.normal(size=dim)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def fresh_email() -> str:
+    """An address no other test in the session has used (they all share one database)."""
+    return f"tester{next(_EMAILS)}@uniandes.edu.co"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def make_user(client):
+    """POST /users with a fresh email (and `vector` floats, if given); returns the response body."""
+    def make(vector=None, **fields) -> dict:
+        body = {"email": fresh_email(), **fields}
+        if vector is not None:
+            body["vector"] = {"data": list(vector)}
+        r = client.post("/users", json=body)
+        assert r.status_code == 201, r.text
+        return r.json()
+    return make
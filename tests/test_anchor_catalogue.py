@@ -0,0 +1,141 @@
+"""Anchor loading: the compiled snapshot, its fallback to parsing, and incremental hot reloads."""
+import json
+import os
+
+import numpy as np
+import pytest
+import yaml
+
+from app.core.config import settings
+from app.services import anchors
+
+
+def write_anchor(directory, slug: str, vector, **fields) -> None:
+    """An anchor YAML plus its reduced vector file, the way data/anchors lays them out."""
+    vec_file = directory / f"{slug}.reduced.json"
+    vec_file.write_text(json.dumps([float(x) for x in vector]))
+    doc = {"slug": slug, "title": slug.replace("-", " ").title(), "tags": ["test"],
+           "min_size": 2, "max_size": 6, "reduced_vec_file": str(vec_file), **fields}
+    (directory / f"{slug}.yaml").write_text(yaml.safe_dump(doc))
+
+
+def touch(path) -> None:
+    """Move the mtime on, so a same-size rewrite is noticed even on coarse-timestamp filesystems."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(11)
+
+
+@pytest.fixture
+def catalogue(tmp_path, monkeypatch, rng):
+    """A three-anchor catalogue (one ghost) in its own directory, with its own snapshot dir."""
+    base = tmp_path / "anchors"
+    base.mkdir()
+    for slug in ("alpha", "beta"):
+        write_anchor(base, slug, rng.normal(size=settings.VECTOR_DIM))
+    write_anchor(base, "ghost", rng.normal(size=settings.VECTOR_DIM), is_ghost=True)
+    monkeypatch.setattr(settings, "ANCHOR_SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    yield base
+    monkeypatch.undo()
+    anchors.load_anchors()   # the app's own catalogue, for the tests that follow
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Slugs of every YAML file parsed from here on (snapshot loads parse none)."""
+    seen = []
+    parse = anchors._parse_files
+
+    def spy(paths, sources):
+        files = parse(paths, sources)
+        seen.extend(a.slug for a in files.values())
+        return files
+
+    monkeypatch.setattr(anchors, "_parse_files", spy)
+    return seen
+
+
+def slugs() -> list:
+    return sorted(a.slug for a in anchors.list_anchors())
+
+
+def test_second_load_maps_the_snapshot(catalogue, parsed, rng):
+    first = anchors.load_anchors(str(catalogue))
+    assert sorted(parsed) == ["alpha", "beta", "ghost"]
+    assert sorted(first) == ["alpha", "beta"]
+    query = rng.normal(size=settings.VECTOR_DIM)
+    query /= np.linalg.norm(query)
+    expected = [(a.slug, round(s, 5)) for a, s in anchors.score_anchors(query, 2)]
+
+    parsed.clear()
+    again = anchors.load_anchors(str(catalogue))
+    assert parsed == []
+    assert isinstance(again["alpha"].reduced, np.memmap)
+    assert again["alpha"].reduced_i8 == first["alpha"].reduced_i8
+    assert anchors.get_ghost("ghost") is not None
+    assert [(a.slug, round(s, 5)) for a, s in anchors.score_anchors(query, 2)] == expected
+
+
+def test_stale_or_unreadable_snapshot_falls_back_to_parsing(catalogue, parsed, rng):
+    anchors.load_anchors(str(catalogue))
+
+    write_anchor(catalogue, "beta", rng.normal(size=settings.VECTOR_DIM), title="Beta, renamed")
+    touch(catalogue / "beta.yaml")
+    parsed.clear()
+    assert anchors.load_anchors(str(catalogue))["beta"].title == "Beta, renamed"
+    assert sorted(parsed) == ["alpha", "beta", "ghost"]
+
+    (catalogue / "gamma.yaml").write_text(yaml.safe_dump({"slug": "gamma", "title": "Gamma", "min_size": 1, "max_size": 3}))
+    parsed.clear()
+    anchors.load_anchors(str(catalogue))
+    assert "gamma" in parsed and slugs() == ["alpha", "beta", "gamma"]
+
+    meta = catalogue.parent / "snapshot" / "meta.json"
+    meta.write_text("{not json")
+    parsed.clear()
+    anchors.load_anchors(str(catalogue))
+    assert len(parsed) == 4
+    assert json.loads(meta.read_text())["format"]   # rewritten by the parse
+
+    parsed.clear()
+    anchors.load_anchors(str(catalogue), use_snapshot=False)
+    assert len(parsed) == 4
+
+
+def test_reload_reparses_only_what_changed(catalogue, parsed, rng):
+    anchors.load_anchors(str(catalogue))
+    before = anchors.get_anchor("alpha").reduced_i8
+
+    write_anchor(catalogue, "delta", rng.normal(size=settings.VECTOR_DIM))
+    (catalogue / "alpha.reduced.json").write_text(json.dumps(rng.normal(size=settings.VECTOR_DIM).tolist()))
+    touch(catalogue / "alpha.reduced.json")
+    (catalogue / "beta.yaml").unlink()
+    parsed.clear()
+    report = anchors.reload_anchors()
+
+    path = lambda slug: str(catalogue / f"{slug}.yaml")
+    assert report == {"added": [path("delta")], "changed": [path("alpha")], "removed": [path("beta")]}
+    assert sorted(parsed) == ["alpha", "delta"]
+    assert slugs() == ["alpha", "delta"]
+    assert anchors.get_anchor("beta") is None
+    assert anchors.get_anchor("alpha").reduced_i8 != before
+
+    parsed.clear()
+    assert anchors.reload_anchors() == {"added": [], "changed": [], "removed": []}
+    assert parsed == []
+
+
+def test_reload_keeps_the_catalogue_on_a_parse_error(catalogue):
+    anchors.load_anchors(str(catalogue))
+    version = anchors.catalogue_version()
+    (catalogue / "alpha.yaml").write_text("slug: alpha\ntitle: [unclosed\n")
+    touch(catalogue / "alpha.yaml")
+
+    with pytest.raises(RuntimeError, match="Invalid anchor doc"):
+        anchors.reload_anchors()
+    assert anchors.catalogue_version() == version
+    assert slugs() == ["alpha", "beta"]
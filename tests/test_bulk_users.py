@@ -0,0 +1,81 @@
+"""POST /users/bulk: JSON arrays and NDJSON bodies, every row created or rejected on its own."""
+import json
+
+import numpy as np
+import pytest
+
+from conftest import fresh_email, unit_vector
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(4)
+
+
+def errors_of(body: dict) -> dict:
+    return {item["index"]: item["error"] for item in body["items"] if item["error"] is not None}
+
+
+def test_json_rows_fail_one_by_one(client, make_user, rng):
+    taken = make_user()["username"]
+    dup = fresh_email()
+    rows = [
+        {"email": fresh_email(), "first_name": "Ana", "vector": {"data": unit_vector(rng)}},
+        {"email": "someone@example.com"},
+        {"email": fresh_email(), "vector": {"data": [0.5] * 16}},
+        {"email": dup},
+        {"email": dup.upper()},                            # same username as the row before
+        {"email": f"{taken}@uniandes.edu.co"},
+        {"email": fresh_email(), "vector": {"data": [0.0] * 128}},
+        {"email": fresh_email(), "vector_id": 10**9},
+        {"first_name": "no email"},
+        {"email": fresh_email()},
+    ]
+    r = client.post("/users/bulk", json=rows)
+    assert r.status_code == 200, r.text
+    body = r.json()
+
+    errors = errors_of(body)
+    assert sorted(errors) == [1, 2, 4, 5, 6, 7, 8]
+    assert errors[1] == "email must be @uniandes.edu.co"
+    assert errors[2] == "Vector length 16 != expected 128"
+    assert errors[4] == errors[5] == "username already exists"
+    assert errors[6] == "Zero-norm vector is not allowed"
+    assert errors[7] == "vector not found"
+    assert errors[8].startswith("email:")
+    assert (body["created"], body["failed"]) == (3, 7)
+    assert [item["index"] for item in body["items"]] == list(range(len(rows)))
+
+    created = {item["index"]: item["user"] for item in body["items"] if item["user"] is not None}
+    assert created[0]["first_name"] == "Ana" and created[0]["vector_id"] is not None
+    assert created[9]["vector_id"] is None
+    for user in created.values():
+        assert client.get(f"/users/{user['id']}").json()["username"] == user["username"]
+
+
+def test_ndjson_rows_fail_one_by_one(client, rng):
+    good = [fresh_email(), fresh_email()]
+    lines = [
+        json.dumps({"email": good[0], "vector": {"data": unit_vector(rng)}}),
+        "",                                                # blank lines are not rows
+        '{"email": "broken@uniandes.edu.co", ',
+        json.dumps({"email": good[1]}),
+        json.dumps({"email": fresh_email(), "vector": {"data": unit_vector(rng), "b64": "AAAA"}}),
+    ]
+    r = client.post(
+        "/users/bulk",
+        content="\n".join(lines).encode(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+
+    assert len(body["items"]) == 4
+    assert sorted(errors_of(body)) == [1, 3]
+    assert (body["created"], body["failed"]) == (2, 2)
+    assert [body["items"][i]["user"]["username"] for i in (0, 2)] == [e.split("@")[0] for e in good]
+
+
+def test_body_must_be_an_array_or_ndjson(client):
+    assert client.post("/users/bulk", json={"email": fresh_email()}).status_code == 422
+    assert client.post("/users/bulk", content=b"not json", headers={"content-type": "application/json"}).status_code == 422
@@ -0,0 +1,93 @@
+"""GET /export/vectors dumps loaded back with read_records/import_records (what import_vectors runs)."""
+import io
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, make_engine
+from app.core.schema import ensure_schema
+from app.models.user import User
+from app.models.vector import Vector
+from app.services.export import import_records, read_records
+
+from conftest import unit_vector
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(20)
+
+
+def dump(client, fmt: str) -> bytes:
+    r = client.get("/export/vectors", params={"format": fmt})
+    assert r.status_code == 200, r.text
+    return r.content
+
+
+def load(db: Session, data: bytes, batch_size: int = 3) -> dict:
+    stats = None
+    for batch in read_records(io.BytesIO(data), batch_size):
+        stats = import_records(db, batch, stats)
+    return stats
+
+
+def users_in(db: Session) -> dict:
+    """{id: (username, first_name, vector bytes or None)} for every user."""
+    rows = db.execute(
+        select(User.id, User.username, User.first_name, Vector.data).outerjoin(Vector, User.vector_id == Vector.id)
+    )
+    return {uid: (username, first_name, data) for uid, username, first_name, data in rows}
+
+
+@pytest.fixture
+def restored(tmp_path):
+    """A session on a second, empty database at the newest migration."""
+    engine = make_engine(f"sqlite:///{tmp_path}/restored.db")
+    ensure_schema(engine)
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+
+def test_ndjson_dump_restores_every_user(client, make_user, rng, restored):
+    shared = unit_vector(rng)
+    make_user(shared, first_name="Ana")
+    make_user(shared)                      # same vector: one row on both sides
+    make_user(unit_vector(rng))
+    make_user(first_name="No vector")
+    with SessionLocal() as db:
+        original = users_in(db)
+
+    stats = load(restored, dump(client, "ndjson"))
+    assert stats["created"] == len(original) and stats["skipped"] == stats["invalid"] == 0
+    assert users_in(restored) == original
+    vectors = restored.scalars(select(Vector.data)).all()
+    assert sorted(vectors) == sorted({v for _, _, v in original.values() if v is not None})
+
+    again = load(restored, dump(client, "ndjson"))   # idempotent
+    assert again["created"] == again["updated"] == 0
+    assert again["unchanged"] == len(original)
+
+
+def test_binary_dump_puts_vectors_back(client, make_user, rng):
+    user = make_user(unit_vector(rng))
+    data = dump(client, "binary")
+    with SessionLocal() as db:
+        before = users_in(db)
+
+    r = client.put(f"/users/{user['id']}/vector", json={"vector": {"data": unit_vector(rng)}})
+    assert r.status_code == 200, r.text
+    with SessionLocal() as db:
+        assert users_in(db)[user["id"]] != before[user["id"]]
+        stats = load(db, data)
+        assert stats["updated"] == 1 and stats["created"] == 0
+        assert users_in(db) == before
+
+
+def test_truncated_binary_dump_is_rejected(client, make_user, rng):
+    make_user(unit_vector(rng))
+    data = dump(client, "binary")
+    with pytest.raises(ValueError, match="partial record"):
+        list(read_records(io.BytesIO(data[:-1])))
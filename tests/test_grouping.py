@@ -0,0 +1,60 @@
+"""form_groups: every group within min_size..max_size, every row placed at most once."""
+import numpy as np
+import pytest
+
+from app.services import grouping
+from app.services.grouping import form_groups, grouping_stats
+
+DIM = 16
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(17)
+
+
+def assert_partition(result, n: int, min_size: int, max_size: int) -> None:
+    sizes = [len(g) for g in result.groups]
+    assert all(min_size <= s <= max_size for s in sizes), sizes
+    placed = np.concatenate([*result.groups, result.unassigned])
+    assert sorted(placed.tolist()) == list(range(n))   # each row exactly once
+
+
+@pytest.mark.parametrize("n,min_size,max_size,target", [
+    (100, 4, 6, None),
+    (97, 3, 5, 3),
+    (50, 5, 5, None),
+    (41, 2, 16, 12),
+    (7, 4, 6, None),
+    (3, 4, 6, None),
+])
+def test_groups_respect_the_size_bounds(rng, n, min_size, max_size, target):
+    data = rng.normal(size=(n, DIM)).astype(np.float32)
+    result = form_groups(data, min_size, max_size, target)
+    assert_partition(result, n, min_size, max_size)
+    if n < min_size:
+        assert result.groups == [] and len(result.unassigned) == n
+    else:
+        assert len(result.unassigned) < max(min_size, n // 10)
+
+
+def test_bucketed_pools_respect_the_size_bounds(rng, monkeypatch):
+    monkeypatch.setattr(grouping, "LEAF_GROUPS", 8)   # 600 rows / ~5 per group: bucketed
+    data = rng.integers(-127, 128, size=(600, DIM)).astype(np.int8)
+    result = form_groups(data, 4, 6)
+    assert_partition(result, 600, 4, 6)
+    assert grouping_stats(data, result)["unassigned"] == len(result.unassigned) < 60
+
+
+def test_tight_clusters_become_the_groups(rng):
+    centres = rng.normal(size=(5, DIM))
+    data = np.repeat(centres, 4, axis=0) + 0.01 * rng.normal(size=(20, DIM))
+    result = form_groups(data, 4, 4)
+    assert sorted(sorted(g.tolist()) for g in result.groups) == [list(range(i, i + 4)) for i in range(0, 20, 4)]
+    assert len(result.unassigned) == 0
+
+
+@pytest.mark.parametrize("min_size,max_size", [(0, 4), (5, 4)])
+def test_invalid_bounds_are_rejected(rng, min_size, max_size):
+    with pytest.raises(ValueError):
+        form_groups(rng.normal(size=(10, DIM)), min_size, max_size)
@@ -0,0 +1,143 @@
+"""Mailbox reads: the id cursor, and the per-process ring that answers covered reads without a query."""
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.mailbox import MailboxMessage
+from app.services import mailbox
+
+
+@contextmanager
+def counted_queries():
+    """Count the statements sent to the database inside the block."""
+    seen = []
+
+    def count(*_):
+        seen.append(1)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def post(db, user_id: int, n: int) -> list[int]:
+    return [m.id for m in mailbox.post_messages(db, [(user_id, "notice", f"message {i}", None) for i in range(n)])]
+
+
+def post_elsewhere(db, user_id: int) -> int:
+    """Insert a message the way another worker would: this process's rings never hear of it."""
+    row = {"user_id": user_id, "kind": "notice", "body": "from elsewhere", "data": None, "created_at": datetime.now(timezone.utc)}
+    mid = db.scalar(insert(MailboxMessage).returning(MailboxMessage.id), row)
+    db.commit()
+    return mid
+
+
+@pytest.fixture
+def user_id(make_user):
+    return make_user()["id"]
+
+
+@pytest.fixture
+def db(client):
+    mailbox._RINGS.clear()
+    with SessionLocal() as db:
+        yield db
+    mailbox._RINGS.clear()
+
+
+def ids_of(messages) -> list[int]:
+    return [m.id for m in messages]
+
+
+def test_cursor_pages_in_id_order(db, user_id):
+    ids = post(db, user_id, 7)
+    assert ids_of(mailbox.read_mailbox(db, user_id, 0, 3)) == ids[:3]
+    assert ids_of(mailbox.read_mailbox(db, user_id, ids[2], 3)) == ids[3:6]
+    assert ids_of(mailbox.read_mailbox(db, user_id, ids[5], 3)) == ids[6:]
+    assert mailbox.read_mailbox(db, user_id, ids[6], 3) == []
+    assert ids_of(mailbox.read_mailbox(db, user_id, ids[1], 10**6)) == ids[2:]   # limit is clamped
+
+
+def test_confirmed_ring_answers_without_a_query(db, user_id):
+    ids = post(db, user_id, 3)
+    first = mailbox.read_mailbox(db, user_id, 0, 10)   # the whole tail: confirms the ring
+    assert ids_of(first) == ids
+
+    with counted_queries() as queries:
+        assert mailbox.read_mailbox(db, user_id, 0, 10) == first
+        assert ids_of(mailbox.read_mailbox(db, user_id, ids[0], 10)) == ids[1:]
+        assert mailbox.read_mailbox(db, user_id, ids[-1], 10) == []
+    assert queries == []
+
+
+def test_posts_here_and_elsewhere_reach_the_reader(db, user_id, monkeypatch):
+    ids = post(db, user_id, 2)
+    mailbox.read_mailbox(db, user_id, 0, 10)
+
+    ids += post(db, user_id, 1)   # a local post lands in the ring but asks for a fresh confirmation
+    with counted_queries() as queries:
+        assert ids_of(mailbox.read_mailbox(db, user_id, 0, 10)) == ids
+    assert len(queries) == 1      # the id range; every row was already in the ring
+
+    other = post_elsewhere(db, user_id)
+    assert ids_of(mailbox.read_mailbox(db, user_id, ids[-1], 10)) == []   # fresh confirmation still holds
+    monkeypatch.setattr(settings, "MAILBOX_WAIT_POLL_S", 0.0)              # ... until it goes stale
+    assert ids_of(mailbox.read_mailbox(db, user_id, ids[-1], 10)) == [other]
+
+
+def test_ring_keeps_the_newest_messages_only(db, user_id, monkeypatch):
+    monkeypatch.setattr(settings, "MAILBOX_RING_SIZE", 3)
+    ids = post(db, user_id, 6)
+    assert ids_of(mailbox.read_mailbox(db, user_id, 0, 10)) == ids
+
+    with counted_queries() as queries:
+        assert ids_of(mailbox.read_mailbox(db, user_id, ids[2], 10)) == ids[3:]
+    assert queries == []
+    with counted_queries() as queries:
+        assert ids_of(mailbox.read_mailbox(db, user_id, ids[0], 10)) == ids[1:]   # below the ring's floor
+    assert len(queries) == 2   # the id range, then the two rows the ring no longer holds
+
+
+def test_rings_are_kept_for_the_most_recent_readers(db, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "MAILBOX_RING_USERS", 2)
+    users = [make_user()["id"] for _ in range(3)]
+    for uid in users:
+        mailbox.read_mailbox(db, uid)
+    assert list(mailbox._RINGS) == users[1:]
+
+    mailbox.read_mailbox(db, users[1])   # a covered read still counts as use
+    mailbox.read_mailbox(db, users[0])
+    assert list(mailbox._RINGS) == [users[1], users[0]]
+
+
+def test_long_poll_wakes_on_posts_from_any_worker(db, user_id):
+    since = post(db, user_id, 1)[0]
+
+    async def parked(deliver):
+        start = time.monotonic()
+        poll = asyncio.create_task(mailbox.long_poll(user_id, since, 10, 10.0))
+        await asyncio.sleep(0.1)
+        assert not poll.done()
+        mid = await asyncio.to_thread(deliver)
+        return mid, await poll, time.monotonic() - start
+
+    mid, got, waited = asyncio.run(parked(lambda: post(db, user_id, 1)[0]))
+    assert ids_of(got) == [mid] and waited < 5
+    since = mid
+
+    def elsewhere():   # what watch_mailbox_waiters does every MAILBOX_WAIT_POLL_S
+        mid = post_elsewhere(db, user_id)
+        mailbox.poll_waiters()
+        return mid
+
+    mid, got, waited = asyncio.run(parked(elsewhere))
+    assert ids_of(got) == [mid] and waited < 5
+    assert not mailbox._WAITERS
@@ -0,0 +1,97 @@
+"""Ghost parties: seats under concurrent joins, in one worker and across workers."""
+import threading
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.core.database import SessionLocal
+from app.models.party import Party, PartyInvite, PartyMember
+from app.services import parties
+
+from conftest import unit_vector
+
+INVITED = 12
+
+
+class _Unshared(dict):
+    """A seat map that never remembers: every join loads the party like a worker that did not start it."""
+
+    def get(self, key, default=None):
+        return default
+
+    def setdefault(self, key, default=None):
+        return default
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(16)
+
+
+@pytest.fixture
+def party(client, make_user, rng):
+    """An open study-session party (2-4 seats) with INVITED invitees; returns (party id, invitees)."""
+    initiator = make_user(unit_vector(rng))
+    for _ in range(INVITED):
+        make_user(unit_vector(rng))
+    r = client.post(f"/users/{initiator['id']}/parties", json={"anchor": "study-session", "invite": INVITED})
+    assert r.status_code == 201, r.text
+    party_id = r.json()["id"]
+    with SessionLocal() as db:
+        invited = db.scalars(select(PartyInvite.user_id).where(PartyInvite.party_id == party_id)).all()
+    assert len(invited) == INVITED
+    return party_id, invited
+
+
+def join_all(party_id: int, user_ids) -> list:
+    """Join with every user at once, each on its own thread and session; returns 200 or the error status."""
+    start = threading.Barrier(len(user_ids))
+    outcomes = [None] * len(user_ids)
+
+    def join(i, uid):
+        with SessionLocal() as db:
+            start.wait()
+            try:
+                parties.join_party(db, party_id, uid)
+                outcomes[i] = 200
+            except HTTPException as e:
+                outcomes[i] = (e.status_code, e.detail)
+
+    threads = [threading.Thread(target=join, args=(i, uid)) for i, uid in enumerate(user_ids)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def assert_full(party_id: int) -> None:
+    with SessionLocal() as db:
+        party = db.get(Party, party_id)
+        members = db.scalar(select(func.count()).where(PartyMember.party_id == party_id))
+    assert party.member_count == members == party.max_size == 4
+
+
+@pytest.mark.parametrize("shared_seats", [True, False], ids=["one-worker", "many-workers"])
+def test_concurrent_joins_fill_the_party_exactly(party, monkeypatch, shared_seats):
+    party_id, invited = party
+    if not shared_seats:
+        monkeypatch.setattr(parties, "_SEATS", _Unshared())
+
+    outcomes = join_all(party_id, invited)
+    assert outcomes.count(200) == 3
+    assert all(o == 200 or o == (409, "party is full") for o in outcomes)
+    assert_full(party_id)
+
+
+def test_only_invitees_get_a_seat(client, party, make_user, rng):
+    party_id, invited = party
+    outsider = make_user(unit_vector(rng))["id"]
+    r = client.post(f"/users/{outsider}/parties/{party_id}/join")
+    assert (r.status_code, r.json()["detail"]) == (403, "not invited to this party")
+
+    assert client.post(f"/users/{invited[0]}/parties/{party_id}/join").status_code == 200
+    assert client.post(f"/users/{invited[0]}/parties/{party_id}/join").status_code == 409
+    assert client.get(f"/parties/{party_id}").json()["member_count"] == 2
@@ -0,0 +1,138 @@
+"""UserVectorIndex over a shared base generation plus local writes (see attach_base)."""
+import time
+
+import numpy as np
+import pytest
+
+from app.core.shared_arrays import attach, publish
+from app.services.user_index import UserVectorIndex, sign_codes
+
+DIM = 16
+
+
+def unit(rng) -> np.ndarray:
+    v = rng.normal(size=DIM)
+    return np.round(v / np.linalg.norm(v) * 127).astype(np.int8)
+
+
+def publish_base(directory, users: dict, as_of_ns: int):
+    """Publish `users` ({id: int8 vector}) the way publish_user_matrix does and map it back."""
+    ids = np.array(sorted(users), dtype=np.int64)
+    data = np.array([users[i] for i in ids], dtype=np.int8).reshape(len(ids), DIM)
+    publish(directory, {"ids": ids, "data": data, "codes": sign_codes(data)}, {"as_of_ns": as_of_ns})
+    return attach(directory)
+
+
+def brute_force(users: dict, query: np.ndarray, k: int, exclude=None) -> list:
+    scored = [(uid, int(v.astype(np.int32) @ query.astype(np.int32))) for uid, v in users.items() if uid != exclude]
+    scored.sort(key=lambda s: -s[1])
+    return [uid for uid, _ in scored[:k]]
+
+
+def ids_of(results) -> list:
+    return [uid for uid, _ in results]
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+
+@pytest.fixture
+def base_users(rng):
+    return {uid: unit(rng) for uid in range(1, 51)}
+
+
+@pytest.fixture
+def index(tmp_path, base_users):
+    index = UserVectorIndex(DIM)
+    index.attach_base(publish_base(tmp_path, base_users, time.time_ns()))
+    return index
+
+
+def test_base_rows_are_served_from_the_mapping(index, base_users):
+    assert len(index) == 50
+    assert np.array_equal(index.get(7), base_users[7])
+    query = base_users[7]
+    assert ids_of(index.search(query, 10)) == brute_force(base_users, query, 10)
+
+
+def test_local_writes_shadow_base_rows(index, base_users, rng):
+    moved = unit(rng)
+    index.upsert(3, moved.tobytes())
+    index.remove(5)
+    index.upsert(100, unit(rng).tobytes())
+
+    expected = {**base_users, 3: moved, 100: index.get(100)}
+    del expected[5]
+    assert len(index) == len(expected)
+    assert np.array_equal(index.get(3), moved)
+    assert index.get(5) is None
+
+    found = ids_of(index.search(moved, len(expected) + 10))
+    assert sorted(found) == sorted(expected)   # 3 once (its base row is shadowed), 5 gone
+    assert found == brute_force(expected, moved, len(expected))
+
+
+def test_writes_before_a_republish_are_dropped(index, base_users, rng, tmp_path):
+    moved, new = unit(rng), unit(rng)
+    index.upsert(3, moved.tobytes())
+    index.remove(5)
+    index.upsert(100, new.tobytes())
+
+    # The next generation read the database after those writes, so it already has them
+    current = {**base_users, 3: moved, 100: new}
+    del current[5]
+    index.attach_base(publish_base(tmp_path, current, time.time_ns()))
+
+    assert index._rows == {} and index._base_dead_n == 0
+    assert len(index) == len(current)
+    assert index.get(5) is None
+    assert np.array_equal(index.get(3), moved)
+    assert ids_of(index.search(new, 20)) == brute_force(current, new, 20)
+
+
+def test_writes_after_a_republish_keep_shadowing(index, base_users, rng, tmp_path):
+    as_of = time.time_ns()   # the generation reads the database now ...
+    moved, new = unit(rng), unit(rng)
+    index.upsert(3, moved.tobytes())   # ... and misses these writes
+    index.remove(5)
+    index.upsert(100, new.tobytes())
+    index.attach_base(publish_base(tmp_path, base_users, as_of))
+
+    expected = {**base_users, 3: moved, 100: new}
+    del expected[5]
+    assert len(index) == len(expected)
+    assert index.get(5) is None
+    assert np.array_equal(index.get(3), moved)
+    found = ids_of(index.search(moved, len(expected) + 10))
+    assert sorted(found) == sorted(expected)
+    assert found == brute_force(expected, moved, len(expected))
+
+
+def test_exclude_covers_both_segments(index, base_users, rng):
+    new = unit(rng)
+    index.upsert(100, new.tobytes())
+    expected = {**base_users, 100: new}
+
+    for excluded in (7, 100):   # a base row, then a local row
+        query = expected[excluded]
+        found = ids_of(index.search(query, 10, exclude=excluded))
+        assert excluded not in found
+        assert found == brute_force(expected, query, 10, exclude=excluded)
+
+
+def test_prefilter_spans_both_segments(index, base_users, rng):
+    query = base_users[10]
+    index.upsert(200, query.tobytes())   # new local user, same vector as base user 10
+    index.upsert(3, query.tobytes())     # base user 3 moved onto it: its base row is shadowed
+    index.upsert(4, query.tobytes())     # ... and 4 too, then removed: neither of its rows is live
+    index.remove(4)
+
+    # The three live rows at Hamming distance 0 are the candidates, across base and local rows
+    found = index.search(query, 10, candidates=3)
+    assert sorted(ids_of(found)) == [3, 10, 200]
+    assert all(score == pytest.approx(1.0, abs=0.02) for _, score in found)
+
+    assert sorted(ids_of(index.search(query, 10, exclude=10, candidates=2))) == [3, 200]
+    assert sorted(ids_of(index.search(query, 10, exclude=200, candidates=2))) == [3, 10]